@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Microbenchmarks for building requests and aggregating streamed responses.
+
+    python benchmarks/conversion.py
+"""
+import timeit
+
+from google.generativeai import generative_models
+from google.generativeai import protos
+from google.generativeai.types import content_types
+from google.generativeai.types import generation_types
+
+PARTS = 100
+TURNS = 50
+CHUNKS = 500
+
+
+def _chunk(i):
+    return protos.GenerateContentResponse(
+        candidates=[
+            {
+                "index": 0,
+                "content": {"role": "model", "parts": [{"text": f"token {i} "}]},
+                "safety_ratings": [
+                    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "probability": "NEGLIGIBLE"}
+                ],
+            }
+        ],
+        usage_metadata={"prompt_token_count": 10, "candidates_token_count": i},
+    )
+
+
+def _cases():
+    strings = [f"part {i}" for i in range(PARTS)]
+    dicts = [{"role": "user", "parts": [{"text": f"turn {i}"}]} for i in range(TURNS)]
+    history = content_types.to_contents(dicts)
+    model = generative_models.GenerativeModel("gemini-1.5-flash")
+    chunks = [_chunk(i) for i in range(CHUNKS)]
+    response = generation_types.GenerateContentResponse.from_response(
+        generation_types._join_chunks(chunks)
+    )
+
+    yield f"to_content ({PARTS} strings)", lambda: content_types.to_content(strings)
+    yield f"to_contents ({TURNS} dicts)", lambda: content_types.to_contents(dicts)
+    yield f"_prepare_request ({TURNS} turns)", lambda: model._prepare_request(
+        contents=history, tools=None, tool_config=None
+    )
+    yield f"_join_chunks ({CHUNKS} chunks)", lambda: generation_types._join_chunks(chunks)
+    yield f"stream ({CHUNKS} chunks)", lambda: generation_types.GenerateContentResponse.from_iterator(
+        chunks
+    ).resolve()
+    yield "response.text", lambda: response.text
+
+
+def main():
+    print(f"{'case':<36}{'time (us)':>12}")
+    for name, fn in _cases():
+        number, _ = timeit.Timer(fn).autorange()
+        best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:<36}{best * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
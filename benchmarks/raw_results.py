@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compares the default (converted) results with `raw=True` results.
+
+The API calls are answered by in-memory fakes, so this only measures the client side:
+
+    python benchmarks/raw_results.py
+"""
+import timeit
+
+from google.generativeai import embedding
+from google.generativeai import models
+from google.generativeai import protos
+from google.generativeai.types import retriever_types
+
+BATCH_SIZE = 100
+DIMENSIONS = 768
+MODELS = 50
+CHUNKS = 100
+
+
+class FakeGenerativeClient:
+    def batch_embed_contents(self, request, **kwargs):
+        values = [0.125] * DIMENSIONS
+        return protos.BatchEmbedContentsResponse(
+            embeddings=[{"values": values} for _ in request.requests]
+        )
+
+
+class FakeModelClient:
+    def __init__(self):
+        self.tuned_model = protos.TunedModel(
+            name="tunedModels/benchmark",
+            base_model="models/gemini-1.0-pro-001",
+            state=protos.TunedModel.State.ACTIVE,
+            create_time="2024-01-01T00:00:00.123456Z",
+            update_time="2024-01-01T01:00:00Z",
+            tuning_task={
+                "start_time": "2024-01-01T00:00:00Z",
+                "complete_time": "2024-01-01T01:00:00Z",
+                "snapshots": [
+                    {"step": step, "mean_loss": 1 / step, "compute_time": "2024-01-01T00:30:00Z"}
+                    for step in range(1, 101)
+                ],
+                "hyperparameters": {"epoch_count": 5, "batch_size": 4, "learning_rate": 0.001},
+            },
+        )
+
+    def list_models(self, page_size, **kwargs):
+        return [
+            protos.Model(
+                name=f"models/benchmark-{i}",
+                base_model_id="benchmark",
+                version="001",
+                input_token_limit=1_000_000,
+                output_token_limit=8192,
+                supported_generation_methods=["generateContent", "countTokens"],
+            )
+            for i in range(MODELS)
+        ]
+
+    def get_tuned_model(self, name, **kwargs):
+        return self.tuned_model
+
+
+class FakeRetrieverClient:
+    def query_corpus(self, request, **kwargs):
+        return protos.QueryCorpusResponse(
+            relevant_chunks=[
+                {
+                    "chunk_relevance_score": 0.5,
+                    "chunk": {
+                        "name": f"corpora/benchmark/documents/doc/chunks/{i}",
+                        "data": {"string_value": "lorem ipsum " * 50},
+                        "custom_metadata": [{"key": "page", "numeric_value": i}],
+                        "create_time": "2024-01-01T00:00:00.123456Z",
+                        "update_time": "2024-01-01T00:00:00.123456Z",
+                    },
+                }
+                for i in range(CHUNKS)
+            ]
+        )
+
+
+def _cases():
+    generative_client = FakeGenerativeClient()
+    model_client = FakeModelClient()
+    corpus = retriever_types.Corpus(
+        name="corpora/benchmark", display_name="", create_time=None, update_time=None
+    )
+    retriever_client = FakeRetrieverClient()
+    texts = ["hello"] * BATCH_SIZE
+
+    yield f"embed_content ({BATCH_SIZE} x {DIMENSIONS})", lambda raw: embedding.embed_content(
+        "models/text-embedding-004", texts, client=generative_client, raw=raw
+    )
+    yield f"list_models ({MODELS})", lambda raw: list(
+        models.list_models(client=model_client, raw=raw)
+    )
+    yield "get_tuned_model", lambda raw: models.get_tuned_model(
+        "tunedModels/benchmark", client=model_client, raw=raw
+    )
+    yield f"Corpus.query ({CHUNKS})", lambda raw: corpus.query(
+        "query", client=retriever_client, raw=raw
+    )
+
+
+def main():
+    print(f"{'case':<32}{'default (ms)':>14}{'raw (ms)':>12}{'speedup':>10}")
+    for name, fn in _cases():
+        timings = []
+        for raw in [False, True]:
+            number, _ = timeit.Timer(lambda: fn(raw)).autorange()
+            best = min(timeit.repeat(lambda: fn(raw), number=number, repeat=5)) / number
+            timings.append(best * 1000)
+        default, raw = timings
+        print(f"{name:<32}{default:>14.3f}{raw:>12.3f}{default / raw:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -55,13 +55,21 @@ from google.generativeai.embedding import embed_content
 from google.generativeai.embedding import embed_content_async
 
 from google.generativeai.files import upload_file
+from google.generativeai.files import upload_file_async
+from google.generativeai.files import upload_files
+from google.generativeai.files import wait_for_active
+from google.generativeai.files import wait_for_active_async
 from google.generativeai.files import get_file
 from google.generativeai.files import list_files
 from google.generativeai.files import delete_file
 
+from google.generativeai.file_offload import FileOffloader
+
 from google.generativeai.generative_models import GenerativeModel
 from google.generativeai.generative_models import ChatSession
 
+from google.generativeai.rate_limiting import RateLimiter
+
 from google.generativeai.text import generate_text
 from google.generativeai.text import generate_embeddings
 from google.generativeai.text import count_text_tokens
@@ -88,9 +96,11 @@ __version__ = version.__version__
 del discuss
 del embedding
 del files
+del file_offload
 del generative_models
 del text
 del models
 del client
 del operations
+del rate_limiting
 del version
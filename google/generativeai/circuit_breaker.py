@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Per-model circuit breakers, to fail fast while a model is degraded."""
+from __future__ import annotations
+
+import asyncio
+import collections
+from collections.abc import AsyncIterable, Iterable, Mapping
+import contextlib
+import enum
+import threading
+import time
+from typing import Callable, Union
+from typing_extensions import TypedDict
+
+import google.api_core.exceptions
+
+from google.generativeai import concurrency
+
+__all__ = ["CircuitBreaker", "CircuitBreakerDict", "CircuitBreakerOptions", "CircuitOpenError"]
+
+# Errors that mean the model is degraded. Anything else means the service is responding.
+FAILURE_ERRORS = concurrency.OVERLOAD_ERRORS + (
+    google.api_core.exceptions.DeadlineExceeded,
+    google.api_core.exceptions.InternalServerError,
+)
+
+# A call that ends with one of these was abandoned by the caller, it says nothing about the model.
+ABANDONED_ERRORS = (GeneratorExit, asyncio.CancelledError)
+
+
+class CircuitOpenError(google.api_core.exceptions.ServiceUnavailable):
+    """Raised instead of calling a model while its circuit breaker is open."""
+
+
+class State(enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a model after repeated failures, and probes it until it recovers.
+
+    The breaker opens after `failure_threshold` consecutive failures, or when at least
+    `error_rate` of the last `window` calls failed. Only `ServiceUnavailable`,
+    `ResourceExhausted`, `DeadlineExceeded` and `InternalServerError` count as failures.
+
+    While it's open, calls fail immediately with a `CircuitOpenError`, or are sent to the
+    `GenerativeModel`'s `fallback_models`. After `reset_timeout` seconds it's half-open: a
+    single probe call is let through, if it succeeds the breaker closes, otherwise it opens
+    for another `reset_timeout`.
+
+    >>> import google.generativeai as genai
+    >>> genai.configure(circuit_breakers=dict(failure_threshold=3, reset_timeout=10))
+    >>> model = genai.GenerativeModel('gemini-1.5-flash', fallback_models=['gemini-1.5-pro'])
+    >>> genai.client.get_default_circuit_breaker('gemini-1.5-flash').state
+    <State.CLOSED: 'closed'>
+
+    Args:
+        failure_threshold: The number of consecutive failures that opens the breaker.
+        error_rate: The fraction of failures, over the last `window` calls, that opens the breaker.
+        window: The number of calls `error_rate` is measured over.
+        reset_timeout: Seconds to wait before probing an open breaker.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        error_rate: float = 0.5,
+        window: int = 20,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if failure_threshold < 1 or window < 1:
+            raise ValueError(
+                "Invalid configuration: `failure_threshold` and `window` must be at least 1. "
+                f"Received: failure_threshold={failure_threshold}, window={window}."
+            )
+        if not 0 < error_rate <= 1:
+            raise ValueError(
+                f"Invalid configuration: `error_rate` must be between 0 and 1. Received: {error_rate}."
+            )
+
+        self._failure_threshold = failure_threshold
+        self._error_rate = error_rate
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._state = State.CLOSED
+        self._consecutive_failures = 0
+        self._results: collections.deque[bool] = collections.deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_started: float | None = None
+
+    @property
+    def state(self) -> State:
+        with self._lock:
+            self._update()
+            return self._state
+
+    def __repr__(self):
+        return f"CircuitBreaker(state={self.state.value})"
+
+    def _update(self):
+        if self._state is State.OPEN and self._clock() - self._opened_at >= self._reset_timeout:
+            self._state = State.HALF_OPEN
+            self._probe_started = None
+
+    def _open(self):
+        self._state = State.OPEN
+        self._opened_at = self._clock()
+        self._probe_started = None
+
+    def _close(self):
+        self._state = State.CLOSED
+        self._consecutive_failures = 0
+        self._results.clear()
+
+    def allow(self) -> bool:
+        """Returns `True` if a call may be sent. A half-open breaker lets one probe through."""
+        with self._lock:
+            self._update()
+            if self._state is State.CLOSED:
+                return True
+            if self._state is State.OPEN:
+                return False
+
+            now = self._clock()
+            # A probe that never reported back (an abandoned stream) doesn't block others forever.
+            if self._probe_started is None or now - self._probe_started >= self._reset_timeout:
+                self._probe_started = now
+                return True
+            return False
+
+    def _release_probe(self):
+        if self._state is State.HALF_OPEN:
+            # Another call can probe the model in its place.
+            self._probe_started = None
+
+    def cancel(self):
+        """Gives back a call that was allowed but never sent, it's neither a success nor a failure."""
+        with self._lock:
+            self._update()
+            self._release_probe()
+
+    def record(self, error: BaseException | None = None):
+        """Records the outcome of a call that was allowed."""
+        failed = isinstance(error, FAILURE_ERRORS)
+        with self._lock:
+            self._update()
+            if self._state is State.OPEN:
+                # A straggler from before the breaker opened.
+                return
+            if isinstance(error, ABANDONED_ERRORS):
+                self._release_probe()
+                return
+            if self._state is State.HALF_OPEN:
+                if failed:
+                    self._open()
+                else:
+                    self._close()
+                return
+
+            self._results.append(failed)
+            if not failed:
+                self._consecutive_failures = 0
+                return
+
+            self._consecutive_failures += 1
+            failure_rate = sum(self._results) / len(self._results)
+            if self._consecutive_failures >= self._failure_threshold or (
+                len(self._results) == self._results.maxlen and failure_rate >= self._error_rate
+            ):
+                self._open()
+
+
+class CircuitBreakerDict(TypedDict, total=False):
+    failure_threshold: int
+    error_rate: float
+    window: int
+    reset_timeout: float
+
+
+CircuitBreakerOptions = Union[bool, CircuitBreakerDict]
+
+
+def to_circuit_breaker_options(options: CircuitBreakerOptions | None) -> dict | None:
+    """Returns the `CircuitBreaker` arguments for `options`, or `None` for no breakers."""
+    if options is None or options is False:
+        return None
+    elif options is True:
+        return {}
+    elif isinstance(options, Mapping):
+        # Fail early on bad arguments, rather than on the first call.
+        CircuitBreaker(**options)
+        return dict(options)
+    else:
+        raise TypeError(
+            "Invalid input type. Expected a `bool` or a `dict` of `CircuitBreaker` arguments.\n"
+            f"However, received an object of type: {type(options)}.\n"
+            f"Object Value: {options}"
+        )
+
+
+def _record(breaker: CircuitBreaker | None, error: BaseException | None):
+    if breaker is not None:
+        breaker.record(error)
+
+
+@contextlib.contextmanager
+def track(breaker: CircuitBreaker | None):
+    """Records the outcome of the call made in the `with` block."""
+    try:
+        yield
+    except BaseException as e:
+        _record(breaker, e)
+        raise
+    _record(breaker, None)
+
+
+@contextlib.contextmanager
+def cancel_on_error(breaker: CircuitBreaker | None):
+    """Cancels the allowed call if the `with` block, which prepares it, fails before it's sent."""
+    try:
+        yield
+    except BaseException:
+        if breaker is not None:
+            breaker.cancel()
+        raise
+
+
+@contextlib.contextmanager
+def track_errors(breaker: CircuitBreaker | None):
+    """Records an error raised starting a streaming call, `track_stream` records the rest."""
+    try:
+        yield
+    except BaseException as e:
+        _record(breaker, e)
+        raise
+
+
+def track_stream(breaker: CircuitBreaker | None, iterator: Iterable) -> Iterable:
+    """Records the outcome of a streaming call once the stream is complete."""
+    try:
+        for chunk in iterator:
+            yield chunk
+    except BaseException as e:
+        _record(breaker, e)
+        raise
+    _record(breaker, None)
+
+
+async def track_stream_async(
+    breaker: CircuitBreaker | None, iterator: AsyncIterable
+) -> AsyncIterable:
+    """The async version of `track_stream`."""
+    try:
+        async for chunk in iterator:
+            yield chunk
+    except BaseException as e:
+        _record(breaker, e)
+        raise
+    _record(breaker, None)
@@ -1,27 +1,52 @@
 from __future__ import annotations
 
 import os
+import asyncio
+import collections
 import contextlib
+import copy
 import dataclasses
+import functools
+import inspect
+import io
+import json
 import pathlib
+import threading
+import time
 import types
+import urllib.parse
 from typing import Any, cast
-from collections.abc import Sequence
+from collections.abc import Iterable, Mapping, Sequence
 import httplib2
 
 import google.ai.generativelanguage as glm
 import google.generativeai.protos as protos
-
+from google.generativeai import circuit_breaker
+from google.generativeai import concurrency
+from google.generativeai import hedging as hedging_lib
+from google.generativeai import rate_limiting
+from google.generativeai import retry_budget as retry_budget_lib
+from google.generativeai import scheduling
+from google.generativeai import utils
+
+import google.api_core.exceptions
 from google.auth import credentials as ga_credentials
 from google.auth import exceptions as ga_exceptions
 from google import auth
 from google.api_core import client_options as client_options_lib
 from google.api_core import gapic_v1
 from google.api_core import operations_v1
+from google.protobuf import message as message_lib
 
+import googleapiclient.errors
 import googleapiclient.http
 import googleapiclient.discovery
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
 try:
     from google.generativeai import version
 
@@ -31,6 +56,7 @@ except ImportError:
 
 USER_AGENT = "genai-py"
 GENAI_API_DISCOVERY_URL = "https://generativelanguage.googleapis.com/$discovery/rest"
+GENAI_API_UPLOAD_URL = "https://generativelanguage.googleapis.com/upload/v1beta/files"
 
 
 @contextlib.contextmanager
@@ -45,11 +71,244 @@ def patch_colab_gce_credentials():
         auth._default._get_gce_credentials = get_gce
 
 
+def _read_upload_state(path: pathlib.Path) -> dict[str, Any] | None:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path: pathlib.Path, text: str, mode: int = 0o666):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Replacing the file in one step, a crash never leaves half of it behind.
+    # Each thread writes its own temp file, a stale one is left by a writer that crashed.
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    temp_path.unlink(missing_ok=True)
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+    try:
+        with open(fd, "w") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _write_upload_state(path: pathlib.Path, state: dict[str, Any]):
+    # The upload URI is enough to write to the upload, only the owner can read it.
+    _write_atomic(path, json.dumps(state), mode=0o600)
+
+
+def _upload_url(api_endpoint: str | None) -> str:
+    """The File API upload URL on `api_endpoint`, a host or a URL."""
+    if not api_endpoint:
+        return GENAI_API_UPLOAD_URL
+    if "://" not in api_endpoint:
+        api_endpoint = f"https://{api_endpoint}"
+    return f"{api_endpoint.rstrip('/')}/upload/v1beta/files"
+
+
+def _set_query_param(uri: str, name: str, value: str | None) -> str:
+    """Returns `uri` with the query parameter `name` set to `value`, or removed if it's `None`."""
+    parts = urllib.parse.urlsplit(uri)
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query) if k != name]
+    if value is not None:
+        query.append((name, value))
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def _query_upload_status(http: httplib2.Http, request) -> Any | None:
+    """Asks the server how much of the resumable upload `request` it received.
+
+    Updates `request.resumable_progress` and returns `None` while the upload is incomplete,
+    or returns the response if the server already has the whole file.
+
+    Raises:
+        googleapiclient.errors.HttpError: If the upload session can't be queried.
+    """
+    size = request.resumable.size()
+    headers = {"Content-Range": f"bytes */{'*' if size is None else size}", "content-length": "0"}
+    resp, content = http.request(request.resumable_uri, "PUT", headers=headers)
+    if resp.status in (200, 201):
+        return request.postproc(resp, content)
+    if resp.status != 308:
+        raise googleapiclient.errors.HttpError(resp, content, uri=request.resumable_uri)
+    # The range of the received bytes, "bytes=0-<last>", is missing if there are none.
+    received = resp.get("range", None)
+    request.resumable_progress = 0 if received is None else int(received.split("-")[1]) + 1
+    return None
+
+
+# Discovery documents cached on disk are fetched again after this many seconds.
+DISCOVERY_CACHE_TTL = 24 * 60 * 60
+
+# The discovery documents loaded by this process, by API version.
+_discovery_docs: dict[str, str] = {}
+
+
+def _discovery_cache_path(api_version: str) -> pathlib.Path:
+    return utils.cache_dir() / "discovery" / f"generativelanguage_{api_version}.json"
+
+
+def _bundled_discovery_path(api_version: str) -> pathlib.Path:
+    return pathlib.Path(__file__).parent / f"discovery_{api_version}.json"
+
+
+def _fetch_discovery_doc(api_version: str, api_key: str, http: httplib2.Http) -> str:
+    uri = f"{GENAI_API_DISCOVERY_URL}?version={api_version}&key={api_key}"
+    response, content = http.request(uri)
+    if response.status != 200:
+        raise googleapiclient.errors.HttpError(response, content, uri=GENAI_API_DISCOVERY_URL)
+    return content.decode("utf-8")
+
+
+def _load_discovery_doc(api_version: str, api_key: str, http: httplib2.Http) -> str:
+    """The discovery document of `api_version`, fetching it only if there's no fresh copy.
+
+    Fetched documents are cached in `utils.cache_dir()` for `DISCOVERY_CACHE_TTL` seconds. If
+    the fetch fails, a stale cached copy is used, then the copy bundled with the SDK.
+    """
+    doc = _discovery_docs.get(api_version, None)
+    if doc is not None:
+        return doc
+
+    cache_path = _discovery_cache_path(api_version)
+    try:
+        age = time.time() - cache_path.stat().st_mtime
+        cached = cache_path.read_text()
+    except OSError:
+        age, cached = None, None
+
+    if cached is not None and age < DISCOVERY_CACHE_TTL:
+        doc = cached
+    else:
+        try:
+            doc = _fetch_discovery_doc(api_version, api_key, http)
+        except (httplib2.HttpLib2Error, OSError, googleapiclient.errors.HttpError):
+            doc = cached
+            if doc is None:
+                try:
+                    doc = _bundled_discovery_path(api_version).read_text()
+                except OSError:
+                    doc = None
+            if doc is None:
+                raise
+        else:
+            try:
+                _write_atomic(cache_path, doc)
+            except OSError:
+                # A read-only file system, the document is only kept in memory.
+                pass
+
+    _discovery_docs[api_version] = doc
+    return doc
+
+
+# `httplib2.Http` isn't thread safe: each thread keeps its own connections, shared by every
+# `FileServiceClient`, for the discovery document and the uploads.
+_http_local = threading.local()
+
+
+def _get_http() -> httplib2.Http:
+    http = getattr(_http_local, "http", None)
+    if http is None:
+        # Like the discovery client's own: with a timeout, and 308 isn't a redirect (for
+        # resumable uploads).
+        http = googleapiclient.http.build_http()
+        _http_local.http = http
+    return http
+
+
+class _ChunkIteratorUpload(googleapiclient.http.MediaUpload):
+    """A resumable `MediaUpload` of the `bytes` from an iterator, of unknown size until it ends.
+
+    At most about two chunks are buffered: the one being sent, which the server may ask for
+    again from any offset within it, and the next one, read ahead to find where the data ends.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], mimetype: str, chunksize: int):
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._buffer = bytearray()
+        self._buffer_start = 0
+        self._size = None
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def resumable(self):
+        return True
+
+    def _fill(self, end: int):
+        while self._size is None and self._buffer_start + len(self._buffer) < end:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._size = self._buffer_start + len(self._buffer)
+            else:
+                self._buffer += chunk
+
+    def size(self):
+        # The next chunk starts at most a chunk after the current one. One more byte tells
+        # whether it's the last.
+        self._fill(self._buffer_start + 2 * self._chunksize + 1)
+        return self._size
+
+    def getbytes(self, begin, length):
+        if begin < self._buffer_start:
+            raise ValueError(
+                f"Invalid operation: Can't rewind an iterator upload to {begin}, the data before "
+                f"{self._buffer_start} is gone."
+            )
+        del self._buffer[: begin - self._buffer_start]
+        self._buffer_start = begin
+        self._fill(begin + length)
+        return bytes(self._buffer[:length])
+
+    def has_stream(self):
+        return False
+
+
+def _media_upload(
+    source, *, mime_type: str | None, resumable: bool, chunk_size: int | None
+) -> googleapiclient.http.MediaUpload:
+    """Wraps a path, `bytes`, binary file object or iterable of `bytes` for `googleapiclient`."""
+    if chunk_size is None:
+        chunk_size = googleapiclient.http.DEFAULT_CHUNK_SIZE
+    if isinstance(source, (str, os.PathLike)):
+        return googleapiclient.http.MediaFileUpload(
+            filename=source, mimetype=mime_type, chunksize=chunk_size, resumable=resumable
+        )
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if hasattr(source, "read"):
+        if getattr(source, "seekable", lambda: False)():
+            return googleapiclient.http.MediaIoBaseUpload(
+                source, mimetype=mime_type, chunksize=chunk_size, resumable=resumable
+            )
+        source = iter(functools.partial(source.read, chunk_size), b"")
+
+    if not resumable:
+        # A single request needs the size up front.
+        source = io.BytesIO(b"".join(source))
+        return googleapiclient.http.MediaIoBaseUpload(source, mimetype=mime_type, resumable=False)
+    return _ChunkIteratorUpload(source, mimetype=mime_type, chunksize=chunk_size)
+
+
 class FileServiceClient(glm.FileServiceClient):
     def __init__(self, *args, **kwargs):
         self._discovery_api = None
+        self._discovery_lock = threading.Lock()
         super().__init__(*args, **kwargs)
 
+    def _get_http(self) -> httplib2.Http:
+        return _get_http()
+
     def _setup_discovery_api(self):
         api_key = self._client_options.api_key
         if api_key is None:
@@ -57,30 +316,38 @@ class FileServiceClient(glm.FileServiceClient):
                 "Invalid operation: Uploading to the File API requires an API key. Please provide a valid API key."
             )
 
-        request = googleapiclient.http.HttpRequest(
-            http=httplib2.Http(),
-            postproc=lambda resp, content: (resp, content),
-            uri=f"{GENAI_API_DISCOVERY_URL}?version=v1beta&key={api_key}",
-        )
-        response, content = request.execute()
-        request.http.close()
-
-        discovery_doc = content.decode("utf-8")
+        discovery_doc = _load_discovery_doc("v1beta", api_key, self._get_http())
         self._discovery_api = googleapiclient.discovery.build_from_document(
             discovery_doc, developerKey=api_key
         )
 
     def create_file(
         self,
-        path: str | pathlib.Path | os.PathLike,
+        path: str | pathlib.Path | os.PathLike | io.IOBase | bytes | Iterable[bytes],
         *,
         mime_type: str | None = None,
         name: str | None = None,
         display_name: str | None = None,
         resumable: bool = True,
+        chunk_size: int | None = None,
+        resume_state: str | pathlib.Path | os.PathLike | None = None,
     ) -> protos.File:
+        """Uploads a file.
+
+        Args:
+            path: The path of the file, or its contents: `bytes`, a binary file object or an
+                iterable of `bytes` chunks. Streams and iterators are read a chunk at a time, as
+                the upload goes.
+            chunk_size: The size of the chunks of a resumable upload. Defaults to
+                `googleapiclient`'s 100 MiB.
+            resume_state: A JSON file recording the progress of the resumable upload. If it
+                exists, the upload it describes is continued from the last offset the server
+                acknowledged. It's deleted once the upload is done.
+        """
         if self._discovery_api is None:
-            self._setup_discovery_api()
+            with self._discovery_lock:
+                if self._discovery_api is None:
+                    self._setup_discovery_api()
 
         file = {}
         if name is not None:
@@ -88,30 +355,771 @@ class FileServiceClient(glm.FileServiceClient):
         if display_name is not None:
             file["displayName"] = display_name
 
-        media = googleapiclient.http.MediaFileUpload(
-            filename=path, mimetype=mime_type, resumable=resumable
-        )
+        media = _media_upload(path, mime_type=mime_type, resumable=resumable, chunk_size=chunk_size)
         request = self._discovery_api.media().upload(body={"file": file}, media_body=media)
-        result = request.execute()
+        if resume_state is None:
+            result = request.execute(http=self._get_http())
+        else:
+            result = self._execute_resumable(request, pathlib.Path(resume_state))
 
         return self.get_file({"name": result["file"]["name"]})
 
+    def _execute_resumable(self, request, state_path: pathlib.Path):
+        """Runs a resumable upload chunk by chunk, saving its progress to `state_path`."""
+        http = self._get_http()
+        size = request.resumable.size()
+        result = None
+        query_status = False
+        state = _read_upload_state(state_path)
+        if state is not None and state.get("size", None) == size:
+            # The API key isn't saved with the upload URI, the current one is used.
+            request.resumable_uri = _set_query_param(
+                state["upload_uri"], "key", self._client_options.api_key
+            )
+            request.resumable_progress = state["progress"]
+            # The server may have received more than was recorded, this asks it for the offset
+            # before the next chunk is sent.
+            query_status = True
+
+        while result is None:
+            try:
+                if query_status:
+                    query_status = False
+                    result = _query_upload_status(http, request)
+                else:
+                    _, result = request.next_chunk(http=http)
+            except googleapiclient.errors.HttpError as e:
+                if request.resumable_progress == 0 or e.resp.status not in (404, 410):
+                    raise
+                # The upload session expired, start over.
+                request.resumable_uri = None
+                request.resumable_progress = 0
+                continue
+            if result is None:
+                _write_upload_state(
+                    state_path,
+                    {
+                        "upload_uri": _set_query_param(request.resumable_uri, "key", None),
+                        "progress": request.resumable_progress,
+                        "size": size,
+                    },
+                )
+
+        state_path.unlink(missing_ok=True)
+        return result
+
+
+# Transient failures of an upload request, retried from the offset the server acknowledged.
+_RETRIED_UPLOAD_ERRORS = (
+    google.api_core.exceptions.ServerError,
+    google.api_core.exceptions.TooManyRequests,
+    asyncio.TimeoutError,
+)
+_UPLOAD_ATTEMPTS = 5
+
+_sleep_async = asyncio.sleep
+
+
+async def _check_upload_response(response):
+    if response.status >= 400:
+        message = await response.text()
+        raise google.api_core.exceptions.from_http_status(response.status, message)
+
 
 class FileServiceAsyncClient(glm.FileServiceAsyncClient):
-    async def create_file(self, *args, **kwargs):
-        raise NotImplementedError(
-            "The `create_file` method is currently not supported for the asynchronous client."
-        )
+    # The default size of the chunks of a resumable upload, read from the source as they're
+    # sent.
+    chunk_size = 8 * 2**20
+
+    def __init__(self, **kwargs):
+        # Without `aiohttp`, uploads go through a synchronous client built from the same config,
+        # with its default transport.
+        self._sync_config = {k: v for k, v in kwargs.items() if k != "transport"}
+        self._sync_client = None
+        super().__init__(**kwargs)
+
+    def _get_sync_client(self) -> FileServiceClient:
+        if self._sync_client is None:
+            self._sync_client = FileServiceClient(**self._sync_config)
+        return self._sync_client
+
+    async def create_file(
+        self,
+        path: str | pathlib.Path | os.PathLike | io.IOBase | bytes | Iterable[bytes],
+        *,
+        mime_type: str | None = None,
+        name: str | None = None,
+        display_name: str | None = None,
+        resumable: bool = True,
+        chunk_size: int | None = None,
+    ) -> protos.File:
+        """Uploads a file with the resumable upload protocol, over `aiohttp`.
+
+        Like the synchronous `create_file`, `path` can also be the contents to upload. The file is
+        sent in chunks of `chunk_size` bytes (a single chunk if `resumable` is
+        `False`), each read only once the previous one was accepted. A chunk that fails with a
+        transient error is resent from the offset the server acknowledged. Cancelling the task
+        stops the upload.
+
+        Without `aiohttp` installed, the synchronous client uploads the file from a worker
+        thread instead.
+        """
+        if aiohttp is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None,
+                functools.partial(
+                    self._get_sync_client().create_file,
+                    path,
+                    mime_type=mime_type,
+                    name=name,
+                    display_name=display_name,
+                    resumable=resumable,
+                    chunk_size=chunk_size,
+                ),
+            )
+
+        api_key = self._client._client_options.api_key
+        if api_key is None:
+            raise ValueError(
+                "Invalid operation: Uploading to the File API requires an API key. Please provide a valid API key."
+            )
+
+        file = {}
+        if name is not None:
+            file["name"] = name
+        if display_name is not None:
+            file["displayName"] = display_name
+
+        if chunk_size is None:
+            chunk_size = self.chunk_size
+        media = _media_upload(path, mime_type=mime_type, resumable=True, chunk_size=chunk_size)
+        loop = asyncio.get_running_loop()
+        # Unknown for iterators, until their last chunk is read.
+        size = await loop.run_in_executor(None, media.size)
+        if not resumable and size is not None:
+            chunk_size = max(size, 1)
+
+        async with aiohttp.ClientSession(headers={"x-goog-api-key": api_key}) as session:
+            headers = {
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Type": mime_type or "application/octet-stream",
+            }
+            if size is not None:
+                headers["X-Goog-Upload-Header-Content-Length"] = str(size)
+            async with session.post(
+                _upload_url(self.api_endpoint), headers=headers, json={"file": file}
+            ) as response:
+                await _check_upload_response(response)
+                upload_url = response.headers["X-Goog-Upload-URL"]
+                granularity = int(response.headers.get("X-Goog-Upload-Chunk-Granularity", 1))
+
+            if size is None or chunk_size < size:
+                # All chunks but the last must be a multiple of the granularity.
+                chunk_size = max(granularity, chunk_size - chunk_size % granularity)
+            result = await self._upload_chunks(session, upload_url, media, chunk_size)
+
+        return await self.get_file({"name": result["file"]["name"]})
+
+    async def _upload_chunks(self, session, upload_url, media, chunk_size):
+        loop = asyncio.get_running_loop()
+        offset = 0
+        attempt = 0
+        while True:
+            try:
+                if offset is None:
+                    offset = await self._query_offset(session, upload_url)
+                chunk = await loop.run_in_executor(None, media.getbytes, offset, chunk_size)
+                size = await loop.run_in_executor(None, media.size)
+                final = size is not None and offset + len(chunk) >= size
+                headers = {
+                    "X-Goog-Upload-Command": "upload, finalize" if final else "upload",
+                    "X-Goog-Upload-Offset": str(offset),
+                }
+                async with session.post(upload_url, headers=headers, data=chunk) as response:
+                    await _check_upload_response(response)
+                    if final:
+                        return await response.json()
+                offset += len(chunk)
+                attempt = 0
+            except (aiohttp.ClientError, *_RETRIED_UPLOAD_ERRORS):
+                attempt += 1
+                if attempt >= _UPLOAD_ATTEMPTS:
+                    raise
+                await _sleep_async(0.5 * 2**attempt)
+                # Resume from what the server received.
+                offset = None
+
+    async def _query_offset(self, session, upload_url) -> int:
+        headers = {"X-Goog-Upload-Command": "query"}
+        async with session.post(upload_url, headers=headers) as response:
+            await _check_upload_response(response)
+            return int(response.headers["X-Goog-Upload-Size-Received"])
+
+
+def _is_rpc_method(name, f) -> bool:
+    if name.startswith("_"):
+        return False
+    elif name == "create_file":
+        return False
+    elif not isinstance(f, types.FunctionType):
+        return False
+    elif isinstance(f, classmethod):
+        return False
+    elif isinstance(f, staticmethod):
+        return False
+    else:
+        return True
+
+
+class _TrackedStream:
+    """Wraps a streaming response, and calls `on_done(error)` once the stream ends or fails."""
+
+    def __init__(self, stream, on_done):
+        self._stream = stream
+        self._iterator = None
+        self._on_done = on_done
+
+    def _done(self, error=None):
+        on_done, self._on_done = self._on_done, None
+        if on_done is not None:
+            on_done(error)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            if self._iterator is None:
+                self._iterator = iter(self._stream)
+            return next(self._iterator)
+        except StopIteration:
+            self._done()
+            raise
+        except BaseException as e:
+            self._done(e)
+            raise
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            if self._iterator is None:
+                # `grpc.aio` calls are only async iterables, not iterators.
+                self._iterator = self._stream.__aiter__()
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._done()
+            raise
+        except BaseException as e:
+            self._done(e)
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __del__(self):
+        self._done()
+
+
+def _wrap_call(call, *, acquire, release, is_async: bool, streaming: bool):
+    """Brackets each call with `token = acquire()` and `release(token, error)`.
+
+    `call(token, *args, **kwargs)` makes the call. For streaming calls `release` runs once the
+    stream ends. In async wrappers `acquire` and `call` may return awaitables.
+    """
+    if is_async:
+
+        async def wrapper(*args, **kwargs):
+            token = acquire()
+            if inspect.isawaitable(token):
+                token = await token
+            try:
+                result = call(token, *args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+            except BaseException as e:
+                release(token, e)
+                raise
+
+            if streaming:
+                return _TrackedStream(result, functools.partial(release, token))
+            release(token, None)
+            return result
+
+    else:
+
+        def wrapper(*args, **kwargs):
+            token = acquire()
+            try:
+                result = call(token, *args, **kwargs)
+            except BaseException as e:
+                release(token, e)
+                raise
+
+            if streaming:
+                return _TrackedStream(result, functools.partial(release, token))
+            release(token, None)
+            return result
+
+    return wrapper
+
+
+def _wrap_rpc_methods(client, cls, wrapper):
+    """Replaces each of the client's RPC methods `f` with `wrapper(name, f)`."""
+    for name, value in cls.__dict__.items():
+        if not _is_rpc_method(name, value):
+            continue
+        setattr(client, name, wrapper(name, getattr(client, name)))
+    return client
+
+
+def _hedge_rpc(is_async: bool, name, f):
+    """Handles the `hedging` request option, see `HedgingPolicy`."""
+    streaming = name.startswith("stream_")
+
+    def check():
+        if name not in hedging_lib.IDEMPOTENT_METHODS:
+            raise ValueError(
+                f"Invalid request option: `hedging` isn't supported for `{name}`, only for "
+                f"idempotent calls: {sorted(hedging_lib.IDEMPOTENT_METHODS)}."
+            )
+
+    if is_async:
+
+        async def call(*args, hedging=None, **kwargs):
+            if hedging is None:
+                return await f(*args, **kwargs)
+            check()
+            return await hedging_lib.hedge_async(hedging, f, streaming, args, kwargs)
+
+    else:
+
+        def call(*args, hedging=None, **kwargs):
+            if hedging is None:
+                return f(*args, **kwargs)
+            check()
+            return hedging_lib.hedge(hedging, f, streaming, args, kwargs)
+
+    return call
+
+
+def _budget_retries(budget: retry_budget_lib.RetryBudget, name, f):
+    """Makes a `retry` passed to the call (like `RequestOptions(retry=...)`) spend `budget`."""
+
+    def call(*args, **kwargs):
+        if "retry" in kwargs:
+            kwargs["retry"] = retry_budget_lib.with_budget(kwargs["retry"], budget)
+        return f(*args, **kwargs)
+
+    return call
+
+
+def _schedule(scheduler: scheduling.PriorityScheduler | None, is_async: bool, name, f):
+    """Handles the `priority` request option, queueing the call in the `scheduler`."""
+    streaming = name.startswith("stream_")
+
+    def start(wait, kwargs):
+        scheduling._queue_wait.set(wait)
+        timeout = kwargs.get("timeout", None)
+        if isinstance(timeout, (int, float)):
+            # The time spent queued counts against the call's timeout.
+            kwargs["timeout"] = max(0.0, timeout - wait)
+
+    def finish(result):
+        if streaming:
+            return _TrackedStream(result, lambda error: scheduler.release())
+        scheduler.release()
+        return result
+
+    def get_timeout(kwargs):
+        timeout = kwargs.get("timeout", None)
+        return timeout if isinstance(timeout, (int, float)) else None
+
+    if is_async:
+
+        async def call(*args, priority=None, **kwargs):
+            if scheduler is None:
+                return await f(*args, **kwargs)
+            wait = await scheduler.acquire_async(priority, get_timeout(kwargs))
+            start(wait, kwargs)
+            try:
+                result = await f(*args, **kwargs)
+            except BaseException:
+                scheduler.release()
+                raise
+            return finish(result)
+
+    else:
+
+        def call(*args, priority=None, **kwargs):
+            if scheduler is None:
+                return f(*args, **kwargs)
+            wait = scheduler.acquire(priority, get_timeout(kwargs))
+            start(wait, kwargs)
+            try:
+                result = f(*args, **kwargs)
+            except BaseException:
+                scheduler.release()
+                raise
+            return finish(result)
+
+    return call
+
+
+# How `_ClientPool` picks a client for each call.
+SELECTION_STRATEGIES = ("round_robin", "least_loaded", "most_quota")
+
+# Errors that mean a credential's quota is spent.
+_QUOTA_ERRORS = (
+    google.api_core.exceptions.ResourceExhausted,
+    google.api_core.exceptions.TooManyRequests,
+)
+# Seconds a credential is skipped after a quota error, unless the server asks for longer.
+_QUOTA_PENALTY = 60.0
+# Quotas are per minute, so "most_quota" counts the calls over the last minute.
+_QUOTA_WINDOW = 60.0
+
+
+def _uses_project_resources(value) -> bool:
+    """Whether a request refers to uploaded files, cached content or a tuned model.
+
+    These belong to the project that created them, only its credential can use them. `value`
+    is a request, or its fields: a proto message, a `dict`, or a list of those.
+    """
+    value = utils.to_pb(value)
+    if isinstance(value, message_lib.Message):
+        for field, item in value.ListFields():
+            if field.name in ("file_data", "cached_content"):
+                return True
+            if field.name == "model" and item.startswith("tunedModels/"):
+                return True
+            if field.type != field.TYPE_MESSAGE:
+                continue
+            items = item if field.label == field.LABEL_REPEATED else [item]
+            if any(_uses_project_resources(i) for i in items):
+                return True
+    elif isinstance(value, Mapping):
+        for key, item in value.items():
+            if key in ("file_data", "cached_content") and item:
+                return True
+            if key == "model" and isinstance(item, str) and item.startswith("tunedModels/"):
+                return True
+            if _uses_project_resources(item):
+                return True
+    elif isinstance(value, (list, tuple)):
+        return any(_uses_project_resources(item) for item in value)
+    return False
+
+
+class _ClientPool:
+    """Spreads calls across several clients, each with its own channel or credential.
+
+    A single HTTP/2 connection limits the number of concurrent streams, so under heavy
+    concurrency the pool sends each call to the client with the fewest outstanding calls,
+    breaking ties round-robin. Streaming calls stay outstanding until the stream is
+    exhausted.
+
+    Clients that share a credential share a `key`. When a call fails with
+    `ResourceExhausted` its key is skipped for a while (the server's retry-after hint, or
+    a minute), unless every key is penalized. The `strategy` picks among the other clients:
+
+    * `"least_loaded"`: The fewest outstanding calls, as above.
+    * `"round_robin"`: Each client in turn.
+    * `"most_quota"`: The key with the fewest calls over the last minute, so the most
+      per-minute quota left when the keys' quotas are equal.
+
+    Requests that use uploaded files, cached content or tuned models only go to the clients
+    with the first key: those resources belong to its project.
+
+    Attributes other than the RPC methods are read from the first client.
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[Any],
+        *,
+        is_async: bool = False,
+        keys: Sequence[int] | None = None,
+        strategy: str = "least_loaded",
+        clock=time.monotonic,
+    ):
+        if not clients:
+            raise ValueError("Invalid input: A `_ClientPool` requires at least one client.")
+        if strategy not in SELECTION_STRATEGIES:
+            raise ValueError(
+                f"Invalid input: `strategy` must be one of {SELECTION_STRATEGIES}. Received: {strategy!r}."
+            )
+        if keys is None:
+            keys = range(len(clients))
+        self._clients = list(clients)
+        self._keys = list(keys)
+        self._strategy = strategy
+        self._clock = clock
+        self._outstanding = [0] * len(self._clients)
+        self._next = 0
+        self._penalized_until: dict[int, float] = {}
+        self._recent_calls: dict[int, collections.deque[float]] = {
+            key: collections.deque() for key in self._keys
+        }
+        self._lock = threading.Lock()
+
+        for name, value in type(self._clients[0]).__dict__.items():
+            if not _is_rpc_method(name, value):
+                continue
+            setattr(self, name, self._make_method(name, is_async))
+
+    @property
+    def clients(self) -> tuple[Any, ...]:
+        return tuple(self._clients)
+
+    @property
+    def outstanding(self) -> list[int]:
+        """The number of in-flight calls on each of the pool's clients."""
+        with self._lock:
+            return list(self._outstanding)
+
+    @property
+    def penalties(self) -> dict[int, float]:
+        """The seconds left on each penalized key's penalty."""
+        with self._lock:
+            now = self._clock()
+            return {key: until - now for key, until in self._penalized_until.items() if until > now}
+
+    def _calls_in_window(self, key: int, now: float) -> int:
+        calls = self._recent_calls[key]
+        while calls and calls[0] <= now - _QUOTA_WINDOW:
+            calls.popleft()
+        return len(calls)
+
+    def _checkout(self, pinned: bool = False) -> int:
+        with self._lock:
+            now = self._clock()
+            size = len(self._clients)
+            candidates = [(self._next + n) % size for n in range(size)]
+            if pinned:
+                candidates = [i for i in candidates if self._keys[i] == self._keys[0]]
+            available = [
+                i for i in candidates if self._penalized_until.get(self._keys[i], 0.0) <= now
+            ]
+            if not available:
+                # Every key is penalized, use the one that recovers first.
+                available = [min(candidates, key=lambda i: self._penalized_until[self._keys[i]])]
+
+            if self._strategy == "round_robin":
+                index = available[0]
+            elif self._strategy == "most_quota":
+                index = min(
+                    available,
+                    key=lambda i: (self._calls_in_window(self._keys[i], now), self._outstanding[i]),
+                )
+            else:
+                index = min(available, key=lambda i: self._outstanding[i])
+
+            self._next = (index + 1) % size
+            self._outstanding[index] += 1
+            if self._strategy == "most_quota":
+                self._recent_calls[self._keys[index]].append(now)
+            return index
+
+    def _checkin(self, index: int, error: BaseException | None = None):
+        with self._lock:
+            self._outstanding[index] -= 1
+            if isinstance(error, _QUOTA_ERRORS):
+                penalty = retry_budget_lib.retry_after(error) or _QUOTA_PENALTY
+                key = self._keys[index]
+                self._penalized_until[key] = max(
+                    self._penalized_until.get(key, 0.0), self._clock() + penalty
+                )
+
+    def _make_method(self, name, is_async):
+        def call(index, *args, **kwargs):
+            return getattr(self._clients[index], name)(*args, **kwargs)
+
+        methods = {
+            pinned: _wrap_call(
+                call,
+                acquire=functools.partial(self._checkout, pinned),
+                release=self._checkin,
+                is_async=is_async,
+                streaming=name.startswith("stream_"),
+            )
+            for pinned in (False, True)
+        }
+
+        def method(*args, **kwargs):
+            pinned = len(set(self._keys)) > 1 and _uses_project_resources([args, kwargs])
+            return methods[pinned](*args, **kwargs)
+
+        return method
+
+    def __getattr__(self, name):
+        return getattr(self._clients[0], name)
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class _LoopLocal:
+    """Holds one value per event loop.
+
+    `grpc.aio` objects are bound to the event loop that created them, so async clients can't
+    be shared between loops. Whenever a value is added, the values for loops that have been
+    closed are dropped and passed to `on_evict`.
+    """
+
+    def __init__(self, on_evict=None):
+        self._values: dict[asyncio.AbstractEventLoop | None, Any] = {}
+        self._on_evict = on_evict
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self):
+        return self._values.get(_running_loop(), None)
+
+    def set(self, value):
+        loop = _running_loop()
+        with self._lock:
+            closed = [key for key in self._values if key is not None and key.is_closed()]
+            evicted = [self._values.pop(key) for key in closed]
+            self._values[loop] = value
+
+        if self._on_evict is not None:
+            for old_value in evicted:
+                self._on_evict(old_value)
+
+
+# Keeps references to the tasks closing evicted channels until they finish.
+_closing_tasks: set[asyncio.Task] = set()
+
+
+def _close_async_client(client):
+    """Closes the channels of an async client whose event loop has been closed."""
+    if isinstance(client, _ClientPool):
+        clients = client.clients
+    else:
+        clients = [client]
+
+    for client in clients:
+        transport = getattr(client, "transport", None)
+        if transport is None:
+            continue
+
+        closing = transport.close()
+        if not inspect.isawaitable(closing):
+            continue
+
+        # The channel's own loop is closed, so close it on this one.
+        loop = _running_loop()
+        if loop is not None:
+            task = loop.create_task(closing)
+            _closing_tasks.add(task)
+            task.add_done_callback(_closing_tasks.discard)
+        else:
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(closing)
+            finally:
+                loop.close()
+
+
+# These clients are spread across `pool_size` channels, and use the `concurrency_limiter`.
+_GENERATIVE_CLIENTS = ("generative", "generative_async")
+# These clients accept the `priority` request option, and share the `scheduler`.
+_SCHEDULED_CLIENTS = _GENERATIVE_CLIENTS + ("retriever", "retriever_async")
+
+
+def _limit_concurrency(limiter: concurrency.AdaptiveConcurrencyLimiter, is_async: bool, name, f):
+    streaming = name.startswith("stream_")
+
+    def call(permit, *args, **kwargs):
+        return f(*args, **kwargs)
+
+    def release(permit, error):
+        # A stream's duration depends on the length of the response, so it's not a useful signal.
+        limiter.release(permit, error=error, track_latency=not streaming)
+
+    return _wrap_call(
+        call,
+        acquire=limiter.acquire_async if is_async else limiter.acquire,
+        release=release,
+        is_async=is_async,
+        streaming=streaming,
+    )
+
+
+def _pooled_transport(cls, transport: str | None):
+    """Returns a transport factory that gives each client a private connection.
+
+    gRPC shares connections between channels with identical arguments, so the
+    pooled channels opt out of the global subchannel pool.
+    """
+    transport_cls = cls.get_transport_class(transport)
+    if not hasattr(transport_cls, "create_channel"):
+        # REST transports already get a separate session per client.
+        return transport
+
+    def create_channel(*args, options=(), **kwargs):
+        options = list(options) + [("grpc.use_local_subchannel_pool", 1)]
+        return transport_cls.create_channel(*args, options=options, **kwargs)
+
+    return functools.partial(transport_cls, channel=create_channel)
+
+
+def _credential_config(client_config: dict[str, Any], credential) -> dict[str, Any]:
+    """Returns a copy of `client_config` that authenticates with `credential`.
+
+    The `credential` is either an API key or a `google.auth` `Credentials` object.
+    """
+    client_config = dict(client_config)
+    client_options = copy.copy(client_config["client_options"])
+    if isinstance(credential, str):
+        client_options.api_key = credential
+        client_config.pop("credentials", None)
+    else:
+        client_options.api_key = None
+        client_config["credentials"] = credential
+    client_config["client_options"] = client_options
+    return client_config
+
+
+def _to_model_name(name: str) -> str:
+    if "/" not in name:
+        name = "models/" + name
+    return name
 
 
 @dataclasses.dataclass
 class _ClientManager:
     client_config: dict[str, Any] = dataclasses.field(default_factory=dict)
     default_metadata: Sequence[tuple[str, str]] = ()
+    pool_size: int = 1
+    credential_pool: list[str | ga_credentials.Credentials] = dataclasses.field(
+        default_factory=list
+    )
+    credential_selection: str = "least_loaded"
+    rate_limiters: dict[str, rate_limiting.RateLimiter] = dataclasses.field(default_factory=dict)
+    concurrency_limiter: concurrency.AdaptiveConcurrencyLimiter | None = None
+    circuit_breaker_options: dict[str, Any] | None = None
+    circuit_breakers: dict[str, circuit_breaker.CircuitBreaker] = dataclasses.field(
+        default_factory=dict
+    )
+    circuit_breakers_lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    retry_budget: retry_budget_lib.RetryBudget | None = None
+    scheduler: scheduling.PriorityScheduler | None = None
 
     discuss_client: glm.DiscussServiceClient | None = None
     discuss_async_client: glm.DiscussServiceAsyncClient | None = None
     clients: dict[str, Any] = dataclasses.field(default_factory=dict)
+    loop_clients: dict[str, _LoopLocal] = dataclasses.field(default_factory=dict)
 
     def configure(
         self,
@@ -128,6 +1136,14 @@ class _ClientManager:
         client_options: client_options_lib.ClientOptions | dict[str, Any] | None = None,
         client_info: gapic_v1.client_info.ClientInfo | None = None,
         default_metadata: Sequence[tuple[str, str]] = (),
+        pool_size: int = 1,
+        credential_pool: Sequence[str | ga_credentials.Credentials] | None = None,
+        credential_selection: str = "least_loaded",
+        rate_limits: Mapping[str, rate_limiting.RateLimiterOptions] | None = None,
+        concurrency_limiter: bool | concurrency.AdaptiveConcurrencyLimiter | None = None,
+        circuit_breakers: circuit_breaker.CircuitBreakerOptions | None = None,
+        retry_budget: bool | retry_budget_lib.RetryBudget = True,
+        scheduler: bool | scheduling.PriorityScheduler | None = None,
     ) -> None:
         """Initializes default client configurations using specified parameters or environment variables.
 
@@ -145,7 +1161,42 @@ class _ClientManager:
                 used.
             default_metadata: Default (key, value) metadata pairs to send with every request.
                 when using `transport="rest"` these are sent as HTTP headers.
+            pool_size: The number of channels to spread `generative` client calls across.
+                Each channel is a separate connection, use this when many concurrent
+                (streaming) calls queue behind a single connection's stream limit.
+            credential_pool: API keys or `Credentials` to spread `generative` client calls
+                across, in place of `api_key` or `credentials`.
+            credential_selection: How a credential is picked for each call, one of
+                `"least_loaded"`, `"round_robin"` or `"most_quota"`.
+            rate_limits: A `{model_name: limiter}` mapping, see `genai.RateLimiter`. Calls to
+                each model are paced by its limiter.
+            concurrency_limiter: `True`, or a `concurrency.AdaptiveConcurrencyLimiter`, to adapt
+                the number of concurrent `generative` client calls to the service's capacity.
+            circuit_breakers: `True`, or a dict of `circuit_breaker.CircuitBreaker` arguments,
+                to give each model a circuit breaker.
+            retry_budget: A `retry_budget.RetryBudget` shared by the retries of every client,
+                `True` for the default budget, or `False` to retry without a budget.
+            scheduler: `True`, or a `scheduling.PriorityScheduler`, to queue the `generative`
+                and `retriever` client calls by their `priority` request option.
         """
+        if not isinstance(pool_size, int) or pool_size < 1:
+            raise ValueError(
+                f"Invalid configuration: `pool_size` must be a positive integer. Received: {pool_size}."
+            )
+
+        if credential_selection not in SELECTION_STRATEGIES:
+            raise ValueError(
+                f"Invalid configuration: `credential_selection` must be one of {SELECTION_STRATEGIES}. "
+                f"Received: {credential_selection!r}."
+            )
+        credential_pool = list(credential_pool or [])
+        for credential in credential_pool:
+            if not isinstance(credential, (str, ga_credentials.Credentials)):
+                raise TypeError(
+                    "Invalid input type. Expected an API key (`str`) or a `Credentials` object in `credential_pool`.\n"
+                    f"However, received an object of type: {type(credential)}."
+                )
+
         if isinstance(client_options, dict):
             client_options = client_options_lib.from_dict(client_options)
         if client_options is None:
@@ -153,7 +1204,12 @@ class _ClientManager:
         client_options = cast(client_options_lib.ClientOptions, client_options)
         had_api_key_value = getattr(client_options, "api_key", None)
 
-        if had_api_key_value:
+        if credential_pool:
+            if api_key is not None or credentials is not None or had_api_key_value:
+                raise ValueError(
+                    "Invalid configuration: Please set either `credential_pool`, or `api_key` and `credentials`, but not both."
+                )
+        elif had_api_key_value:
             if api_key is not None:
                 raise ValueError(
                     "Invalid configuration: Please set either `api_key` or `client_options['api_key']`, but not both."
@@ -184,13 +1240,52 @@ class _ClientManager:
         }
 
         client_config = {key: value for key, value in client_config.items() if value is not None}
+        if credential_pool:
+            # Clients that aren't pooled use the first credential.
+            client_config = _credential_config(client_config, credential_pool[0])
 
         self.client_config = client_config
         self.default_metadata = default_metadata
+        self.pool_size = pool_size
+        self.credential_pool = credential_pool
+        self.credential_selection = credential_selection
+
+        if rate_limits is None:
+            rate_limits = {}
+        self.rate_limiters = {
+            _to_model_name(name): rate_limiting.to_rate_limiter(limiter)
+            for name, limiter in rate_limits.items()
+        }
+
+        if concurrency_limiter is True:
+            concurrency_limiter = concurrency.AdaptiveConcurrencyLimiter()
+        elif concurrency_limiter is False:
+            concurrency_limiter = None
+        self.concurrency_limiter = concurrency_limiter
+
+        self.circuit_breaker_options = circuit_breaker.to_circuit_breaker_options(circuit_breakers)
+        self.circuit_breakers = {}
+
+        if retry_budget is True:
+            retry_budget = retry_budget_lib.RetryBudget()
+        elif retry_budget is False:
+            retry_budget = None
+        self.retry_budget = retry_budget
+
+        if scheduler is True:
+            scheduler = scheduling.PriorityScheduler()
+        elif scheduler is False:
+            scheduler = None
+        self.scheduler = scheduler
 
         self.clients = {}
+        self.loop_clients = {}
 
     def make_client(self, name):
+        is_async = name.endswith("_async")
+        generative = name in _GENERATIVE_CLIENTS
+        scheduled = name in _SCHEDULED_CLIENTS
+
         if name == "file":
             cls = FileServiceClient
         elif name == "file_async":
@@ -205,9 +1300,48 @@ class _ClientManager:
         if not self.client_config:
             configure()
 
+        if generative and (self.pool_size > 1 or len(self.credential_pool) > 1):
+            client_config = dict(self.client_config)
+            if self.pool_size > 1:
+                transport = client_config.get("transport", None)
+                if is_async and transport is None:
+                    transport = "grpc_asyncio"
+                client_config["transport"] = _pooled_transport(cls, transport)
+
+            clients = []
+            keys = []
+            for key, credential in enumerate(self.credential_pool or [None]):
+                if credential is not None:
+                    config = _credential_config(client_config, credential)
+                else:
+                    config = client_config
+                clients.extend(self._make_client(cls, config) for _ in range(self.pool_size))
+                keys.extend([key] * self.pool_size)
+            client = _ClientPool(
+                clients, is_async=is_async, keys=keys, strategy=self.credential_selection
+            )
+        else:
+            client = self._make_client(cls, self.client_config)
+
+        if generative and self.concurrency_limiter is not None:
+            wrapper = functools.partial(_limit_concurrency, self.concurrency_limiter, is_async)
+            client = _wrap_rpc_methods(client, cls, wrapper)
+
+        if generative:
+            # Outermost, so each attempt of a hedged call gets its own permit and channel.
+            client = _wrap_rpc_methods(client, cls, functools.partial(_hedge_rpc, is_async))
+
+        if scheduled:
+            # Outside the hedging, a call's hedges don't queue again.
+            wrapper = functools.partial(_schedule, self.scheduler, is_async)
+            client = _wrap_rpc_methods(client, cls, wrapper)
+
+        return client
+
+    def _make_client(self, cls, client_config):
         try:
             with patch_colab_gce_credentials():
-                client = cls(**self.client_config)
+                client = cls(**client_config)
         except ga_exceptions.DefaultCredentialsError as e:
             e.args = (
                 "\n  No API_KEY or ADC found. Please either:\n"
@@ -217,38 +1351,24 @@ class _ClientManager:
             )
             raise e
 
+        if self.retry_budget is not None:
+            retry_budget_lib.apply_to_transport(
+                getattr(client, "transport", None), self.retry_budget
+            )
+            wrapper = functools.partial(_budget_retries, self.retry_budget)
+            client = _wrap_rpc_methods(client, cls, wrapper)
+
         if not self.default_metadata:
             return client
 
-        def keep(name, f):
-            if name.startswith("_"):
-                return False
-            elif name == "create_file":
-                return False
-            elif not isinstance(f, types.FunctionType):
-                return False
-            elif isinstance(f, classmethod):
-                return False
-            elif isinstance(f, staticmethod):
-                return False
-            else:
-                return True
-
-        def add_default_metadata_wrapper(f):
+        def add_default_metadata_wrapper(name, f):
             def call(*args, metadata=(), **kwargs):
                 metadata = list(metadata) + list(self.default_metadata)
                 return f(*args, **kwargs, metadata=metadata)
 
             return call
 
-        for name, value in cls.__dict__.items():
-            if not keep(name, value):
-                continue
-            f = getattr(client, name)
-            f = add_default_metadata_wrapper(f)
-            setattr(client, name, f)
-
-        return client
+        return _wrap_rpc_methods(client, cls, add_default_metadata_wrapper)
 
     def get_default_client(self, name):
         name = name.lower()
@@ -256,11 +1376,40 @@ class _ClientManager:
             return self.get_default_operations_client()
 
         client = self.clients.get(name)
-        if client is None:
-            client = self.make_client(name)
-            self.clients[name] = client
+        if client is not None:
+            return client
+
+        if name.endswith("_async"):
+            # Async clients are cached per event loop.
+            loop_clients = self.loop_clients.get(name, None)
+            if loop_clients is None:
+                loop_clients = _LoopLocal(on_evict=_close_async_client)
+                self.loop_clients[name] = loop_clients
+
+            client = loop_clients.get()
+            if client is None:
+                client = self.make_client(name)
+                loop_clients.set(client)
+            return client
+
+        client = self.make_client(name)
+        self.clients[name] = client
         return client
 
+    def get_rate_limiter(self, model_name: str) -> rate_limiting.RateLimiter | None:
+        return self.rate_limiters.get(_to_model_name(model_name), None)
+
+    def get_circuit_breaker(self, model_name: str) -> circuit_breaker.CircuitBreaker | None:
+        if self.circuit_breaker_options is None:
+            return None
+        model_name = _to_model_name(model_name)
+        with self.circuit_breakers_lock:
+            breaker = self.circuit_breakers.get(model_name, None)
+            if breaker is None:
+                breaker = circuit_breaker.CircuitBreaker(**self.circuit_breaker_options)
+                self.circuit_breakers[model_name] = breaker
+            return breaker
+
     def get_default_operations_client(self) -> operations_v1.OperationsClient:
         client = self.clients.get("operations", None)
         if client is None:
@@ -284,6 +1433,14 @@ def configure(
     client_options: client_options_lib.ClientOptions | dict | None = None,
     client_info: gapic_v1.client_info.ClientInfo | None = None,
     default_metadata: Sequence[tuple[str, str]] = (),
+    pool_size: int = 1,
+    credential_pool: Sequence[str | ga_credentials.Credentials] | None = None,
+    credential_selection: str = "least_loaded",
+    rate_limits: Mapping[str, rate_limiting.RateLimiterOptions] | None = None,
+    concurrency_limiter: bool | concurrency.AdaptiveConcurrencyLimiter | None = None,
+    circuit_breakers: circuit_breaker.CircuitBreakerOptions | None = None,
+    retry_budget: bool | retry_budget_lib.RetryBudget = True,
+    scheduler: bool | scheduling.PriorityScheduler | None = None,
 ):
     """Captures default client configuration.
 
@@ -301,6 +1458,49 @@ def configure(
             used.
         default_metadata: Default (key, value) metadata pairs to send with every request.
             when using `transport="rest"` these are sent as HTTP headers.
+        pool_size: The number of channels to spread `generative` client calls across.
+            Each channel is a separate connection, use this when many concurrent
+            (streaming) calls queue behind a single connection's stream limit.
+            The pooled client's `outstanding` attribute reports the in-flight calls
+            per channel.
+        credential_pool: A list of API keys and/or `Credentials` (for example, one per
+            project), used instead of `api_key` and `credentials`. The `generative` client
+            calls (generation, embeddings, token counting) are spread across them, so a single
+            process can use each credential's quota. A credential whose call fails with
+            `ResourceExhausted` is skipped for a while. Other services use the first
+            credential, so uploaded files, cached content and tuned models belong to its
+            project, and the calls that use them are only sent with it. With `pool_size`, each credential gets `pool_size` channels. The pooled
+            client's `penalties` attribute reports the penalized credentials, by index.
+        credential_selection: How the `credential_pool` is shared: `"least_loaded"` (the
+            default) picks the credential with the fewest in-flight calls, `"round_robin"`
+            takes each in turn, and `"most_quota"` picks the one with the fewest calls over
+            the last minute.
+        rate_limits: A `{model_name: limiter}` mapping, the limiters are `genai.RateLimiter`
+            objects or dicts of their arguments. Calls to each model (`generate_content`,
+            `count_tokens`, and `embed_content`) wait for capacity from its limiter.
+        concurrency_limiter: `True` (for the default settings), or a
+            `concurrency.AdaptiveConcurrencyLimiter`. Limits the number of concurrent calls
+            through the `generative` clients (generation, embeddings, token counting), backing
+            off when the service reports it's overloaded. Read its `limit` and `queue_depth`
+            from `get_default_concurrency_limiter()`.
+        circuit_breakers: `True` (for the default settings), or a dict of
+            `circuit_breaker.CircuitBreaker` arguments. Each model gets its own breaker, which
+            stops `generate_content` calls to the model while it's failing. Calls fail fast with
+            a `circuit_breaker.CircuitOpenError`, or go to the model's `fallback_models`. Read a
+            model's breaker with `get_default_circuit_breaker(model_name)`.
+        retry_budget: A `retry_budget.RetryBudget`, `True` (the default) for the default
+            budget, or `False` to disable it. The budget is shared by every client's retries,
+            both the clients' default retries and `RequestOptions(retry=...)`: retries are
+            capped at a fraction of the recent successful calls, and back off with full jitter,
+            honouring the server's retry-after hints. Read its `retries_attempted` and
+            `retries_denied` counters from `get_default_retry_budget()`.
+        scheduler: `True` (for the default settings), or a `scheduling.PriorityScheduler`.
+            Queues the calls through the `generative` and `retriever` clients (generation,
+            embeddings, token counting, semantic retrieval) under a shared concurrency ceiling,
+            by their `RequestOptions(priority=...)` class. Queued calls whose timeout passes
+            are dropped. Each `GenerateContentResponse` reports its `queue_wait`, for other
+            calls read `scheduling.last_queue_wait()`. Read the scheduler's `in_flight` and
+            `queue_depths` from `get_default_scheduler()`.
     """
     return _client_manager.configure(
         api_key=api_key,
@@ -309,6 +1509,14 @@ def configure(
         client_options=client_options,
         client_info=client_info,
         default_metadata=default_metadata,
+        pool_size=pool_size,
+        credential_pool=credential_pool,
+        credential_selection=credential_selection,
+        rate_limits=rate_limits,
+        concurrency_limiter=concurrency_limiter,
+        circuit_breakers=circuit_breakers,
+        retry_budget=retry_budget,
+        scheduler=scheduler,
     )
 
 
@@ -344,6 +1552,26 @@ def get_default_generative_async_client() -> glm.GenerativeServiceAsyncClient:
     return _client_manager.get_default_client("generative_async")
 
 
+def get_default_rate_limiter(model_name: str) -> rate_limiting.RateLimiter | None:
+    return _client_manager.get_rate_limiter(model_name)
+
+
+def get_default_concurrency_limiter() -> concurrency.AdaptiveConcurrencyLimiter | None:
+    return _client_manager.concurrency_limiter
+
+
+def get_default_circuit_breaker(model_name: str) -> circuit_breaker.CircuitBreaker | None:
+    return _client_manager.get_circuit_breaker(model_name)
+
+
+def get_default_retry_budget() -> retry_budget_lib.RetryBudget | None:
+    return _client_manager.retry_budget
+
+
+def get_default_scheduler() -> scheduling.PriorityScheduler | None:
+    return _client_manager.scheduler
+
+
 def get_default_text_client() -> glm.TextServiceClient:
     return _client_manager.get_default_client("text")
 
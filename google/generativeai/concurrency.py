@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Adaptive limits on the number of concurrent calls."""
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses
+import math
+import threading
+import time
+from typing import Callable
+
+import google.api_core.exceptions
+
+__all__ = ["AdaptiveConcurrencyLimiter"]
+
+# Errors that mean the service is overloaded, and the client should back off.
+OVERLOAD_ERRORS = (
+    google.api_core.exceptions.ResourceExhausted,
+    google.api_core.exceptions.TooManyRequests,
+    google.api_core.exceptions.ServiceUnavailable,
+)
+
+
+class _Ticket:
+    """Blocks a thread until it's called."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def __call__(self):
+        self._event.set()
+
+    def wait(self, timeout: float | None = None):
+        """Waits until the ticket is called, or for `timeout` seconds."""
+        self._event.wait(timeout)
+
+
+class _AsyncTicket:
+    """Suspends a task until it's called, from any thread."""
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = _AsyncEvent()
+
+    def __call__(self):
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait_async(self, timeout: float | None = None):
+        """The async version of `_Ticket.wait`."""
+        await self._event.wait_async(timeout)
+
+
+class _AsyncEvent(asyncio.Event):
+    """An `asyncio.Event` that can be waited on with a timeout, like `threading.Event`."""
+
+    async def wait_async(self, timeout: float | None = None):
+        try:
+            await asyncio.wait_for(self.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+@dataclasses.dataclass
+class _Permit:
+    start: float
+    generation: int
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits the number of concurrent calls, adapting the limit to the service's capacity.
+
+    The limit follows an AIMD (additive increase, multiplicative decrease) rule: each
+    successful call raises it by `1 / limit`, so it grows by about one per round of calls.
+    A call that fails with `ResourceExhausted` or `ServiceUnavailable`, or that takes more
+    than `latency_tolerance` times the typical latency, multiplies it by `backoff`. Only one
+    decrease is applied per round, so a burst of failures from calls that were already in
+    flight doesn't collapse the limit.
+
+    Calls over the limit wait in a single FIFO queue and are admitted in arrival order,
+    whether they come from threads or from tasks, so `generate_content` calls can't jump
+    ahead of queued `generate_content_async` calls or the other way around.
+
+    >>> import google.generativeai as genai
+    >>> genai.configure(concurrency_limiter=True)
+    >>> limiter = genai.client.get_default_concurrency_limiter()
+    >>> limiter.limit, limiter.in_flight, limiter.queue_depth
+    (8, 0, 0)
+
+    Args:
+        initial_limit: The starting limit.
+        min_limit: The limit never drops below this.
+        max_limit: The limit never rises above this.
+        backoff: The factor to multiply the limit by when the service is overloaded.
+        latency_tolerance: Calls slower than this multiple of the average latency are
+            treated like an overload.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff: float = 0.5,
+        latency_tolerance: float = 3.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "Invalid configuration: The limits must satisfy `1 <= min_limit <= initial_limit <= max_limit`. "
+                f"Received: min_limit={min_limit}, initial_limit={initial_limit}, max_limit={max_limit}."
+            )
+        if not 0 < backoff < 1:
+            raise ValueError(
+                f"Invalid configuration: `backoff` must be between 0 and 1. Received: {backoff}."
+            )
+
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._backoff = backoff
+        self._latency_tolerance = latency_tolerance
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue: collections.deque[_Ticket | _AsyncTicket] = collections.deque()
+        self._generation = 0
+        self._latency: float | None = None
+        self._latency_samples = 0
+
+    @property
+    def limit(self) -> int:
+        """The current number of calls allowed in flight."""
+        return math.floor(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """The number of calls holding a permit."""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of calls waiting for a permit."""
+        return len(self._queue)
+
+    def __repr__(self):
+        return (
+            f"AdaptiveConcurrencyLimiter(limit={self.limit}, in_flight={self.in_flight}, "
+            f"queue_depth={self.queue_depth})"
+        )
+
+    def _enqueue(self, ticket):
+        """Takes a permit if one is free, otherwise queues the ticket and returns it."""
+        with self._lock:
+            if not self._queue and self._in_flight < self.limit:
+                self._in_flight += 1
+                return None
+            self._queue.append(ticket)
+            return ticket
+
+    def _abandon(self, ticket):
+        """Cleans up after a ticket that was abandoned."""
+        with self._lock:
+            try:
+                self._queue.remove(ticket)
+                return
+            except ValueError:
+                # The ticket was already handed a permit.
+                pass
+        self._release_permit()
+
+    def _permit(self) -> _Permit:
+        return _Permit(start=self._clock(), generation=self._generation)
+
+    def acquire(self) -> _Permit:
+        """Blocks until a permit is available. Pass the result to `release`."""
+        ticket = self._enqueue(_Ticket())
+        if ticket is not None:
+            try:
+                ticket.wait()
+            except BaseException:
+                self._abandon(ticket)
+                raise
+        return self._permit()
+
+    async def acquire_async(self) -> _Permit:
+        """The async version of `AdaptiveConcurrencyLimiter.acquire`."""
+        ticket = self._enqueue(_AsyncTicket())
+        if ticket is not None:
+            try:
+                await ticket.wait_async()
+            except BaseException:
+                self._abandon(ticket)
+                raise
+        return self._permit()
+
+    def _release_permit(self):
+        with self._lock:
+            self._in_flight -= 1
+            ready = []
+            while self._queue and self._in_flight < self.limit:
+                self._in_flight += 1
+                ready.append(self._queue.popleft())
+
+        for ticket in ready:
+            ticket()
+
+    def _is_latency_spike(self, latency: float) -> bool:
+        if self._latency is None or self._latency_samples < 10:
+            return False
+        return latency > self._latency * self._latency_tolerance
+
+    def release(
+        self, permit: _Permit, *, error: BaseException | None = None, track_latency: bool = True
+    ):
+        """Returns a permit, and adjusts the limit based on the outcome of the call.
+
+        Args:
+            permit: The result of `acquire`.
+            error: The exception the call raised, if any.
+            track_latency: Set this to `False` when the call's duration isn't comparable
+                to other calls (streaming calls, for example).
+        """
+        latency = self._clock() - permit.start
+
+        with self._lock:
+            overloaded = isinstance(error, OVERLOAD_ERRORS)
+            if error is None and track_latency:
+                overloaded = self._is_latency_spike(latency)
+                if not overloaded:
+                    if self._latency is None:
+                        self._latency = latency
+                    else:
+                        self._latency += 0.1 * (latency - self._latency)
+                    self._latency_samples += 1
+
+            if overloaded:
+                if permit.generation == self._generation:
+                    self._limit = max(self._min_limit, self._limit * self._backoff)
+                    self._generation += 1
+            elif error is None:
+                self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+
+        self._release_permit()
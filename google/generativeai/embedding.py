@@ -19,9 +19,11 @@ from typing import Any, Iterable, overload, TypeVar, Union, Mapping
 
 import google.ai.generativelanguage as glm
 from google.generativeai import protos
+from google.generativeai import rate_limiting
 
 from google.generativeai.client import get_default_generative_client
 from google.generativeai.client import get_default_generative_async_client
+from google.generativeai.client import get_default_rate_limiter
 
 from google.generativeai.types import helper_types
 from google.generativeai.types import text_types
@@ -106,6 +108,7 @@ def embed_content(
     output_dimensionality: int | None = None,
     client: glm.GenerativeServiceClient | None = None,
     request_options: helper_types.RequestOptionsType | None = None,
+    raw: bool = False,
 ) -> text_types.EmbeddingDict: ...
 
 
@@ -118,6 +121,7 @@ def embed_content(
     output_dimensionality: int | None = None,
     client: glm.GenerativeServiceClient | None = None,
     request_options: helper_types.RequestOptionsType | None = None,
+    raw: bool = False,
 ) -> text_types.BatchEmbeddingDict: ...
 
 
@@ -129,7 +133,13 @@ def embed_content(
     output_dimensionality: int | None = None,
     client: glm.GenerativeServiceClient = None,
     request_options: helper_types.RequestOptionsType | None = None,
-) -> text_types.EmbeddingDict | text_types.BatchEmbeddingDict:
+    raw: bool = False,
+) -> (
+    text_types.EmbeddingDict
+    | text_types.BatchEmbeddingDict
+    | protos.EmbedContentResponse
+    | protos.BatchEmbedContentsResponse
+):
     """Calls the API to create embeddings for content passed in.
 
     Args:
@@ -156,6 +166,13 @@ def embed_content(
         request_options:
             Options for the request.
 
+        raw:
+            If `True`, return the API's `protos.EmbedContentResponse` (or, for
+            a batch, a single `protos.BatchEmbedContentsResponse` holding every
+            embedding) instead of converting it to a dictionary. This skips
+            copying each float into a python list, which dominates the cost of
+            large batches.
+
     Return:
         Dictionary containing the embedding (list of float values) for the
         input content.
@@ -181,8 +198,12 @@ def embed_content(
     if task_type:
         task_type = to_task_type(task_type)
 
+    rate_limiter = get_default_rate_limiter(model)
+
     if isinstance(content, Iterable) and not isinstance(content, (str, Mapping)):
-        result = {"embedding": []}
+        result = protos.BatchEmbedContentsResponse() if raw else {"embedding": []}
+        # Encode the batch's images in parallel, each image once.
+        content = content_types.encode_images(list(content))
         requests = (
             protos.EmbedContentRequest(
                 model=model,
@@ -195,10 +216,16 @@ def embed_content(
         )
         for batch in _batched(requests, EMBEDDING_MAX_BATCH_SIZE):
             embedding_request = protos.BatchEmbedContentsRequest(model=model, requests=batch)
+            rate_limiting.acquire(rate_limiter, embedding_request)
             embedding_response = client.batch_embed_contents(
                 embedding_request,
                 **request_options,
             )
+            if raw:
+                type(result).pb(result).embeddings.extend(
+                    type(embedding_response).pb(embedding_response).embeddings
+                )
+                continue
             embedding_dict = type(embedding_response).to_dict(embedding_response)
             result["embedding"].extend(e["values"] for e in embedding_dict["embeddings"])
         return result
@@ -210,10 +237,13 @@ def embed_content(
             title=title,
             output_dimensionality=output_dimensionality,
         )
+        rate_limiting.acquire(rate_limiter, embedding_request)
         embedding_response = client.embed_content(
             embedding_request,
             **request_options,
         )
+        if raw:
+            return embedding_response
         embedding_dict = type(embedding_response).to_dict(embedding_response)
         embedding_dict["embedding"] = embedding_dict["embedding"]["values"]
         return embedding_dict
@@ -228,6 +258,7 @@ async def embed_content_async(
     output_dimensionality: int | None = None,
     client: glm.GenerativeServiceAsyncClient | None = None,
     request_options: helper_types.RequestOptionsType | None = None,
+    raw: bool = False,
 ) -> text_types.EmbeddingDict: ...
 
 
@@ -240,6 +271,7 @@ async def embed_content_async(
     output_dimensionality: int | None = None,
     client: glm.GenerativeServiceAsyncClient | None = None,
     request_options: helper_types.RequestOptionsType | None = None,
+    raw: bool = False,
 ) -> text_types.BatchEmbeddingDict: ...
 
 
@@ -251,7 +283,13 @@ async def embed_content_async(
     output_dimensionality: int | None = None,
     client: glm.GenerativeServiceAsyncClient = None,
     request_options: helper_types.RequestOptionsType | None = None,
-) -> text_types.EmbeddingDict | text_types.BatchEmbeddingDict:
+    raw: bool = False,
+) -> (
+    text_types.EmbeddingDict
+    | text_types.BatchEmbeddingDict
+    | protos.EmbedContentResponse
+    | protos.BatchEmbedContentsResponse
+):
     """Calls the API to create async embeddings for content passed in."""
 
     model = model_types.make_model_name(model)
@@ -274,8 +312,12 @@ async def embed_content_async(
     if task_type:
         task_type = to_task_type(task_type)
 
+    rate_limiter = get_default_rate_limiter(model)
+
     if isinstance(content, Iterable) and not isinstance(content, (str, Mapping)):
-        result = {"embedding": []}
+        result = protos.BatchEmbedContentsResponse() if raw else {"embedding": []}
+        # Encode the batch's images in parallel, each image once.
+        content = content_types.encode_images(list(content))
         requests = (
             protos.EmbedContentRequest(
                 model=model,
@@ -288,10 +330,16 @@ async def embed_content_async(
         )
         for batch in _batched(requests, EMBEDDING_MAX_BATCH_SIZE):
             embedding_request = protos.BatchEmbedContentsRequest(model=model, requests=batch)
+            await rate_limiting.acquire_async(rate_limiter, embedding_request)
             embedding_response = await client.batch_embed_contents(
                 embedding_request,
                 **request_options,
             )
+            if raw:
+                type(result).pb(result).embeddings.extend(
+                    type(embedding_response).pb(embedding_response).embeddings
+                )
+                continue
             embedding_dict = type(embedding_response).to_dict(embedding_response)
             result["embedding"].extend(e["values"] for e in embedding_dict["embeddings"])
         return result
@@ -303,10 +351,13 @@ async def embed_content_async(
             title=title,
             output_dimensionality=output_dimensionality,
         )
+        await rate_limiting.acquire_async(rate_limiter, embedding_request)
         embedding_response = await client.embed_content(
             embedding_request,
             **request_options,
         )
+        if raw:
+            return embedding_response
         embedding_dict = type(embedding_response).to_dict(embedding_response)
         embedding_dict["embedding"] = embedding_dict["embedding"]["values"]
         return embedding_dict
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Moves large inline data out of requests, into files uploaded to the File API."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+import datetime
+import hashlib
+import sys
+import threading
+from typing import Union
+from typing_extensions import TypedDict
+
+from google.generativeai import files
+from google.generativeai import protos
+from google.generativeai.types import content_types
+
+if sys.version_info < (3, 10):
+    from google.generativeai.types.generation_types import aiter, anext
+
+__all__ = ["FileIndex", "FileOffloader", "FileOffloaderDict", "FileOffloaderOptions"]
+
+# Files this close to expiring are uploaded again, so they don't expire mid-request.
+_EXPIRATION_MARGIN = datetime.timedelta(minutes=10)
+
+_FileDataPb = protos.FileData.pb()
+
+
+def _hash_matches(file: protos.File, digest: str) -> bool:
+    sha256_hash = file.sha256_hash
+    if not sha256_hash:
+        return True
+    # The API reports the hex digest, accept the raw digest too.
+    return sha256_hash in (digest.encode("ascii"), bytes.fromhex(digest))
+
+
+def _file_digest(file: protos.File) -> str | None:
+    sha256_hash = file.sha256_hash
+    if len(sha256_hash) == 32:
+        return sha256_hash.hex()
+    elif len(sha256_hash) == 64:
+        return sha256_hash.decode("ascii")
+    return None
+
+
+def _expiring(file: protos.File) -> bool:
+    if "expiration_time" not in file:
+        return False
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return file.expiration_time - _EXPIRATION_MARGIN <= now
+
+
+class FileIndex:
+    """The uploaded files, by the sha256 hex digest of their contents.
+
+    Files are dropped from the index when they're about to expire. The index is thread safe,
+    and can be shared between models.
+    """
+
+    def __init__(self):
+        self._files: dict[str, protos.File] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._files)
+
+    def __repr__(self):
+        return f"FileIndex(size={len(self)})"
+
+    def get(self, digest: str) -> protos.File | None:
+        with self._lock:
+            file = self._files.get(digest, None)
+            if file is None:
+                return None
+            if _expiring(file):
+                del self._files[digest]
+                return None
+            return file
+
+    def put(self, digest: str, file: protos.File):
+        """Adds `file`, unless it failed, is about to expire or has a different hash."""
+        if file.state == protos.File.State.FAILED or _expiring(file):
+            return
+        if not _hash_matches(file, digest):
+            return
+        with self._lock:
+            self._files[digest] = file
+
+    def discard(self, digest: str):
+        with self._lock:
+            self._files.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+
+    def refresh(self):
+        """Indexes the project's existing files, so their contents aren't uploaded again."""
+        for file in files.list_files():
+            file = file.to_proto()
+            digest = _file_digest(file)
+            if digest is not None and file.state == protos.File.State.ACTIVE:
+                self.put(digest, file)
+
+
+def _check_processed(file) -> protos.File:
+    file = file.to_proto()
+    if file.state == protos.File.State.FAILED:
+        raise ValueError(
+            f"Invalid input: The File API failed to process the uploaded blob ({file.name}): "
+            f"{file.error.message}"
+        )
+    return file
+
+
+def _upload_blob(blob, digest: str) -> protos.File:
+    file = files.upload_file(blob.data, mime_type=blob.mime_type, display_name=digest)
+    if file.state == protos.File.State.PROCESSING:
+        # Videos can't be used until they're processed.
+        file = next(iter(files.wait_for_active([file])))
+    return _check_processed(file)
+
+
+async def _upload_blob_async(blob, digest: str) -> protos.File:
+    file = await files.upload_file_async(blob.data, mime_type=blob.mime_type, display_name=digest)
+    if file.state == protos.File.State.PROCESSING:
+        # Videos can't be used until they're processed.
+        file = await anext(aiter(files.wait_for_active_async([file])))  # type: ignore
+    return _check_processed(file)
+
+
+class FileOffloader:
+    """Replaces large `inline_data` parts with references to files uploaded to the File API.
+
+    >>> import google.generativeai as genai
+    >>> model = genai.GenerativeModel('gemini-1.5-flash', file_offload=True)
+    >>> chat = model.start_chat()
+    >>> response = chat.send_message(["Describe this video", pathlib.Path('clip.mp4')])
+
+    The video is uploaded once, and each turn of the chat refers to the uploaded file instead
+    of sending the video again. Blobs are identified by the sha256 of their data, so sending
+    the same bytes again (from any model sharing the index) reuses the uploaded file until it
+    expires.
+
+    Args:
+        min_size: Blobs of at least this many bytes are uploaded.
+        index: The `FileIndex` of uploaded files. Defaults to one shared by every offloader.
+        max_request_size: If a request is still larger than this, its largest remaining blobs
+            are uploaded too, until it fits. Defaults to the API's limit.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 2**20,
+        index: FileIndex | None = None,
+        max_request_size: int = content_types.MAX_REQUEST_BYTES,
+    ):
+        if min_size < 1:
+            raise ValueError(
+                f"Invalid configuration: `min_size` must be at least 1. Received: {min_size}."
+            )
+        if max_request_size < 1:
+            raise ValueError(
+                "Invalid configuration: `max_request_size` must be at least 1. "
+                f"Received: {max_request_size}."
+            )
+        if index is None:
+            index = default_index
+        self.min_size = min_size
+        self.index = index
+        self.max_request_size = max_request_size
+
+    def __repr__(self):
+        return (
+            f"FileOffloader(min_size={self.min_size}, index={self.index!r}, "
+            f"max_request_size={self.max_request_size})"
+        )
+
+    def _large_parts(self, request: protos.GenerateContentRequest):
+        request = type(request).pb(request)
+        blobs = [
+            part
+            for content in request.contents
+            for part in content.parts
+            if part.WhichOneof("data") == "inline_data"
+        ]
+        # Past the size limit, smaller blobs are uploaded too (largest first) until it fits.
+        excess = request.ByteSize() - self.max_request_size
+        for part in sorted(blobs, key=lambda part: len(part.inline_data.data), reverse=True):
+            size = len(part.inline_data.data)
+            if size < self.min_size and excess <= 0:
+                break
+            excess -= size
+            yield part, hashlib.sha256(part.inline_data.data).hexdigest()
+
+    def offload(self, request: protos.GenerateContentRequest):
+        """Replaces the large blobs in `request` (in place), uploading those not uploaded yet."""
+        for part, digest in self._large_parts(request):
+            file = self.index.get(digest)
+            if file is None:
+                file = _upload_blob(part.inline_data, digest)
+                self.index.put(digest, file)
+            part.file_data.CopyFrom(_FileDataPb(mime_type=file.mime_type, file_uri=file.uri))
+
+    async def offload_async(self, request: protos.GenerateContentRequest):
+        """The async version of `offload`."""
+        for part, digest in self._large_parts(request):
+            file = self.index.get(digest)
+            if file is None:
+                file = await _upload_blob_async(part.inline_data, digest)
+                self.index.put(digest, file)
+            part.file_data.CopyFrom(_FileDataPb(mime_type=file.mime_type, file_uri=file.uri))
+
+
+# Shared by every `FileOffloader` that isn't given its own index.
+default_index = FileIndex()
+
+
+class FileOffloaderDict(TypedDict, total=False):
+    min_size: int
+    index: FileIndex
+    max_request_size: int
+
+
+FileOffloaderOptions = Union[FileOffloader, FileOffloaderDict, bool]
+
+
+def to_file_offloader(offloader: FileOffloaderOptions | None) -> FileOffloader | None:
+    if offloader is None or offloader is False:
+        return None
+    elif offloader is True:
+        return FileOffloader()
+    elif isinstance(offloader, FileOffloader):
+        return offloader
+    elif isinstance(offloader, Mapping):
+        return FileOffloader(**offloader)
+    else:
+        raise TypeError(
+            "Invalid input type. Expected a `FileOffloader`, a `dict` of its arguments or a "
+            "`bool`.\n"
+            f"However, received an object of type: {type(offloader)}.\n"
+            f"Object Value: {offloader}"
+        )
@@ -14,62 +14,258 @@
 # limitations under the License.
 from __future__ import annotations
 
+import asyncio
+from concurrent import futures
+import hashlib
+import io
 import os
 import pathlib
 import mimetypes
-from typing import Iterable
+import random
+import time
+from typing import AsyncIterator, Callable, Iterable, Iterator, Union
 import logging
 from google.generativeai import protos
+from google.generativeai import utils
 from itertools import islice
 
 from google.generativeai.types import file_types
 
 from google.generativeai.client import get_default_file_client
+from google.generativeai.client import get_default_file_async_client
 
-__all__ = ["upload_file", "get_file", "list_files", "delete_file"]
+__all__ = [
+    "upload_file",
+    "upload_file_async",
+    "upload_files",
+    "wait_for_active",
+    "wait_for_active_async",
+    "get_file",
+    "list_files",
+    "delete_file",
+]
 
 mimetypes.add_type("image/webp", ".webp")
 
+# The contents of a file to upload, rather than its path.
+UploadSource = Union[bytes, bytearray, memoryview, io.IOBase, Iterable[bytes]]
+
+# Resumable uploads are sent in multiples of this.
+_CHUNK_GRANULARITY = 256 * 1024
+
+# `wait_for_active` polls after this many seconds, doubling up to `_MAX_POLL_DELAY`.
+_INITIAL_POLL_DELAY = 1.0
+_MAX_POLL_DELAY = 30.0
+# The largest page the API returns.
+_LIST_PAGE_SIZE = 100
+_DONE_STATES = (protos.File.State.ACTIVE, protos.File.State.FAILED)
+
+_sleep = time.sleep
+_sleep_async = asyncio.sleep
+_jitter = random.uniform
+
+
+def _upload_state_dir() -> pathlib.Path:
+    return utils.cache_dir() / "uploads"
+
+
+def _check_chunk_size(chunk_size: int):
+    if chunk_size <= 0 or chunk_size % _CHUNK_GRANULARITY:
+        raise ValueError(
+            "Invalid configuration: `chunk_size` must be a positive multiple of 256 KiB "
+            f"({_CHUNK_GRANULARITY} bytes). Received: {chunk_size}."
+        )
+
 
 def upload_file(
-    path: str | pathlib.Path | os.PathLike,
+    path: str | pathlib.Path | os.PathLike | UploadSource,
     *,
     mime_type: str | None = None,
     name: str | None = None,
     display_name: str | None = None,
     resumable: bool = True,
+    resume: bool = False,
+    chunk_size: int | None = None,
 ) -> file_types.File:
     """Calls the API to upload a file using a supported file service.
 
     Args:
-        path: The path to the file to be uploaded.
+        path: The path to the file to be uploaded, or its contents: `bytes`, a binary file
+            object or an iterable of `bytes` chunks. Streams and iterators are read as the
+            upload goes, a chunk at a time, so generated data needn't be written to disk first.
         mime_type: The MIME type of the file. If not provided, it will be
-            inferred from the file extension.
+            inferred from the file extension, or sniffed from `bytes`. Required for streams
+            and iterators.
         name: The name of the file in the destination (e.g., 'files/sample-image').
             If not provided, a system generated ID will be created.
         display_name: Optional display name of the file.
         resumable: Whether to use the resumable upload protocol. By default, this is enabled.
             See details at
             https://googleapis.github.io/google-api-python-client/docs/epy/googleapiclient.http.MediaFileUpload-class.html#resumable
+        resume: Whether to record the upload's progress on disk, so that if the process dies,
+            uploading the same file again continues from the last chunk the server
+            acknowledged. Progress is kept in `utils.cache_dir()`, by the file's sha256, so an
+            edited file starts over. Only for paths.
+        chunk_size: The size of the chunks of a resumable upload, a multiple of 256 KiB.
+            Smaller chunks lose less progress to a failure, larger chunks make fewer requests.
 
     Returns:
         file_types.File: The response of the uploaded file.
     """
     client = get_default_file_client()
 
-    path = pathlib.Path(os.fspath(path))
+    path, mime_type, name, display_name = _prepare_upload(path, mime_type, name, display_name)
+
+    kwargs = {}
+    if chunk_size is not None:
+        _check_chunk_size(chunk_size)
+        kwargs["chunk_size"] = chunk_size
+    if resume:
+        if not resumable:
+            raise ValueError("Invalid configuration: `resume=True` requires `resumable=True`.")
+        if not isinstance(path, pathlib.Path):
+            raise ValueError(
+                "Invalid configuration: `resume=True` requires a path, the progress of a "
+                "stream can't be picked up by another process."
+            )
+        kwargs["resume_state"] = _upload_state_dir() / f"{_sha256(path)}.json"
 
-    if mime_type is None:
-        mime_type, _ = mimetypes.guess_type(path)
+    response = client.create_file(
+        path=path,
+        mime_type=mime_type,
+        name=name,
+        display_name=display_name,
+        resumable=resumable,
+        **kwargs,
+    )
+    return file_types.File(response)
+
+
+def _prepare_upload(path, mime_type, name, display_name):
+    """Normalizes `upload_file`'s arguments. Paths become `pathlib.Path`s."""
+    if isinstance(path, (str, os.PathLike)):
+        path = pathlib.Path(os.fspath(path))
+        if mime_type is None:
+            mime_type, _ = mimetypes.guess_type(path)
+        if display_name is None:
+            display_name = path.name
+    elif isinstance(path, (bytes, bytearray, memoryview)):
+        if mime_type is None:
+            mime_type = file_types.sniff_mime_type(path)
+    elif hasattr(path, "read") or isinstance(path, Iterable):
+        if mime_type is None:
+            raise ValueError(
+                "Invalid input: `mime_type` is required to upload a stream or an iterator, "
+                "it can't be inferred without reading it."
+            )
+        if display_name is None and isinstance(getattr(path, "name", None), str):
+            display_name = os.path.basename(path.name)
+    else:
+        raise TypeError(
+            "Invalid input type. Expected a path, `bytes`, a binary file object or an iterable "
+            f"of `bytes`.\nHowever, received an object of type: {type(path)}."
+        )
 
     if name is not None and "/" not in name:
         name = f"files/{name}"
+    return path, mime_type, name, display_name
 
-    if display_name is None:
-        display_name = path.name
 
-    response = client.create_file(
-        path=path, mime_type=mime_type, name=name, display_name=display_name, resumable=resumable
+def _sha256(path: pathlib.Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def upload_files(
+    paths: Iterable[str | pathlib.Path | os.PathLike],
+    *,
+    max_workers: int = 8,
+    resumable: bool = True,
+    return_exceptions: bool = True,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> list[file_types.File | Exception]:
+    """Uploads many files in parallel, with `upload_file`.
+
+    >>> uploaded = genai.upload_files(pathlib.Path('docs').glob('*.pdf'), max_workers=16)
+    >>> failed = [f for f in uploaded if isinstance(f, Exception)]
+
+    Each worker thread keeps its own HTTP connections, and reuses them for its next file.
+
+    Args:
+        paths: The paths of the files to upload. Their MIME types are inferred from the file
+            extensions, and their display names are the file names.
+        max_workers: The maximum number of uploads in flight.
+        resumable: Whether to use the resumable upload protocol.
+        return_exceptions: If `True`, a failed upload's exception takes its place in the
+            results. If `False`, the first failure is raised, and the uploads that haven't
+            started are cancelled.
+        on_progress: Called with `(completed, total)` as each upload finishes, from the calling
+            thread.
+
+    Returns:
+        The uploaded files (or the errors), in the order of `paths`.
+    """
+    if max_workers < 1:
+        raise ValueError(
+            f"Invalid configuration: `max_workers` must be at least 1. Received: {max_workers}."
+        )
+    paths = list(paths)
+    # Create the client before the worker threads need it.
+    get_default_file_client()
+
+    results: list[file_types.File | Exception | None] = [None] * len(paths)
+    executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {
+            executor.submit(upload_file, path, resumable=resumable): i
+            for i, path in enumerate(paths)
+        }
+        for completed, future in enumerate(futures.as_completed(pending), start=1):
+            error = future.exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results[pending[future]] = future.result() if error is None else error
+            if on_progress is not None:
+                on_progress(completed, len(paths))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
+
+
+async def upload_file_async(
+    path: str | pathlib.Path | os.PathLike | UploadSource,
+    *,
+    mime_type: str | None = None,
+    name: str | None = None,
+    display_name: str | None = None,
+    resumable: bool = True,
+    chunk_size: int | None = None,
+) -> file_types.File:
+    """The async version of `upload_file`.
+
+    With `aiohttp` installed the upload runs on the event loop: the file is sent in chunks of
+    `chunk_size` bytes (8 MiB by default), and the next chunk is only read once the previous
+    one was accepted. Cancelling the task stops the upload. Without `aiohttp`, `upload_file`
+    runs in a worker thread.
+
+    Blocking streams and iterators are read in a worker thread, a chunk at a time.
+    """
+    client = get_default_file_async_client()
+
+    path, mime_type, name, display_name = _prepare_upload(path, mime_type, name, display_name)
+    if chunk_size is not None:
+        _check_chunk_size(chunk_size)
+
+    response = await client.create_file(
+        path=path,
+        mime_type=mime_type,
+        name=name,
+        display_name=display_name,
+        resumable=resumable,
+        chunk_size=chunk_size,
     )
     return file_types.File(response)
 
@@ -91,6 +287,173 @@ def get_file(name: str) -> file_types.File:
     return file_types.File(client.get_file(name=name))
 
 
+def _file_name(file: str | file_types.File | protos.File) -> str:
+    if isinstance(file, (file_types.File, protos.File)):
+        return file.name
+    elif "/" not in file:
+        return f"files/{file}"
+    return file
+
+
+class _Poller:
+    """The bookkeeping of `wait_for_active`, shared by the sync and async versions."""
+
+    def __init__(self, files, timeout: float | None, max_concurrency: int):
+        if max_concurrency < 1:
+            raise ValueError(
+                "Invalid configuration: `max_concurrency` must be at least 1. "
+                f"Received: {max_concurrency}."
+            )
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.delay = _INITIAL_POLL_DELAY
+        self.ready = []
+        pending = []
+        for file in files:
+            if isinstance(file, (file_types.File, protos.File)) and file.state in _DONE_STATES:
+                self.ready.append(file_types.File(file))
+            else:
+                pending.append(_file_name(file))
+        # In order, without duplicates.
+        self.pending = dict.fromkeys(pending)
+        # Listing is only worth it for several files, while they're found on the first page.
+        self._use_list = True
+
+    @property
+    def use_list(self) -> bool:
+        return self._use_list and len(self.pending) > 1
+
+    def check(self, file: protos.File) -> file_types.File | None:
+        """Returns `file` if it's done processing, and stops polling it."""
+        if file.name not in self.pending or file.state not in _DONE_STATES:
+            return None
+        del self.pending[file.name]
+        return file_types.File(file)
+
+    def check_listed(
+        self, listed: Iterable[protos.File]
+    ) -> tuple[list[file_types.File], list[str]]:
+        """Returns the listed files that are done, and the names of the pending ones not listed."""
+        listed = {file.name: file for file in listed}
+        unlisted = [name for name in self.pending if name not in listed]
+        if len(unlisted) == len(self.pending):
+            # They aren't on the first page, look them up one by one from now on.
+            self._use_list = False
+        ready = [self.check(listed[name]) for name in list(self.pending) if name in listed]
+        return [file for file in ready if file is not None], unlisted
+
+    def next_delay(self) -> float:
+        """The time to sleep before the next round. Raises `TimeoutError` past the deadline."""
+        delay = _jitter(self.delay / 2, self.delay)
+        self.delay = min(2 * self.delay, _MAX_POLL_DELAY)
+        if self.deadline is not None:
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"Timed out waiting for {len(self.pending)} file(s) to become ACTIVE: "
+                    f"{', '.join(self.pending)}"
+                )
+            delay = min(delay, remaining)
+        return delay
+
+
+def wait_for_active(
+    files: Iterable[str | file_types.File | protos.File],
+    *,
+    timeout: float | None = 600,
+    max_concurrency: int = 8,
+) -> Iterator[file_types.File]:
+    """Waits for uploaded files to finish processing, yielding each one as it does.
+
+    >>> videos = [genai.upload_file(path) for path in paths]
+    >>> for video in genai.wait_for_active(videos):
+    ...     if video.state == protos.File.State.FAILED:
+    ...         print(video.name, video.error.message)
+
+    The files are polled with exponential backoff and jitter. When several are pending, one
+    `list_files` page replaces their separate `get_file` calls.
+
+    Args:
+        files: The files, or their names.
+        timeout: The seconds to wait for all the files, or `None` to wait forever.
+        max_concurrency: The maximum number of `get_file` calls in flight.
+
+    Yields:
+        The files, as they become `ACTIVE` or `FAILED` (see `File.error`).
+
+    Raises:
+        TimeoutError: If some files are still processing after `timeout` seconds.
+    """
+    poller = _Poller(files, timeout=timeout, max_concurrency=max_concurrency)
+    yield from poller.ready
+    if not poller.pending:
+        return
+    client = get_default_file_client()
+
+    with futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        while True:
+            unlisted = list(poller.pending)
+            if poller.use_list:
+                pager = client.list_files(protos.ListFilesRequest(page_size=_LIST_PAGE_SIZE))
+                ready, unlisted = poller.check_listed(pager.files)
+                yield from ready
+
+            pending = [executor.submit(client.get_file, name=name) for name in unlisted]
+            for future in futures.as_completed(pending):
+                file = poller.check(future.result())
+                if file is not None:
+                    yield file
+
+            if not poller.pending:
+                return
+            _sleep(poller.next_delay())
+
+
+async def wait_for_active_async(
+    files: Iterable[str | file_types.File | protos.File],
+    *,
+    timeout: float | None = 600,
+    max_concurrency: int = 8,
+) -> AsyncIterator[file_types.File]:
+    """The async version of `wait_for_active`.
+
+    >>> async for video in genai.wait_for_active_async(videos):
+    ...     ...
+    """
+    poller = _Poller(files, timeout=timeout, max_concurrency=max_concurrency)
+    for file in poller.ready:
+        yield file
+    if not poller.pending:
+        return
+    client = get_default_file_async_client()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def get(name):
+        async with semaphore:
+            return await client.get_file(name=name)
+
+    while True:
+        unlisted = list(poller.pending)
+        if poller.use_list:
+            pager = await client.list_files(protos.ListFilesRequest(page_size=_LIST_PAGE_SIZE))
+            ready, unlisted = poller.check_listed(pager.files)
+            for file in ready:
+                yield file
+
+        pending = [asyncio.ensure_future(get(name)) for name in unlisted]
+        try:
+            for future in asyncio.as_completed(pending):
+                file = poller.check(await future)
+                if file is not None:
+                    yield file
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if not poller.pending:
+            return
+        await _sleep_async(poller.next_delay())
+
+
 def delete_file(name: str | file_types.File | protos.File):
     """Calls the API to permanently delete a specified file using a supported file service."""
     if isinstance(name, (file_types.File, protos.File)):
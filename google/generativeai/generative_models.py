@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
 from collections.abc import Iterable
+import concurrent.futures
 import textwrap
 from typing import Any, Union, overload
 import reprlib
@@ -15,6 +17,12 @@ from google.generativeai import protos
 from google.generativeai import client
 
 from google.generativeai import caching
+from google.generativeai import circuit_breaker
+from google.generativeai import file_offload as file_offload_lib
+from google.generativeai import rate_limiting
+from google.generativeai import scheduling
+from google.generativeai import token_estimation
+from google.generativeai import utils
 from google.generativeai.types import content_types
 from google.generativeai.types import generation_types
 from google.generativeai.types import helper_types
@@ -24,6 +32,31 @@ _USER_ROLE = "user"
 _MODEL_ROLE = "model"
 
 
+def _map_concurrently(fn, items, max_concurrency: int) -> list:
+    """Calls `fn` on each item, with up to `max_concurrency` threads.
+
+    Returns the results in order, with the exception raised for an item in place of its result.
+    """
+    if not items:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [executor.submit(fn, item) for item in items]
+    return [future.exception() or future.result() for future in futures]
+
+
+async def _gather_limited(fn, items, max_concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def limited(item):
+        async with semaphore:
+            return await fn(item)
+
+    return await asyncio.gather(*[limited(item) for item in items], return_exceptions=True)
+
+
+_map_concurrently_async = _gather_limited
+
+
 class GenerativeModel:
     """
     The `genai.GenerativeModel` class wraps default parameters for calls to
@@ -68,6 +101,14 @@ class GenerativeModel:
              by the api before being returned.
          generation_config: A `genai.GenerationConfig` setting the default generation parameters to
              use.
+         rate_limiter: A `genai.RateLimiter` (or a dict of its arguments) pacing this model's calls.
+             Defaults to the limiter set for this model with `genai.configure(rate_limits=...)`.
+         fallback_models: Models to send `generate_content` calls to, in order, while this model's
+             circuit breaker is open, see `genai.configure(circuit_breakers=...)`. Not used with
+             cached content, which belongs to a single model.
+         file_offload: `True`, or a `genai.FileOffloader` (or a dict of its arguments), to upload
+             large inline data in `generate_content` calls to the File API, and send a reference
+             to the uploaded file instead. Defaults to `False`.
     """
 
     def __init__(
@@ -78,6 +119,9 @@ class GenerativeModel:
         tools: content_types.FunctionLibraryType | None = None,
         tool_config: content_types.ToolConfigType | None = None,
         system_instruction: content_types.ContentType | None = None,
+        rate_limiter: rate_limiting.RateLimiterOptions | None = None,
+        fallback_models: Iterable[str] | None = None,
+        file_offload: file_offload_lib.FileOffloaderOptions | None = None,
     ):
         if "/" not in model_name:
             model_name = "models/" + model_name
@@ -96,8 +140,40 @@ class GenerativeModel:
         else:
             self._system_instruction = content_types.to_content(system_instruction)
 
+        if rate_limiter is None:
+            self._rate_limiter = None
+        else:
+            self._rate_limiter = rate_limiting.to_rate_limiter(rate_limiter)
+
+        if fallback_models is None:
+            fallback_models = []
+        elif isinstance(fallback_models, str):
+            fallback_models = [fallback_models]
+        self._fallback_models = [client._to_model_name(name) for name in fallback_models]
+        self._file_offloader = file_offload_lib.to_file_offloader(file_offload)
+
         self._client = None
-        self._async_client = None
+        # Created on first use, it holds a lock, which can't be copied or pickled.
+        self._async_clients = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The async clients are bound to their event loops, a copy makes its own.
+        state["_async_clients"] = None
+        return state
+
+    @property
+    def _async_client(self):
+        # `grpc.aio` clients can only be used from the event loop that created them.
+        if self._async_clients is None:
+            return None
+        return self._async_clients.get()
+
+    @_async_client.setter
+    def _async_client(self, value):
+        if self._async_clients is None:
+            self._async_clients = client._LoopLocal()
+        self._async_clients.set(value)
 
     @property
     def cached_content(self) -> str:
@@ -135,8 +211,32 @@ class GenerativeModel:
         safety_settings: safety_types.SafetySettingOptions | None = None,
         tools: content_types.FunctionLibraryType | None,
         tool_config: content_types.ToolConfigType | None,
+        check_size: bool = True,
     ) -> protos.GenerateContentRequest:
         """Creates a `protos.GenerateContentRequest` from raw inputs."""
+        request = self._prepare_request_config(
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            tools=tools,
+            tool_config=tool_config,
+        )
+        contents = content_types.to_contents(contents)
+        if check_size:
+            self._check_request_size(request, contents)
+
+        # Copying the history's messages directly skips the proto-plus marshal for each one.
+        utils.to_pb(request).contents.extend(utils.to_pb(c) for c in contents)
+        return request
+
+    def _prepare_request_config(
+        self,
+        *,
+        generation_config: generation_types.GenerationConfigType | None,
+        safety_settings: safety_types.SafetySettingOptions | None,
+        tools: content_types.FunctionLibraryType | None,
+        tool_config: content_types.ToolConfigType | None,
+    ) -> protos.GenerateContentRequest:
+        """Creates the `protos.GenerateContentRequest` for raw inputs, without its `contents`."""
         if hasattr(self, "_cached_content") and any([self._system_instruction, tools, tool_config]):
             raise ValueError(
                 "`tools`, `tool_config`, `system_instruction` cannot be set on a model instantiated with `cached_content` as its context."
@@ -151,8 +251,6 @@ class GenerativeModel:
         else:
             tool_config = content_types.to_tool_config(tool_config)
 
-        contents = content_types.to_contents(contents)
-
         generation_config = generation_types.to_generation_config_dict(generation_config)
         merged_gc = self._generation_config.copy()
         merged_gc.update(generation_config)
@@ -164,7 +262,6 @@ class GenerativeModel:
 
         return protos.GenerateContentRequest(
             model=self._model_name,
-            contents=contents,
             generation_config=merged_gc,
             safety_settings=merged_ss,
             tools=tools_lib,
@@ -173,6 +270,87 @@ class GenerativeModel:
             cached_content=self.cached_content,
         )
 
+    def _check_request_size(
+        self, request: protos.GenerateContentRequest, contents: list[protos.Content]
+    ):
+        """Raises a `ValueError` if the request would be over the API's size limit."""
+        size = utils.to_pb(request).ByteSize() + content_types.contents_size(contents)
+        if size <= content_types.MAX_REQUEST_BYTES:
+            return
+
+        message = (
+            f"Invalid input: The request is {size} bytes, over the API's limit of "
+            f"{content_types.MAX_REQUEST_BYTES} bytes."
+        )
+        blobs = [
+            (len(part.inline_data.data), i, j, part.inline_data.mime_type)
+            for i, content in enumerate(contents)
+            for j, part in enumerate(utils.to_pb(content).parts)
+            if part.WhichOneof("data") == "inline_data"
+        ]
+        if blobs:
+            blob_size, i, j, mime_type = max(blobs)
+            message += (
+                f" The largest inline data is {blob_size} bytes of {mime_type}, in part {j} of "
+                f"content {i}."
+            )
+        raise ValueError(
+            message + " Upload large files with `genai.upload_file` and pass the returned `File` "
+            "instead, or let the model upload them: "
+            "`genai.GenerativeModel(..., file_offload=True)`."
+        )
+
+    def estimate_request_size(
+        self,
+        contents: content_types.ContentsType,
+        *,
+        generation_config: generation_types.GenerationConfigType | None = None,
+        safety_settings: safety_types.SafetySettingOptions | None = None,
+        tools: content_types.FunctionLibraryType | None = None,
+        tool_config: content_types.ToolConfigType | None = None,
+    ) -> int:
+        """Returns the serialized size in bytes of the `generate_content` request for these inputs.
+
+        The size is added up from the size of each content, so the request (and the copy of
+        its contents) is never built. `generate_content` raises a `ValueError` for requests
+        over `content_types.MAX_REQUEST_BYTES`, unless the model has a `file_offload` policy.
+
+        >>> model = genai.GenerativeModel('gemini-1.5-flash')
+        >>> model.estimate_request_size(['Describe this', pathlib.Path('scan.pdf')])
+        3145834
+        """
+        request = self._prepare_request_config(
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            tools=tools,
+            tool_config=tool_config,
+        )
+        contents = content_types.to_contents(contents)
+        return utils.to_pb(request).ByteSize() + content_types.contents_size(contents)
+
+    def _get_rate_limiter(self, model_name: str | None = None) -> rate_limiting.RateLimiter | None:
+        if model_name is None or model_name == self._model_name:
+            if self._rate_limiter is not None:
+                return self._rate_limiter
+            model_name = self._model_name
+        return client.get_default_rate_limiter(model_name)
+
+    def _select_model(self) -> tuple[str, circuit_breaker.CircuitBreaker | None]:
+        """Returns the first model whose circuit breaker allows a call, and its breaker."""
+        model_names = [self._model_name]
+        if self.cached_content is None:
+            model_names.extend(self._fallback_models)
+
+        for model_name in model_names:
+            breaker = client.get_default_circuit_breaker(model_name)
+            if breaker is None or breaker.allow():
+                return model_name, breaker
+
+        raise circuit_breaker.CircuitOpenError(
+            f"The circuit breakers for {model_names} are open, the models are failing. "
+            "Try again later."
+        )
+
     def _get_tools_lib(
         self, tools: content_types.FunctionLibraryType
     ) -> content_types.FunctionLibrary | None:
@@ -308,31 +486,49 @@ class GenerativeModel:
             safety_settings=safety_settings,
             tools=tools,
             tool_config=tool_config,
+            # With a `file_offload` policy the large blobs are uploaded instead.
+            check_size=self._file_offloader is None,
         )
 
         if request.contents and not request.contents[-1].role:
             request.contents[-1].role = _USER_ROLE
 
+        if self._file_offloader is not None:
+            self._file_offloader.offload(request)
+
         if self._client is None:
             self._client = client.get_default_generative_client()
 
         if request_options is None:
             request_options = {}
 
+        model_name, breaker = self._select_model()
+        request.model = model_name
+
+        rate_limiter = self._get_rate_limiter(model_name)
+        with circuit_breaker.cancel_on_error(breaker):
+            tokens = rate_limiting.acquire(rate_limiter, request)
+        scheduling.reset_queue_wait()
+
         try:
             if stream:
-                with generation_types.rewrite_stream_error():
+                with generation_types.rewrite_stream_error(), circuit_breaker.track_errors(breaker):
                     iterator = self._client.stream_generate_content(
                         request,
                         **request_options,
                     )
-                return generation_types.GenerateContentResponse.from_iterator(iterator)
+                iterator = rate_limiting.track_stream(rate_limiter, tokens, iterator)
+                iterator = circuit_breaker.track_stream(breaker, iterator)
+                result = generation_types.GenerateContentResponse.from_iterator(iterator)
             else:
-                response = self._client.generate_content(
-                    request,
-                    **request_options,
-                )
-                return generation_types.GenerateContentResponse.from_response(response)
+                with circuit_breaker.track(breaker):
+                    response = self._client.generate_content(
+                        request,
+                        **request_options,
+                    )
+                rate_limiting.record(rate_limiter, tokens, response)
+                token_estimation.observe_response(model_name, request, response)
+                result = generation_types.GenerateContentResponse.from_response(response)
         except google.api_core.exceptions.InvalidArgument as e:
             if e.message.startswith("Request payload size exceeds the limit:"):
                 e.message += (
@@ -341,6 +537,9 @@ class GenerativeModel:
                 )
             raise
 
+        result.queue_wait = scheduling.last_queue_wait()
+        return result
+
     async def generate_content_async(
         self,
         contents: content_types.ContentsType,
@@ -362,31 +561,51 @@ class GenerativeModel:
             safety_settings=safety_settings,
             tools=tools,
             tool_config=tool_config,
+            # With a `file_offload` policy the large blobs are uploaded instead.
+            check_size=self._file_offloader is None,
         )
 
         if request.contents and not request.contents[-1].role:
             request.contents[-1].role = _USER_ROLE
 
+        if self._file_offloader is not None:
+            await self._file_offloader.offload_async(request)
+
         if self._async_client is None:
             self._async_client = client.get_default_generative_async_client()
 
         if request_options is None:
             request_options = {}
 
+        model_name, breaker = self._select_model()
+        request.model = model_name
+
+        rate_limiter = self._get_rate_limiter(model_name)
+        with circuit_breaker.cancel_on_error(breaker):
+            tokens = await rate_limiting.acquire_async(rate_limiter, request)
+        scheduling.reset_queue_wait()
+
         try:
             if stream:
-                with generation_types.rewrite_stream_error():
+                with generation_types.rewrite_stream_error(), circuit_breaker.track_errors(breaker):
                     iterator = await self._async_client.stream_generate_content(
                         request,
                         **request_options,
                     )
-                return await generation_types.AsyncGenerateContentResponse.from_aiterator(iterator)
-            else:
-                response = await self._async_client.generate_content(
-                    request,
-                    **request_options,
+                iterator = rate_limiting.track_stream_async(rate_limiter, tokens, iterator)
+                iterator = circuit_breaker.track_stream_async(breaker, iterator)
+                result = await generation_types.AsyncGenerateContentResponse.from_aiterator(
+                    iterator
                 )
-                return generation_types.AsyncGenerateContentResponse.from_response(response)
+            else:
+                with circuit_breaker.track(breaker):
+                    response = await self._async_client.generate_content(
+                        request,
+                        **request_options,
+                    )
+                rate_limiting.record(rate_limiter, tokens, response)
+                token_estimation.observe_response(model_name, request, response)
+                result = generation_types.AsyncGenerateContentResponse.from_response(response)
         except google.api_core.exceptions.InvalidArgument as e:
             if e.message.startswith("Request payload size exceeds the limit:"):
                 e.message += (
@@ -395,6 +614,9 @@ class GenerativeModel:
                 )
             raise
 
+        result.queue_wait = scheduling.last_queue_wait()
+        return result
+
     # fmt: off
     def count_tokens(
         self,
@@ -421,7 +643,12 @@ class GenerativeModel:
                 tools=tools,
                 tool_config=tool_config,
         ))
-        return self._client.count_tokens(request, **request_options)
+        rate_limiting.acquire(self._get_rate_limiter(), request)
+        response = self._client.count_tokens(request, **request_options)
+        token_estimation.observe(
+            self.model_name, request.generate_content_request, response.total_tokens
+        )
+        return response
 
     async def count_tokens_async(
         self,
@@ -448,10 +675,243 @@ class GenerativeModel:
                 tools=tools,
                 tool_config=tool_config,
         ))
-        return await self._async_client.count_tokens(request, **request_options)
+        await rate_limiting.acquire_async(self._get_rate_limiter(), request)
+        response = await self._async_client.count_tokens(request, **request_options)
+        token_estimation.observe(
+            self.model_name, request.generate_content_request, response.total_tokens
+        )
+        return response
 
     # fmt: on
 
+    def _count_requests(
+        self,
+        contents_list: Iterable[content_types.ContentsType],
+        *,
+        generation_config: generation_types.GenerationConfigType | None,
+        safety_settings: safety_types.SafetySettingOptions | None,
+        tools: content_types.FunctionLibraryType | None,
+        tool_config: content_types.ToolConfigType | None,
+    ) -> tuple[list[bytes], dict[bytes, Any], dict[bytes, protos.CountTokensRequest]]:
+        """Builds a `count_tokens_many` batch.
+
+        Returns the cache key of each prompt, the cached responses by key (`None` if missing),
+        and the requests to send by key: each distinct prompt that isn't cached.
+        """
+        # Encode the batch's images in parallel, each image once.
+        contents_list = content_types.encode_images(list(contents_list))
+        requests = [
+            protos.CountTokensRequest(
+                model=self.model_name,
+                generate_content_request=self._prepare_request(
+                    contents=contents,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings,
+                    tools=tools,
+                    tool_config=tool_config,
+                ),
+            )
+            for contents in contents_list
+        ]
+        keys = [token_estimation.count_cache.key(request) for request in requests]
+        results = {key: token_estimation.count_cache.get(key) for key in set(keys)}
+        pending = {key: request for key, request in zip(keys, requests) if results[key] is None}
+        return keys, results, pending
+
+    def _fill_counts(
+        self,
+        keys: list[bytes],
+        results: dict[bytes, Any],
+        pending: dict[bytes, protos.CountTokensRequest],
+        responses: list[protos.CountTokensResponse | Exception],
+        return_exceptions: bool,
+    ) -> list[protos.CountTokensResponse | Exception]:
+        """Caches the `responses` to the `pending` requests, and returns the batch's results.
+
+        All the successful counts are cached before the first failure is raised, so a retry only
+        sends the prompts that failed.
+        """
+        for (key, request), response in zip(pending.items(), responses):
+            results[key] = response
+            if not isinstance(response, BaseException):
+                token_estimation.count_cache.put(key, response)
+                token_estimation.observe(
+                    self.model_name, request.generate_content_request, response.total_tokens
+                )
+        if not return_exceptions:
+            for response in responses:
+                if isinstance(response, BaseException):
+                    raise response
+        return [results[key] for key in keys]
+
+    def count_tokens_many(
+        self,
+        contents_list: Iterable[content_types.ContentsType],
+        *,
+        generation_config: generation_types.GenerationConfigType | None = None,
+        safety_settings: safety_types.SafetySettingOptions | None = None,
+        tools: content_types.FunctionLibraryType | None = None,
+        tool_config: content_types.ToolConfigType | None = None,
+        max_concurrency: int = 8,
+        return_exceptions: bool = False,
+        request_options: helper_types.RequestOptionsType | None = None,
+    ) -> list[protos.CountTokensResponse | Exception]:
+        """Counts the tokens of many prompts, with up to `max_concurrency` calls in flight.
+
+        The counts are cached (in `token_estimation.count_cache`, an LRU cache keyed by the
+        model and the serialized prompt), so repeated prompts are only counted once, and
+        prompts that were counted before are returned without a call.
+
+        >>> model = genai.GenerativeModel('gemini-1.5-flash')
+        >>> responses = model.count_tokens_many(['Hello', 'How are you?', 'Hello'])
+        >>> [r.total_tokens for r in responses]
+        [1, 4, 1]
+
+        Args:
+            contents_list: The prompts to count, each like the `contents` of `count_tokens`.
+            max_concurrency: The maximum number of `count_tokens` calls in flight.
+            return_exceptions: If `True`, a failed count is returned as its exception in the
+                results. Otherwise the first failure is raised once all the calls are done,
+                and the successful counts are cached.
+            request_options: Options for each `count_tokens` call.
+
+        Returns:
+            A `CountTokensResponse` for each prompt, in order.
+        """
+        if max_concurrency < 1:
+            raise ValueError(
+                f"Invalid input: `max_concurrency` must be at least 1. Received: {max_concurrency}."
+            )
+        if request_options is None:
+            request_options = {}
+
+        if self._client is None:
+            self._client = client.get_default_generative_client()
+
+        keys, results, pending = self._count_requests(
+            contents_list,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            tools=tools,
+            tool_config=tool_config,
+        )
+        rate_limiter = self._get_rate_limiter()
+
+        def count(request):
+            rate_limiting.acquire(rate_limiter, request)
+            return self._client.count_tokens(request, **request_options)
+
+        responses = _map_concurrently(count, list(pending.values()), max_concurrency)
+        return self._fill_counts(keys, results, pending, responses, return_exceptions)
+
+    async def count_tokens_many_async(
+        self,
+        contents_list: Iterable[content_types.ContentsType],
+        *,
+        generation_config: generation_types.GenerationConfigType | None = None,
+        safety_settings: safety_types.SafetySettingOptions | None = None,
+        tools: content_types.FunctionLibraryType | None = None,
+        tool_config: content_types.ToolConfigType | None = None,
+        max_concurrency: int = 8,
+        return_exceptions: bool = False,
+        request_options: helper_types.RequestOptionsType | None = None,
+    ) -> list[protos.CountTokensResponse | Exception]:
+        """The async version of `GenerativeModel.count_tokens_many`."""
+        if max_concurrency < 1:
+            raise ValueError(
+                f"Invalid input: `max_concurrency` must be at least 1. Received: {max_concurrency}."
+            )
+        if request_options is None:
+            request_options = {}
+
+        if self._async_client is None:
+            self._async_client = client.get_default_generative_async_client()
+
+        keys, results, pending = self._count_requests(
+            contents_list,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+            tools=tools,
+            tool_config=tool_config,
+        )
+        rate_limiter = self._get_rate_limiter()
+
+        async def count(request):
+            await rate_limiting.acquire_async(rate_limiter, request)
+            return await self._async_client.count_tokens(request, **request_options)
+
+        responses = await _map_concurrently_async(count, list(pending.values()), max_concurrency)
+        return self._fill_counts(keys, results, pending, responses, return_exceptions)
+
+    def estimate_tokens(
+        self,
+        contents: content_types.ContentsType,
+        *,
+        tools: content_types.FunctionLibraryType | None = None,
+        tool_config: content_types.ToolConfigType | None = None,
+        max_error: float | None = None,
+        request_options: helper_types.RequestOptionsType | None = None,
+    ) -> token_estimation.TokenEstimate:
+        """Estimates the prompt's token count offline, without a `count_tokens` call.
+
+        Text is estimated from its length, with a characters-per-token ratio calibrated for
+        this model by the counts the API reports (from `count_tokens`, and the `usage_metadata`
+        of non-streaming `generate_content` calls). Images cost 258 tokens, and PDFs 258 per
+        page. Audio, video, uploaded files and cached content can't be estimated offline.
+
+        >>> model = genai.GenerativeModel('gemini-1.5-flash')
+        >>> estimate = model.estimate_tokens('Hello world')
+        >>> estimate.total_tokens, estimate.error
+        (3, 0.3)
+
+        Before calibration the error bound is 30%. After a few observations it's the largest
+        relative error of the recent estimates.
+
+        Args:
+            contents: The contents to estimate, like the `contents` of `generate_content`.
+            tools: Tools to include in the estimate, the model's tools by default.
+            tool_config: The tool config.
+            max_error: If the estimate's error bound is larger than this, or unknown, the exact
+                count is fetched with `count_tokens` instead.
+            request_options: Options for the `count_tokens` fallback.
+
+        Returns:
+            A `token_estimation.TokenEstimate`, with an `error` of `0` for an exact count.
+        """
+        request = self._prepare_request(
+            contents=contents, tools=tools, tool_config=tool_config, check_size=False
+        )
+        estimate = token_estimation.estimate(request)
+        if max_error is None or (estimate.error is not None and estimate.error <= max_error):
+            return estimate
+
+        response = self.count_tokens(
+            contents, tools=tools, tool_config=tool_config, request_options=request_options
+        )
+        return token_estimation.TokenEstimate(total_tokens=response.total_tokens, error=0.0)
+
+    async def estimate_tokens_async(
+        self,
+        contents: content_types.ContentsType,
+        *,
+        tools: content_types.FunctionLibraryType | None = None,
+        tool_config: content_types.ToolConfigType | None = None,
+        max_error: float | None = None,
+        request_options: helper_types.RequestOptionsType | None = None,
+    ) -> token_estimation.TokenEstimate:
+        """The async version of `GenerativeModel.estimate_tokens`."""
+        request = self._prepare_request(
+            contents=contents, tools=tools, tool_config=tool_config, check_size=False
+        )
+        estimate = token_estimation.estimate(request)
+        if max_error is None or (estimate.error is not None and estimate.error <= max_error):
+            return estimate
+
+        response = await self.count_tokens_async(
+            contents, tools=tools, tool_config=tool_config, request_options=request_options
+        )
+        return token_estimation.TokenEstimate(total_tokens=response.total_tokens, error=0.0)
+
     def start_chat(
         self,
         *,
@@ -558,6 +1018,11 @@ class ChatSession:
             raise NotImplementedError(
                 "Unsupported configuration: The `google.generativeai` SDK currently does not support the combination of `stream=True` and `enable_automatic_function_calling=True`."
             )
+        if self.enable_automatic_function_calling and request_options.get("hedging") is not None:
+            raise ValueError(
+                "Invalid configuration: `hedging` can't be combined with `enable_automatic_function_calling=True`, "
+                "automatic function calling isn't idempotent."
+            )
 
         tools_lib = self.model._get_tools_lib(tools)
 
@@ -687,6 +1152,11 @@ class ChatSession:
             raise NotImplementedError(
                 "Unsupported configuration: The `google.generativeai` SDK currently does not support the combination of `stream=True` and `enable_automatic_function_calling=True`."
             )
+        if self.enable_automatic_function_calling and request_options.get("hedging") is not None:
+            raise ValueError(
+                "Invalid configuration: `hedging` can't be combined with `enable_automatic_function_calling=True`, "
+                "automatic function calling isn't idempotent."
+            )
 
         tools_lib = self.model._get_tools_lib(tools)
 
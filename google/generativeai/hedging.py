@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Hedged requests: sending a duplicate of a slow call, and keeping the first response."""
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import math
+import threading
+import time
+from typing import Callable
+
+__all__ = ["HedgingPolicy"]
+
+# Only these calls are safe to send twice.
+IDEMPOTENT_METHODS = frozenset(
+    [
+        "generate_content",
+        "stream_generate_content",
+        "count_tokens",
+        "embed_content",
+        "batch_embed_contents",
+    ]
+)
+
+# The number of latencies a `HedgingPolicy` remembers.
+_WINDOW = 100
+# A percentile delay isn't used until this many latencies are observed.
+_MIN_SAMPLES = 20
+# Sync calls run in these threads, so the caller can stop waiting for a slow call.
+_MAX_WORKERS = 64
+
+
+class HedgingPolicy:
+    """Sends a duplicate of a call that's slower than usual, and keeps the first response.
+
+    >>> import google.generativeai as genai
+    >>> from google.generativeai.types import HedgingPolicy, RequestOptions
+    >>>
+    >>> hedging = HedgingPolicy(percentile=95, delay=2.0, max_extra_fraction=0.05)
+    >>> model = genai.GenerativeModel('gemini-1.5-flash')
+    >>> response = model.generate_content(
+    ...     'Hello', request_options=RequestOptions(hedging=hedging))
+
+    If the call hasn't returned a response (or, for a stream, its first chunk) after the
+    delay, a second identical call is sent. Whichever responds first is returned, and the
+    other is cancelled. Errors aren't hedged: the first call's error is raised unless the
+    duplicate succeeds.
+
+    Sync calls run on a pool of 64 threads, and the delay only starts once the call is
+    running, so calls waiting for a thread aren't hedged. A sync call can't be interrupted
+    once it's sent: a losing stream is cancelled, but a losing unary call runs to completion
+    in its thread, and its response is dropped. Async calls are cancelled either way.
+
+    A policy keeps track of the latencies it sees, and of the extra traffic it causes, so
+    share one policy between the calls it applies to.
+
+    Hedging only applies to idempotent calls: `generate_content` (without automatic
+    function calling), `count_tokens` and `embed_content`.
+
+    Args:
+        delay: Seconds to wait before sending the duplicate.
+        percentile: Wait for this percentile (0-100) of the recently observed latencies
+            instead. `delay` is used until enough latencies have been observed, if neither
+            is available there's no hedging.
+        max_extra_fraction: The maximum number of duplicates, as a fraction of the calls
+            made with this policy.
+    """
+
+    def __init__(
+        self,
+        *,
+        delay: float | None = None,
+        percentile: float | None = None,
+        max_extra_fraction: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if delay is None and percentile is None:
+            raise ValueError(
+                "Invalid configuration: A `HedgingPolicy` requires a `delay`, a `percentile`, or both."
+            )
+        if delay is not None and delay < 0:
+            raise ValueError(
+                f"Invalid configuration: `delay` must not be negative. Received: {delay}."
+            )
+        if percentile is not None and not 0 < percentile < 100:
+            raise ValueError(
+                f"Invalid configuration: `percentile` must be between 0 and 100. Received: {percentile}."
+            )
+        if not 0 < max_extra_fraction <= 1:
+            raise ValueError(
+                "Invalid configuration: `max_extra_fraction` must be greater than 0, and at most 1. "
+                f"Received: {max_extra_fraction}."
+            )
+
+        self._delay = delay
+        self._percentile = percentile
+        self._max_extra_fraction = max_extra_fraction
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._latencies: collections.deque[float] = collections.deque(maxlen=_WINDOW)
+        # Each call earns `max_extra_fraction` of a duplicate, up to one in reserve.
+        self._budget = 0.0
+        self._calls = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    @property
+    def calls(self) -> int:
+        """The number of calls made with this policy."""
+        return self._calls
+
+    @property
+    def hedges(self) -> int:
+        """The number of duplicate calls sent."""
+        return self._hedges
+
+    @property
+    def hedge_wins(self) -> int:
+        """The number of calls where the duplicate responded first."""
+        return self._hedge_wins
+
+    def __repr__(self):
+        return (
+            f"HedgingPolicy(delay={self._delay}, percentile={self._percentile}, "
+            f"max_extra_fraction={self._max_extra_fraction})"
+        )
+
+    def _begin(self):
+        with self._lock:
+            self._calls += 1
+            self._budget = min(1.0, self._budget + self._max_extra_fraction)
+
+    def delay(self) -> float | None:
+        """The number of seconds a call waits before it's hedged, `None` for no hedging."""
+        with self._lock:
+            if self._percentile is None or len(self._latencies) < _MIN_SAMPLES:
+                return self._delay
+            latencies = sorted(self._latencies)
+        index = math.ceil(self._percentile / 100 * len(latencies)) - 1
+        return latencies[index]
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self._budget < 1.0:
+                return False
+            self._budget -= 1.0
+            self._hedges += 1
+            return True
+
+    def _record(self, start: float, hedge_won: bool):
+        latency = self._clock() - start
+        with self._lock:
+            self._latencies.append(latency)
+            if hedge_won:
+                self._hedge_wins += 1
+
+
+_EMPTY = object()
+
+
+class _HedgedStream:
+    """A stream whose first chunk was already read while racing the other call."""
+
+    def __init__(self, stream, iterator, first):
+        self._stream = stream
+        self._iterator = iterator
+        self._first = first
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        first, self._first = self._first, _EMPTY
+        if first is not _EMPTY:
+            return first
+        return next(self._iterator)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        first, self._first = self._first, _EMPTY
+        if first is not _EMPTY:
+            return first
+        return await self._iterator.__anext__()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _TaskExecutor(concurrent.futures.Executor):
+    """Runs coroutine functions as tasks, the async counterpart of the thread pool."""
+
+    def submit(self, f, *args):
+        return asyncio.ensure_future(f(*args))
+
+
+# Threads are only started as calls are submitted.
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=_MAX_WORKERS, thread_name_prefix="genai-hedging"
+)
+_executor_async = _TaskExecutor()
+_Event = threading.Event
+_AsyncEvent = asyncio.Event
+_wait = concurrent.futures.wait
+_wait_async = asyncio.wait
+
+
+def _cancel_stream(attempt):
+    if attempt.cancelled() or attempt.exception() is not None:
+        return
+    result = attempt.result()
+    if isinstance(result, _HedgedStream) and hasattr(result, "cancel"):
+        result.cancel()
+
+
+def _discard(attempt):
+    """Cancels a losing call, or closes its stream if it's too late to cancel the call."""
+    attempt.cancel()
+    attempt.add_done_callback(_cancel_stream)
+
+
+def _first_response(started, call, streaming, args, kwargs):
+    started.set()
+    response = call(*args, **kwargs)
+    if not streaming:
+        return response
+    iterator = response.__iter__()
+    try:
+        first = iterator.__next__()
+    except StopIteration:
+        first = _EMPTY
+    return _HedgedStream(response, iterator, first)
+
+
+async def _first_response_async(started, call, streaming, args, kwargs):
+    started.set()
+    response = await call(*args, **kwargs)
+    if not streaming:
+        return response
+    # `grpc.aio` calls are only async iterables, not iterators.
+    iterator = response.__aiter__()
+    try:
+        first = await iterator.__anext__()
+    except StopAsyncIteration:
+        first = _EMPTY
+    return _HedgedStream(response, iterator, first)
+
+
+def hedge(policy: HedgingPolicy, call, streaming: bool, args, kwargs):
+    """Makes the call, hedged according to `policy`."""
+    policy._begin()
+    started = _Event()
+    primary = _executor.submit(_first_response, started, call, streaming, args, kwargs)
+    pending = {primary}
+    try:
+        # Time spent waiting for a thread doesn't count towards the delay.
+        started.wait()
+        start = policy._clock()
+        done, pending = _wait(pending, timeout=policy.delay())
+        if not done and policy._take_hedge():
+            pending.add(_executor.submit(_first_response, _Event(), call, streaming, args, kwargs))
+
+        error = None
+        while True:
+            for attempt in done:
+                if attempt.exception() is None:
+                    policy._record(start, hedge_won=attempt is not primary)
+                    return attempt.result()
+                error = error or attempt.exception()
+            if not pending:
+                raise error
+            done, pending = _wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+    finally:
+        for attempt in pending:
+            _discard(attempt)
+
+
+async def hedge_async(policy: HedgingPolicy, call, streaming: bool, args, kwargs):
+    """The async version of `hedge`."""
+    policy._begin()
+    started = _AsyncEvent()
+    primary = _executor_async.submit(_first_response_async, started, call, streaming, args, kwargs)
+    pending = {primary}
+    try:
+        await started.wait()
+        start = policy._clock()
+        done, pending = await _wait_async(pending, timeout=policy.delay())
+        if not done and policy._take_hedge():
+            pending.add(
+                _executor_async.submit(
+                    _first_response_async, _AsyncEvent(), call, streaming, args, kwargs
+                )
+            )
+
+        error = None
+        while True:
+            for attempt in done:
+                if attempt.exception() is None:
+                    policy._record(start, hedge_won=attempt is not primary)
+                    return attempt.result()
+                error = error or attempt.exception()
+            if not pending:
+                raise error
+            done, pending = await _wait_async(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+    finally:
+        for attempt in pending:
+            _discard(attempt)
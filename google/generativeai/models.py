@@ -15,7 +15,7 @@
 from __future__ import annotations
 
 import typing
-from typing import Any, Literal
+from typing import Any, Iterable, Literal
 
 import google.ai.generativelanguage as glm
 
@@ -35,7 +35,8 @@ def get_model(
     *,
     client=None,
     request_options: helper_types.RequestOptionsType | None = None,
-) -> model_types.Model | model_types.TunedModel:
+    raw: bool = False,
+) -> model_types.Model | model_types.TunedModel | protos.Model | protos.TunedModel:
     """Calls the API to fetch a model by name.
 
     ```
@@ -48,15 +49,16 @@ def get_model(
         name: The name of the model to fetch. Should start with `models/`
         client: The client to use.
         request_options: Options for the request.
+        raw: If `True`, return the API's `protos.Model` or `protos.TunedModel`.
 
     Returns:
         A `types.Model`
     """
     name = model_types.make_model_name(name)
     if name.startswith("models/"):
-        return get_base_model(name, client=client, request_options=request_options)
+        return get_base_model(name, client=client, request_options=request_options, raw=raw)
     elif name.startswith("tunedModels/"):
-        return get_tuned_model(name, client=client, request_options=request_options)
+        return get_tuned_model(name, client=client, request_options=request_options, raw=raw)
     else:
         raise ValueError(
             f"Invalid model name: Model names must start with `models/` or `tunedModels/`. Received: {name}"
@@ -68,7 +70,8 @@ def get_base_model(
     *,
     client=None,
     request_options: helper_types.RequestOptionsType | None = None,
-) -> model_types.Model:
+    raw: bool = False,
+) -> model_types.Model | protos.Model:
     """Calls the API to fetch a base model by name.
 
     ```
@@ -81,6 +84,7 @@ def get_base_model(
         name: The name of the model to fetch. Should start with `models/`
         client: The client to use.
         request_options: Options for the request.
+        raw: If `True`, return the API's `protos.Model` without converting it.
 
     Returns:
         A `types.Model`.
@@ -98,6 +102,8 @@ def get_base_model(
         )
 
     result = client.get_model(name=name, **request_options)
+    if raw:
+        return result
     result = type(result).to_dict(result)
     return model_types.Model(**result)
 
@@ -107,7 +113,8 @@ def get_tuned_model(
     *,
     client=None,
     request_options: helper_types.RequestOptionsType | None = None,
-) -> model_types.TunedModel:
+    raw: bool = False,
+) -> model_types.TunedModel | protos.TunedModel:
     """Calls the API to fetch a tuned model by name.
 
     ```
@@ -120,6 +127,7 @@ def get_tuned_model(
         name: The name of the model to fetch. Should start with `tunedModels/`
         client: The client to use.
         request_options: Options for the request.
+        raw: If `True`, return the API's `protos.TunedModel` without decoding it.
 
     Returns:
         A `types.TunedModel`.
@@ -138,6 +146,8 @@ def get_tuned_model(
         )
 
     result = client.get_tuned_model(name=name, **request_options)
+    if raw:
+        return result
 
     return model_types.decode_tuned_model(result)
 
@@ -177,7 +187,8 @@ def list_models(
     page_size: int | None = 50,
     client: glm.ModelServiceClient | None = None,
     request_options: helper_types.RequestOptionsType | None = None,
-) -> model_types.ModelsIterable:
+    raw: bool = False,
+) -> model_types.ModelsIterable | Iterable[protos.Model]:
     """Calls the API to list all available models.
 
     ```
@@ -190,6 +201,7 @@ def list_models(
         page_size: How many `types.Models` to fetch per page (api call).
         client: You may pass a `glm.ModelServiceClient` instead of using the default client.
         request_options: Options for the request.
+        raw: If `True`, yield the API's `protos.Model` objects without converting them.
 
     Yields:
         `types.Model` objects.
@@ -202,6 +214,9 @@ def list_models(
         client = get_default_model_client()
 
     for model in client.list_models(page_size=page_size, **request_options):
+        if raw:
+            yield model
+            continue
         model = type(model).to_dict(model)
         yield model_types.Model(**model)
 
@@ -211,7 +226,8 @@ def list_tuned_models(
     page_size: int | None = 50,
     client: glm.ModelServiceClient | None = None,
     request_options: helper_types.RequestOptionsType | None = None,
-) -> model_types.TunedModelsIterable:
+    raw: bool = False,
+) -> model_types.TunedModelsIterable | Iterable[protos.TunedModel]:
     """Calls the API to list all tuned models.
 
     ```
@@ -224,6 +240,7 @@ def list_tuned_models(
         page_size: How many `types.Models` to fetch per page (api call).
         client: You may pass a `glm.ModelServiceClient` instead of using the default client.
         request_options: Options for the request.
+        raw: If `True`, yield the API's `protos.TunedModel` objects without decoding them.
 
     Yields:
         `types.TunedModel` objects.
@@ -238,6 +255,9 @@ def list_tuned_models(
         page_size=page_size,
         **request_options,
     ):
+        if raw:
+            yield model
+            continue
         model = type(model).to_dict(model)
         yield model_types.decode_tuned_model(model)
 
@@ -17,6 +17,8 @@ from __future__ import annotations
 
 from google.api_core import retry
 import google.generativeai as genai
+from google.generativeai import client
+from google.generativeai import retry_budget
 from google.generativeai.types import generation_types
 from google.generativeai.notebook.lib import model as model_lib
 
@@ -54,7 +56,10 @@ class TextModel(model_lib.AbstractModel):
 
         # Wrap the generation function here, rather than decorate, so that it
         # applies to any overridden calls too.
-        retryable_fn = retry.Retry(retry.if_transient_error)(self._generate_text)
+        retry_policy = retry_budget.with_budget(
+            retry.Retry(retry.if_transient_error), client.get_default_retry_budget()
+        )
+        retryable_fn = retry_policy(self._generate_text)
         response = retryable_fn(
             prompt=model_input,
             model=model_args.model,
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Client side pacing of requests to stay under the API's rate limits."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterable, Iterable, Mapping
+import threading
+import time
+from typing import Callable, Union
+from typing_extensions import TypedDict
+
+from google.generativeai import protos
+from google.generativeai import token_estimation
+
+__all__ = ["RateLimiter", "RateLimiterDict", "RateLimiterOptions"]
+
+_ESTIMATED_REQUESTS = (
+    protos.GenerateContentRequest,
+    protos.EmbedContentRequest,
+    protos.BatchEmbedContentsRequest,
+)
+
+_sleep = time.sleep
+_sleep_async = asyncio.sleep
+
+
+class _Bucket:
+    """A token bucket that refills continuously at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # Requests larger than the bucket only wait for a full bucket.
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+
+class RateLimiter:
+    """Paces calls to stay under a requests-per-minute and a tokens-per-minute limit.
+
+    >>> import google.generativeai as genai
+    >>> limiter = genai.RateLimiter(requests_per_minute=15, tokens_per_minute=1_000_000)
+    >>> model = genai.GenerativeModel('gemini-1.5-flash', rate_limiter=limiter)
+
+    Or, to share limiters between all users of a model:
+
+    >>> genai.configure(rate_limits={'gemini-1.5-flash': dict(requests_per_minute=15)})
+
+    Both limits are token buckets, so short bursts up to a minute's budget are allowed.
+    The token cost of a call is estimated from the request before the call is sent, and
+    corrected afterwards with the `usage_metadata.prompt_token_count` the API reports.
+
+    A limiter is thread safe. Sync and async calls draw on the same buckets, so a limiter
+    passed to several models paces their combined traffic.
+
+    Args:
+        requests_per_minute: The maximum number of calls per minute, or `None` for no limit.
+        tokens_per_minute: The maximum number of prompt tokens per minute, or `None` for no limit.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        for name, value in [
+            ("requests_per_minute", requests_per_minute),
+            ("tokens_per_minute", tokens_per_minute),
+        ]:
+            if value is not None and value <= 0:
+                raise ValueError(
+                    f"Invalid value: `{name}` must be a positive number. Received: {value}."
+                )
+
+        self._clock = clock
+        self._lock = threading.Lock()
+        now = clock()
+        self._requests = None if requests_per_minute is None else _Bucket(requests_per_minute, now)
+        self._tokens = None if tokens_per_minute is None else _Bucket(tokens_per_minute, now)
+
+    def __repr__(self):
+        rpm = None if self._requests is None else self._requests.capacity
+        tpm = None if self._tokens is None else self._tokens.capacity
+        return f"RateLimiter(requests_per_minute={rpm}, tokens_per_minute={tpm})"
+
+    def _reserve(self, tokens: int) -> float:
+        """Takes capacity for one call if it's available, otherwise returns the time to wait."""
+        with self._lock:
+            now = self._clock()
+            wait = 0.0
+            if self._requests is not None:
+                self._requests.refill(now)
+                wait = max(wait, self._requests.wait_time(1))
+            if self._tokens is not None:
+                self._tokens.refill(now)
+                wait = max(wait, self._tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 0):
+        """Blocks until there is capacity for a call costing `tokens`, and takes it."""
+        while (wait := self._reserve(tokens)) > 0:
+            _sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        """The async version of `RateLimiter.acquire`."""
+        while (wait := self._reserve(tokens)) > 0:
+            await _sleep_async(wait)
+
+    def correct(self, estimated_tokens: int, actual_tokens: int):
+        """Replaces the estimated token cost of a call with its actual cost."""
+        if self._tokens is None:
+            return
+        with self._lock:
+            self._tokens.refill(self._clock())
+            level = self._tokens.level + estimated_tokens - actual_tokens
+            self._tokens.level = min(self._tokens.capacity, level)
+
+
+class RateLimiterDict(TypedDict, total=False):
+    requests_per_minute: float
+    tokens_per_minute: float
+
+
+RateLimiterOptions = Union[RateLimiter, RateLimiterDict]
+
+
+def to_rate_limiter(limiter: RateLimiterOptions) -> RateLimiter:
+    if isinstance(limiter, RateLimiter):
+        return limiter
+    elif isinstance(limiter, Mapping):
+        return RateLimiter(**limiter)
+    else:
+        raise TypeError(
+            "Invalid input type. Expected a `RateLimiter` or a `dict` of its arguments.\n"
+            f"However, received an object of type: {type(limiter)}.\n"
+            f"Object Value: {limiter}"
+        )
+
+
+def estimate_tokens(request) -> int:
+    """Estimates the prompt tokens in a request, for pacing only.
+
+    This uses the offline `token_estimation`, the estimate is corrected once the response
+    arrives.
+    """
+    if isinstance(request, _ESTIMATED_REQUESTS):
+        return token_estimation.estimate(request).total_tokens
+    else:
+        # `count_tokens` doesn't consume the token quota.
+        return 0
+
+
+def acquire(limiter: RateLimiter | None, request) -> int:
+    """Waits for capacity to send `request`, returns the estimated token cost."""
+    if limiter is None:
+        return 0
+    tokens = estimate_tokens(request)
+    limiter.acquire(tokens)
+    return tokens
+
+
+async def acquire_async(limiter: RateLimiter | None, request) -> int:
+    """The async version of `acquire`."""
+    if limiter is None:
+        return 0
+    tokens = estimate_tokens(request)
+    await limiter.acquire_async(tokens)
+    return tokens
+
+
+def record(limiter: RateLimiter | None, tokens: int, response):
+    """Corrects the estimated cost of a call with the `usage_metadata` of its response."""
+    if limiter is None or "usage_metadata" not in response:
+        return
+    limiter.correct(tokens, response.usage_metadata.prompt_token_count)
+
+
+def track_stream(
+    limiter: RateLimiter | None, tokens: int, iterator: Iterable[protos.GenerateContentResponse]
+) -> Iterable[protos.GenerateContentResponse]:
+    """Corrects the estimated cost of a streaming call once the stream is complete."""
+    last = None
+    for chunk in iterator:
+        last = chunk
+        yield chunk
+    if last is not None:
+        record(limiter, tokens, last)
+
+
+async def track_stream_async(
+    limiter: RateLimiter | None,
+    tokens: int,
+    iterator: AsyncIterable[protos.GenerateContentResponse],
+) -> AsyncIterable[protos.GenerateContentResponse]:
+    """The async version of `track_stream`."""
+    last = None
+    async for chunk in iterator:
+        last = chunk
+        yield chunk
+    if last is not None:
+        record(limiter, tokens, last)
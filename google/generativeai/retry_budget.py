@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A process-wide budget for retries, so retries can't multiply the load during an outage."""
+from __future__ import annotations
+
+import asyncio
+import collections
+import functools
+import itertools
+import random
+import threading
+import time
+from typing import Callable
+
+from google.api_core import exceptions
+from google.api_core import retry as api_retry
+
+__all__ = ["RetryBudget"]
+
+_sleep = time.sleep
+_sleep_async = asyncio.sleep
+_jitter = random.uniform
+
+
+class RetryBudget:
+    """Caps retries at a fraction of the recent successful calls.
+
+    Within any `window` seconds, at most `min_retries + ratio * successes` retries are
+    allowed. Once the budget is spent the call's error is raised immediately, instead of
+    retrying.
+
+    The `retries_attempted` and `retries_denied` counters report the budget's activity.
+
+    >>> import google.generativeai as genai
+    >>> from google.generativeai.retry_budget import RetryBudget
+    >>> genai.configure(retry_budget=RetryBudget(ratio=0.2))
+    >>> budget = genai.client.get_default_retry_budget()
+    >>> budget.retries_attempted, budget.retries_denied
+    (0, 0)
+
+    Args:
+        ratio: Retries allowed per successful call.
+        min_retries: Retries allowed per window regardless of the number of successes, so
+            that low-traffic callers can still retry.
+        window: The length of the window in seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        ratio: float = 0.1,
+        min_retries: int = 10,
+        window: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if ratio < 0 or min_retries < 0 or window <= 0:
+            raise ValueError(
+                "Invalid configuration: `ratio` and `min_retries` must not be negative, and `window` "
+                f"must be positive. Received: ratio={ratio}, min_retries={min_retries}, window={window}."
+            )
+        self._ratio = ratio
+        self._min_retries = min_retries
+        self._window = window
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._successes: collections.deque[float] = collections.deque()
+        self._retries: collections.deque[float] = collections.deque()
+        self._retries_attempted = 0
+        self._retries_denied = 0
+
+    @property
+    def retries_attempted(self) -> int:
+        """The number of retries the budget allowed."""
+        return self._retries_attempted
+
+    @property
+    def retries_denied(self) -> int:
+        """The number of retries the budget refused."""
+        return self._retries_denied
+
+    def __repr__(self):
+        return (
+            f"RetryBudget(retries_attempted={self.retries_attempted}, "
+            f"retries_denied={self.retries_denied})"
+        )
+
+    def _expire(self, now: float):
+        for times in (self._successes, self._retries):
+            while times and times[0] <= now - self._window:
+                times.popleft()
+
+    def record_success(self):
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            self._successes.append(now)
+
+    def try_retry(self) -> bool:
+        """Takes one retry from the budget, returns `False` if it's spent."""
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            if len(self._retries) >= self._min_retries + self._ratio * len(self._successes):
+                self._retries_denied += 1
+                return False
+            self._retries.append(now)
+            self._retries_attempted += 1
+            return True
+
+
+def retry_after(error: BaseException) -> float | None:
+    """Returns the delay the server asked for in `error`, if any, in seconds."""
+    # gRPC errors carry a `google.rpc.RetryInfo` detail.
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+
+    # REST errors carry a `Retry-After` header.
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", None))
+    except (TypeError, ValueError):
+        return None
+
+
+class BudgetedRetry:
+    """Applies an `api_core` `Retry` or `AsyncRetry`, but spends a `RetryBudget` on each retry.
+
+    The delays use "full jitter": a random time between zero and the `Retry`'s exponential
+    backoff, or the server's retry-after hint if that's longer. Like the `Retry` itself, a
+    `RetryError` is raised when its timeout would be exceeded. When the budget is spent, the
+    last error is raised.
+    """
+
+    def __init__(self, retry: api_retry.Retry | api_retry.AsyncRetry, budget: RetryBudget):
+        self._retry = retry
+        self._budget = budget
+
+    @property
+    def retry(self):
+        return self._retry
+
+    def _delay(self, error: Exception, attempt: int, deadline: float | None) -> float | None:
+        """Returns the time to wait before retrying, or `None` to give up with `error`.
+
+        Raises:
+            google.api_core.exceptions.RetryError: If the delay would exceed the deadline.
+        """
+        retry = self._retry
+        if not retry._predicate(error):
+            return None
+        if retry._on_error is not None:
+            retry._on_error(error)
+
+        backoff = min(retry._maximum, retry._initial * retry._multiplier**attempt)
+        delay = _jitter(0, backoff)
+        hint = retry_after(error)
+        if hint is not None:
+            delay = max(delay, hint)
+
+        if deadline is not None and time.monotonic() + delay > deadline:
+            raise exceptions.RetryError(
+                f"Timeout of {retry._timeout:0.1f}s exceeded", error
+            ) from error
+        if not self._budget.try_retry():
+            return None
+        return delay
+
+    def _deadline(self) -> float | None:
+        if self._retry._timeout is None:
+            return None
+        return time.monotonic() + self._retry._timeout
+
+    def _call(self, func, *args, **kwargs):
+        deadline = self._deadline()
+        for attempt in itertools.count():
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = self._delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                _sleep(delay)
+            else:
+                self._budget.record_success()
+                return result
+
+    async def _call_async(self, func, *args, **kwargs):
+        deadline = self._deadline()
+        for attempt in itertools.count():
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                await _sleep_async(delay)
+            else:
+                self._budget.record_success()
+                return result
+
+    def __call__(self, func):
+        if isinstance(self._retry, api_retry.AsyncRetry):
+            return functools.wraps(func)(functools.partial(self._call_async, func))
+        return functools.wraps(func)(functools.partial(self._call, func))
+
+
+def with_budget(retry, budget: RetryBudget | None):
+    """Returns `retry`, spending `budget` if it's a `Retry` or `AsyncRetry`."""
+    if budget is None or not isinstance(retry, (api_retry.Retry, api_retry.AsyncRetry)):
+        return retry
+    return BudgetedRetry(retry, budget)
+
+
+def apply_to_transport(transport, budget: RetryBudget):
+    """Makes the default retries of a GAPIC transport's methods spend `budget`."""
+    for method in getattr(transport, "_wrapped_methods", {}).values():
+        if hasattr(method, "_retry"):
+            method._retry = with_budget(method._retry, budget)
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Priority classes for calls that share a concurrency ceiling."""
+from __future__ import annotations
+
+import collections
+from collections.abc import Mapping
+import contextvars
+import dataclasses
+import threading
+import time
+from typing import Callable
+
+import google.api_core.exceptions
+
+from google.generativeai import concurrency
+
+__all__ = ["PriorityScheduler", "last_queue_wait"]
+
+DEFAULT_WEIGHTS = {"interactive": 8.0, "default": 4.0, "batch": 1.0}
+
+_queue_wait: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "queue_wait", default=None
+)
+
+
+def last_queue_wait() -> float | None:
+    """Returns the seconds the last scheduled call in this thread (or task) spent queued.
+
+    Returns `None` if no call has been scheduled since `reset_queue_wait`.
+    """
+    return _queue_wait.get()
+
+
+def reset_queue_wait():
+    _queue_wait.set(None)
+
+
+@dataclasses.dataclass(eq=False)
+class _Entry:
+    ticket: concurrency._Ticket | concurrency._AsyncTicket
+    priority: str
+    finish: float
+    deadline: float | None
+    granted: bool = False
+    expired: bool = False
+
+
+class PriorityScheduler:
+    """Queues calls by priority class, and limits the number of calls in flight.
+
+    Each class gets a share of the `max_concurrency` slots in proportion to its weight
+    (weighted fair queuing): with the default weights, while both classes have calls waiting,
+    8 `"interactive"` calls start for each `"batch"` call. No class is starved, and a class
+    with nothing queued doesn't reserve any slots.
+
+    A queued call with a `timeout` is dropped once the timeout passes, raising
+    `DeadlineExceeded` without being sent. The time spent in the queue counts against the
+    call's timeout.
+
+    Sync and async calls are queued together and compete for the same slots, so the weights
+    hold across a program's threads and its event loop.
+
+    >>> import google.generativeai as genai
+    >>> genai.configure(scheduler=genai.scheduling.PriorityScheduler(max_concurrency=32))
+    >>> model = genai.GenerativeModel('gemini-1.5-flash')
+    >>> response = model.generate_content('Hello', request_options={'priority': 'interactive'})
+    >>> wait_seconds = response.queue_wait
+
+    Args:
+        max_concurrency: The maximum number of calls in flight, across all classes.
+        weights: A `{priority: weight}` mapping of the priority classes.
+        default_priority: The class of calls that don't set a priority.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 16,
+        weights: Mapping[str, float] | None = None,
+        default_priority: str = "default",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if weights is None:
+            weights = DEFAULT_WEIGHTS
+        if max_concurrency < 1:
+            raise ValueError(
+                f"Invalid configuration: `max_concurrency` must be at least 1. Received: {max_concurrency}."
+            )
+        if not weights or any(weight <= 0 for weight in weights.values()):
+            raise ValueError(
+                f"Invalid configuration: Each priority needs a positive weight. Received: {weights}."
+            )
+        if default_priority not in weights:
+            raise ValueError(
+                f"Invalid configuration: `default_priority` must be one of {list(weights)}. "
+                f"Received: {default_priority!r}."
+            )
+
+        self._max_concurrency = max_concurrency
+        self._weights = dict(weights)
+        self._default_priority = default_priority
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queues: dict[str, collections.deque[_Entry]] = {
+            priority: collections.deque() for priority in self._weights
+        }
+        # Virtual time advances with each call started, so idle classes don't bank credit.
+        self._virtual_time = 0.0
+        self._last_finish = dict.fromkeys(self._weights, 0.0)
+        self._expired = 0
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    @property
+    def in_flight(self) -> int:
+        """The number of calls holding a slot."""
+        return self._in_flight
+
+    @property
+    def queue_depths(self) -> dict[str, int]:
+        """The number of calls waiting in each priority class."""
+        with self._lock:
+            return {priority: len(queue) for priority, queue in self._queues.items()}
+
+    @property
+    def expired(self) -> int:
+        """The number of calls dropped because their deadline passed while queued."""
+        return self._expired
+
+    def __repr__(self):
+        return (
+            f"PriorityScheduler(max_concurrency={self.max_concurrency}, "
+            f"in_flight={self.in_flight}, queue_depths={self.queue_depths})"
+        )
+
+    def _to_priority(self, priority: str | None) -> str:
+        if priority is None:
+            return self._default_priority
+        if priority not in self._weights:
+            raise ValueError(
+                f"Invalid request option: `priority` must be one of {list(self._weights)}. "
+                f"Received: {priority!r}."
+            )
+        return priority
+
+    def _dispatch(self, now: float) -> list[_Entry]:
+        """Expires overdue entries, and fills the free slots. Requires the lock."""
+        ready = []
+        for queue in self._queues.values():
+            overdue = [e for e in queue if e.deadline is not None and e.deadline <= now]
+            for entry in overdue:
+                queue.remove(entry)
+                entry.expired = True
+                self._expired += 1
+                ready.append(entry)
+
+        while self._in_flight < self._max_concurrency:
+            queues = [queue for queue in self._queues.values() if queue]
+            if not queues:
+                break
+            entry = min(queues, key=lambda queue: queue[0].finish).popleft()
+            entry.granted = True
+            self._in_flight += 1
+            self._virtual_time = entry.finish
+            ready.append(entry)
+        return ready
+
+    def _enqueue(self, ticket, priority: str | None, timeout: float | None) -> _Entry:
+        priority = self._to_priority(priority)
+        now = self._clock()
+        with self._lock:
+            start = max(self._virtual_time, self._last_finish[priority])
+            entry = _Entry(
+                ticket=ticket,
+                priority=priority,
+                finish=start + 1 / self._weights[priority],
+                deadline=None if timeout is None else now + timeout,
+            )
+            self._last_finish[priority] = entry.finish
+            self._queues[priority].append(entry)
+            ready = self._dispatch(now)
+
+        for other in ready:
+            if other is not entry:
+                other.ticket()
+        return entry
+
+    def _abandon(self, entry: _Entry):
+        """Cleans up after an entry whose caller stopped waiting."""
+        with self._lock:
+            if not entry.granted:
+                if not entry.expired:
+                    self._queues[entry.priority].remove(entry)
+                    entry.expired = True
+                    self._expired += 1
+                return
+        self.release()
+
+    def _time_left(self, entry: _Entry) -> float | None:
+        if entry.deadline is None:
+            return None
+        return max(0.0, entry.deadline - self._clock())
+
+    def _check_granted(self, entry: _Entry):
+        if not entry.granted:
+            self._abandon(entry)
+            raise google.api_core.exceptions.DeadlineExceeded(
+                f"Deadline exceeded while queued with priority {entry.priority!r}."
+            )
+
+    def acquire(self, priority: str | None = None, timeout: float | None = None) -> float:
+        """Blocks until the call may start. Call `release` once it's done.
+
+        Args:
+            priority: The call's priority class.
+            timeout: The call's timeout in seconds, if it has one.
+
+        Returns:
+            The number of seconds the call was queued.
+
+        Raises:
+            DeadlineExceeded: If the `timeout` passed while the call was queued.
+        """
+        start = self._clock()
+        entry = self._enqueue(concurrency._Ticket(), priority, timeout)
+        if not entry.granted:
+            try:
+                entry.ticket.wait(self._time_left(entry))
+            except BaseException:
+                self._abandon(entry)
+                raise
+        self._check_granted(entry)
+        return self._clock() - start
+
+    async def acquire_async(
+        self, priority: str | None = None, timeout: float | None = None
+    ) -> float:
+        """The async version of `PriorityScheduler.acquire`."""
+        start = self._clock()
+        entry = self._enqueue(concurrency._AsyncTicket(), priority, timeout)
+        if not entry.granted:
+            try:
+                await entry.ticket.wait_async(self._time_left(entry))
+            except BaseException:
+                self._abandon(entry)
+                raise
+        self._check_granted(entry)
+        return self._clock() - start
+
+    def release(self):
+        """Frees the slot taken by `acquire`."""
+        with self._lock:
+            self._in_flight -= 1
+            ready = self._dispatch(self._clock())
+
+        for entry in ready:
+            entry.ticket()
@@ -145,7 +145,8 @@ def generate_text(
     stop_sequences: str | Iterable[str] | None = None,
     client: glm.TextServiceClient | None = None,
     request_options: helper_types.RequestOptionsType | None = None,
-) -> text_types.Completion:
+    raw: bool = False,
+) -> text_types.Completion | protos.GenerateTextResponse:
     """Calls the API to generate text based on the provided prompt.
 
     Args:
@@ -186,6 +187,7 @@ def generate_text(
           sequence. The stop sequence will not be included as part of the response.
         client: If you're not relying on a default client, you pass a `glm.TextServiceClient` instead.
         request_options: Options for the request.
+        raw: If `True`, return the API's `protos.GenerateTextResponse` without converting it.
 
     Returns:
         A `types.Completion` containing the model's text completion response.
@@ -202,7 +204,9 @@ def generate_text(
         stop_sequences=stop_sequences,
     )
 
-    return _generate_response(client=client, request=request, request_options=request_options)
+    return _generate_response(
+        client=client, request=request, request_options=request_options, raw=raw
+    )
 
 
 @string_utils.prettyprint
@@ -221,7 +225,8 @@ def _generate_response(
     request: protos.GenerateTextRequest,
     client: glm.TextServiceClient = None,
     request_options: helper_types.RequestOptionsType | None = None,
-) -> Completion:
+    raw: bool = False,
+) -> Completion | protos.GenerateTextResponse:
     """
     Generates a response using the provided `protos.GenerateTextRequest` and client.
 
@@ -230,6 +235,7 @@ def _generate_response(
         client: The client to use for text generation. Defaults to None, in which
             case the default text client is used.
         request_options: Options for the request.
+        raw: If `True`, return the `protos.GenerateTextResponse` without converting it.
 
     Returns:
         `Completion`: A `Completion` object with the generated text and response information.
@@ -241,6 +247,8 @@ def _generate_response(
         client = get_default_text_client()
 
     response = client.generate_text(request, **request_options)
+    if raw:
+        return response
     response = type(response).to_dict(response)
 
     response["filters"] = palm_safety_types.convert_filters_to_enums(response["filters"])
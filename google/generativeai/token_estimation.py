@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Offline estimates of prompt token counts, calibrated by the counts the API reports."""
+from __future__ import annotations
+
+import collections
+import copy
+import dataclasses
+import hashlib
+import math
+import re
+import threading
+
+from google.generativeai import protos
+
+__all__ = ["TokenCountCache", "TokenEstimate"]
+
+# The documented costs, see https://ai.google.dev/gemini-api/docs/tokens
+IMAGE_TOKENS = 258
+PDF_PAGE_TOKENS = 258
+CHARS_PER_TOKEN = 4.0
+
+# The relative error bound of a text estimate before the model is calibrated.
+UNCALIBRATED_ERROR = 0.3
+# Observations needed before the bound is taken from the observed errors.
+_MIN_SAMPLES = 5
+# Prompts shorter than this (in characters) are too noisy to calibrate from.
+_MIN_CALIBRATION_CHARS = 200
+
+_PDF_PAGE = re.compile(rb"/Type\s*/Page(?!s)")
+
+
+@dataclasses.dataclass(frozen=True)
+class TokenEstimate:
+    """An estimate of a prompt's token count.
+
+    Attributes:
+        total_tokens: The estimated number of tokens.
+        error: The relative error bound: the count is expected to be within
+            `total_tokens * (1 ± error)`. `None` if the prompt has parts that can't be
+            estimated offline (audio, video, uploaded files or cached content), `0` for an
+            exact count.
+    """
+
+    total_tokens: int
+    error: float | None
+
+    @property
+    def exact(self) -> bool:
+        return self.error == 0
+
+
+@dataclasses.dataclass
+class _Tally:
+    """The parts of a prompt, by how they're estimated."""
+
+    text_chars: int = 0
+    fixed_tokens: int = 0
+    unknown_parts: int = 0
+
+    def add_text(self, text: str):
+        self.text_chars += len(text)
+
+    def add_content(self, content: protos.Content):
+        for part in type(content).pb(content).parts:
+            kind = part.WhichOneof("data")
+            if kind == "text":
+                self.add_text(part.text)
+            elif kind == "inline_data":
+                self.add_blob(part.inline_data)
+            elif kind == "file_data":
+                self.unknown_parts += 1
+            elif kind is not None:
+                # Function calls and responses, code: estimate their serialized form as text.
+                self.add_text(str(getattr(part, kind)))
+
+    def add_blob(self, blob):
+        mime_type = blob.mime_type
+        if mime_type.startswith("image/"):
+            self.fixed_tokens += IMAGE_TOKENS
+        elif mime_type == "application/pdf":
+            pages = len(_PDF_PAGE.findall(blob.data))
+            self.fixed_tokens += PDF_PAGE_TOKENS * max(pages, 1)
+        elif mime_type.startswith("text/"):
+            self.text_chars += len(blob.data)
+        else:
+            # Audio and video cost tokens per second, which needs decoding to measure.
+            self.unknown_parts += 1
+
+    def tokens(self, chars_per_token: float) -> int:
+        return math.ceil(self.text_chars / chars_per_token) + self.fixed_tokens
+
+
+def _tally_request(request) -> _Tally:
+    tally = _Tally()
+    if isinstance(request, protos.GenerateContentRequest):
+        for content in request.contents:
+            tally.add_content(content)
+        if request.system_instruction:
+            tally.add_content(request.system_instruction)
+        for tool in request.tools:
+            tally.add_text(str(tool))
+    elif isinstance(request, protos.EmbedContentRequest):
+        tally.add_content(request.content)
+    elif isinstance(request, protos.BatchEmbedContentsRequest):
+        for embed_request in request.requests:
+            tally.add_content(embed_request.content)
+    return tally
+
+
+class _Calibration:
+    """The characters-per-token ratio of a model, and the errors observed with it."""
+
+    def __init__(self):
+        self.chars_per_token = CHARS_PER_TOKEN
+        self.samples = 0
+        self.errors: collections.deque[float] = collections.deque(maxlen=50)
+
+    @property
+    def error(self) -> float:
+        if self.samples < _MIN_SAMPLES:
+            return UNCALIBRATED_ERROR
+        return max(self.errors)
+
+    def update(self, tally: _Tally, actual_tokens: int):
+        text_tokens = actual_tokens - tally.fixed_tokens
+        if tally.unknown_parts or tally.text_chars < _MIN_CALIBRATION_CHARS or text_tokens <= 0:
+            return
+
+        ratio = tally.text_chars / text_tokens
+        if self.samples == 0:
+            self.chars_per_token = ratio
+        else:
+            # The error of the calibrated estimate, before it learns from this observation.
+            estimate = tally.tokens(self.chars_per_token)
+            self.errors.append(abs(estimate - actual_tokens) / actual_tokens)
+            self.chars_per_token += 0.2 * (ratio - self.chars_per_token)
+        self.samples += 1
+
+
+_calibrations: dict[str, _Calibration] = {}
+_lock = threading.Lock()
+
+
+def _get_calibration(model_name: str) -> _Calibration:
+    with _lock:
+        calibration = _calibrations.get(model_name, None)
+        if calibration is None:
+            calibration = _Calibration()
+            _calibrations[model_name] = calibration
+        return calibration
+
+
+def estimate(request, model_name: str | None = None) -> TokenEstimate:
+    """Estimates the prompt tokens of a `GenerateContentRequest` or an embedding request.
+
+    Text is estimated with the model's calibrated characters-per-token ratio, images and
+    PDF pages at their documented cost.
+    """
+    if model_name is None:
+        model_name = getattr(request, "model", "")
+    tally = _tally_request(request)
+    with _lock:
+        calibration = _calibrations.get(model_name, None)
+        if calibration is None:
+            chars_per_token, error = CHARS_PER_TOKEN, UNCALIBRATED_ERROR
+        else:
+            chars_per_token, error = calibration.chars_per_token, calibration.error
+
+    if tally.unknown_parts or getattr(request, "cached_content", None):
+        error = None
+    return TokenEstimate(total_tokens=tally.tokens(chars_per_token), error=error)
+
+
+def observe(model_name: str, request, actual_tokens: int):
+    """Calibrates the estimates for `model_name` with the token count the API reported."""
+    if getattr(request, "cached_content", None):
+        # The count includes the cached content, which isn't in the request.
+        return
+    tally = _tally_request(request)
+    calibration = _get_calibration(model_name)
+    with _lock:
+        calibration.update(tally, actual_tokens)
+
+
+def observe_response(model_name: str, request: protos.GenerateContentRequest, response):
+    """Calibrates the estimates with a `GenerateContentResponse`'s `usage_metadata`."""
+    if "usage_metadata" not in response:
+        return
+    observe(model_name, request, response.usage_metadata.prompt_token_count)
+
+
+class TokenCountCache:
+    """An LRU cache of `count_tokens` results, keyed by a hash of the request.
+
+    The request includes the model name and the serialized contents (and the system
+    instruction and tools), so identical prompts for the same model share an entry.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        if maxsize < 1:
+            raise ValueError(
+                f"Invalid configuration: `maxsize` must be at least 1. Received: {maxsize}."
+            )
+        self._maxsize = maxsize
+        self._entries: collections.OrderedDict[bytes, protos.CountTokensResponse] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"TokenCountCache(size={len(self)}, hits={self.hits}, misses={self.misses})"
+
+    @staticmethod
+    def key(request: protos.CountTokensRequest) -> bytes:
+        data = type(request).pb(request).SerializeToString(deterministic=True)
+        return hashlib.sha256(data).digest()
+
+    def get(self, key: bytes) -> protos.CountTokensResponse | None:
+        with self._lock:
+            response = self._entries.get(key, None)
+            if response is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers may modify the response they're handed.
+        return copy.deepcopy(response)
+
+    def put(self, key: bytes, response: protos.CountTokensResponse):
+        # The caller may go on to modify `response`.
+        response = copy.deepcopy(response)
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by every `GenerativeModel.count_tokens_many` call.
+count_cache = TokenCountCache()
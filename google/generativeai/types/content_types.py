@@ -15,10 +15,19 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterable, Mapping, Sequence
+import collections
+import copy
+from collections.abc import Iterable, Mapping, MutableMapping, Sequence
+from concurrent import futures
+import dataclasses
+import hashlib
 import io
 import inspect
 import mimetypes
+import mmap
+import os
+import pathlib
+import threading
 import typing
 from typing import Any, Callable, Union
 from typing_extensions import TypedDict
@@ -32,8 +41,9 @@ if typing.TYPE_CHECKING:
     import PIL.Image
     import PIL.PngImagePlugin
     import IPython.display
+    import numpy as np
 
-    IMAGE_TYPES = (PIL.Image.Image, IPython.display.Image)
+    IMAGE_TYPES = (PIL.Image.Image, IPython.display.Image, np.ndarray)
 else:
     IMAGE_TYPES = ()
     try:
@@ -51,6 +61,15 @@ else:
     except ImportError:
         IPython = None
 
+    try:
+        import numpy as np
+
+        # Arrays are converted with `PIL.Image.fromarray`.
+        if PIL is not None:
+            IMAGE_TYPES = IMAGE_TYPES + (np.ndarray,)
+    except ImportError:
+        np = None
+
 
 __all__ = [
     "BlobDict",
@@ -69,26 +88,225 @@ __all__ = [
     "ToolsType",
     "FunctionLibrary",
     "FunctionLibraryType",
+    "ImageEncoding",
+    "encode_images",
+    "set_image_encoding",
 ]
 
 
-def pil_to_blob(img):
+# The protobuf classes under the `protos` wrappers, for building messages without the marshal.
+_PartPb = protos.Part.pb()
+_ContentPb = protos.Content.pb()
+_BlobPb = protos.Blob.pb()
+
+
+class _TypeDispatch:
+    """Picks a conversion function by the input's type.
+
+    The rules are `(types, function)` pairs, checked in order the first time a type is seen.
+    The choice is cached by exact type, so later inputs of that type cost a dict lookup.
+    """
+
+    def __init__(self, rules, default: Callable[[Any], Any]):
+        self._rules = rules
+        self._default = default
+        self._cache: dict[type, Callable[[Any], Any]] = {}
+
+    def __call__(self, value):
+        try:
+            function = self._cache[type(value)]
+        except KeyError:
+            function = self._resolve(type(value))
+            self._cache[type(value)] = function
+        return function(value)
+
+    def _resolve(self, cls: type) -> Callable[[Any], Any]:
+        for types, function in self._rules:
+            if issubclass(cls, types):
+                return function
+        return self._default
+
+
+_IMAGE_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+# Formats the API accepts, which an image file can be sent as without decoding it.
+_PASSTHROUGH_MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "HEIF": "image/heif",
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class ImageEncoding:
+    """How `PIL.Image.Image`s are encoded when they're sent to the API.
+
+    Attributes:
+        max_size: If set, images are scaled down (keeping their aspect ratio) so that neither
+            side is longer than this many pixels. The API tiles large images anyway, so there's
+            rarely a reason to send more pixels than that.
+        format: `"png"`, `"jpeg"` or `"webp"`. By default, images with an alpha channel and
+            images read from PNG files are sent as PNG, everything else as JPEG.
+        quality: The JPEG or WebP quality, from 1 to 100. Defaults to PIL's default for the
+            format.
+        passthrough: If `True`, an image opened from a PNG, JPEG, WebP or HEIF file is sent as
+            the file's bytes, without decoding or re-encoding it, if it doesn't need to be
+            scaled down or converted to another `format`. Only images that were never loaded
+            are sent this way: once an image's pixels are loaded (for example, to edit it in
+            place), it's encoded like any other.
+    """
+
+    max_size: int | None = None
+    format: str | None = None
+    quality: int | None = None
+    passthrough: bool = True
+
+    def __post_init__(self):
+        if self.max_size is not None and self.max_size < 1:
+            raise ValueError(
+                f"Invalid configuration: `max_size` must be at least 1. Received: {self.max_size}."
+            )
+        if self.format is not None and self.format not in _IMAGE_FORMATS:
+            raise ValueError(
+                f"Invalid configuration: `format` must be one of {list(_IMAGE_FORMATS)}. "
+                f"Received: {self.format!r}."
+            )
+        if self.quality is not None and not 1 <= self.quality <= 100:
+            raise ValueError(
+                f"Invalid configuration: `quality` must be between 1 and 100. Received: {self.quality}."
+            )
+
+
+_image_encoding = ImageEncoding()
+
+
+def set_image_encoding(encoding: ImageEncoding | None = None, **kwargs) -> ImageEncoding:
+    """Sets how images are encoded, for every request that includes a `PIL.Image.Image`.
+
+    >>> from google.generativeai.types import content_types
+    >>> content_types.set_image_encoding(max_size=1536, format="webp", quality=80)
+
+    Args:
+        encoding: The new `ImageEncoding`. Defaults to the current settings, updated with
+            `kwargs`.
+        **kwargs: `ImageEncoding` fields to change.
+
+    Returns:
+        The previous `ImageEncoding`, to restore it later.
+    """
+    global _image_encoding
+    previous = _image_encoding
+    if encoding is None:
+        encoding = previous
+    _image_encoding = dataclasses.replace(encoding, **kwargs)
+    return previous
+
+
+def _source_bytes(img) -> tuple[str, bytes] | None:
+    """The bytes of the file `img` was opened from, if it can be sent as is.
+
+    Only images that were never loaded qualify: loading an image (which drawing on it,
+    `thumbnail` and the other in-place edits do) clears its `tile`, and closes its file. The
+    bytes are read from the image's open file, rather than its path, in case the path was
+    since overwritten.
+    """
+    mime_type = _PASSTHROUGH_MIME_TYPES.get(img.format, None)
+    fp = getattr(img, "fp", None)
+    if mime_type is None or fp is None or not getattr(img, "tile", None):
+        return None
+    if getattr(img, "decoderconfig", None) or img.tell() != 0:
+        # A JPEG `draft` (decoded at a reduced size), or a later frame of an animation.
+        return None
+    try:
+        position = fp.tell()
+        try:
+            fp.seek(0)
+            return mime_type, fp.read()
+        finally:
+            fp.seek(position)
+    except (OSError, ValueError):
+        return None
+
+
+def _scaled_size(size: tuple[int, int], max_size: int | None) -> tuple[int, int] | None:
+    width, height = size
+    if max_size is None or max(width, height) <= max_size:
+        return None
+    scale = max_size / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+# Modes the JPEG encoder can write.
+_JPEG_MODES = ("1", "L", "RGB", "CMYK")
+
+
+def _to_jpeg_mode(img):
+    """Converts `img` to a mode JPEG can store, painting any transparency over white."""
+    if img.mode in _JPEG_MODES:
+        return img
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        img = img.convert("RGBA")
+        flattened = PIL.Image.new("RGB", img.size, "white")
+        flattened.paste(img, mask=img.getchannel("A"))
+        return flattened
+    return img.convert("RGB")
+
+
+def _passthrough_source(img, encoding: ImageEncoding) -> tuple[str, bytes] | None:
+    """The bytes `img` is sent as under `encoding`, if it's sent as its file's bytes."""
+    if not encoding.passthrough or _scaled_size(img.size, encoding.max_size) is not None:
+        return None
+    if encoding.format is not None and _IMAGE_FORMATS[encoding.format][0] != img.format:
+        return None
+    return _source_bytes(img)
+
+
+def pil_to_blob(img, encoding: ImageEncoding | None = None):
+    if encoding is None:
+        encoding = _image_encoding
+
+    source = _passthrough_source(img, encoding)
+    if source is not None:
+        mime_type, data = source
+        return protos.Blob(mime_type=mime_type, data=data)
+
+    new_size = _scaled_size(img.size, encoding.max_size)
+
+    image_format = encoding.format
+    if image_format is None:
+        if isinstance(img, PIL.PngImagePlugin.PngImageFile) or img.mode == "RGBA":
+            image_format = "png"
+        else:
+            image_format = "jpeg"
+    image_format, mime_type = _IMAGE_FORMATS[image_format]
+
+    if new_size is not None:
+        # `reducing_gap` shrinks by whole factors first, much faster than a plain resample.
+        img = img.resize(new_size, PIL.Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    if image_format == "JPEG":
+        img = _to_jpeg_mode(img)
+
+    params = {}
+    if encoding.quality is not None and image_format in ("JPEG", "WEBP"):
+        params["quality"] = encoding.quality
+
     bytesio = io.BytesIO()
-    if isinstance(img, PIL.PngImagePlugin.PngImageFile) or img.mode == "RGBA":
-        img.save(bytesio, format="PNG")
-        mime_type = "image/png"
-    else:
-        img.save(bytesio, format="JPEG")
-        mime_type = "image/jpeg"
-    bytesio.seek(0)
-    data = bytesio.read()
-    return protos.Blob(mime_type=mime_type, data=data)
+    img.save(bytesio, format=image_format, **params)
+    # `getvalue` hands over the buffer without the copy a `seek(0)` and `read()` make.
+    return protos.Blob(mime_type=mime_type, data=bytesio.getvalue())
 
 
 def image_to_blob(image) -> protos.Blob:
     if PIL is not None:
         if isinstance(image, PIL.Image.Image):
             return pil_to_blob(image)
+        if np is not None and isinstance(image, np.ndarray):
+            return pil_to_blob(PIL.Image.fromarray(image))
 
     if IPython is not None:
         if isinstance(image, IPython.display.Image):
@@ -112,6 +330,182 @@ def image_to_blob(image) -> protos.Blob:
     )
 
 
+class _ImageBlobCache:
+    """An LRU cache of encoded images, keyed by a hash of their contents (see `_encode_cached`)."""
+
+    def __init__(self, maxsize: int = 256):
+        self._maxsize = maxsize
+        self._blobs: collections.OrderedDict[tuple, protos.Blob] = collections.OrderedDict()
+        # The encodings in progress, by key.
+        self._pending: dict[tuple, futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def get_or_encode(self, key: tuple, encode: Callable[[], protos.Blob]) -> protos.Blob:
+        """Returns the blob cached for `key`, or caches the one `encode` returns.
+
+        If another thread is encoding an image with the same key, this waits for its blob
+        instead of encoding the image again.
+        """
+        with self._lock:
+            blob = self._blobs.get(key, None)
+            if blob is not None:
+                self._blobs.move_to_end(key)
+                return blob
+            pending = self._pending.get(key, None)
+            if pending is None:
+                self._pending[key] = future = futures.Future()
+        if pending is not None:
+            return pending.result()
+
+        try:
+            blob = encode()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            self._blobs[key] = blob
+            while len(self._blobs) > self._maxsize:
+                self._blobs.popitem(last=False)
+        future.set_result(blob)
+        return blob
+
+    def clear(self):
+        with self._lock:
+            self._blobs.clear()
+
+
+_image_cache = _ImageBlobCache()
+_image_pool: futures.ThreadPoolExecutor | None = None
+_image_pool_lock = threading.Lock()
+
+
+def _get_image_pool() -> futures.ThreadPoolExecutor:
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is None:
+            _image_pool = futures.ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1, thread_name_prefix="genai-images"
+            )
+        return _image_pool
+
+
+def _encode_image(image, encoding: ImageEncoding) -> protos.Blob:
+    if PIL is not None and isinstance(image, PIL.Image.Image):
+        return pil_to_blob(image, encoding)
+    if np is not None and isinstance(image, np.ndarray):
+        return pil_to_blob(PIL.Image.fromarray(image), encoding)
+    return image_to_blob(image)
+
+
+def _encode_cached(image, encoding: ImageEncoding) -> protos.Blob:
+    """Encodes `image`, unless an image with the same contents is cached.
+
+    Hashing an image decodes it, so like the encoding itself this runs on the image pool. A
+    `PIL.Image.Image` that's sent as its file's bytes is keyed by those bytes, read once.
+    """
+    if PIL is not None and isinstance(image, PIL.Image.Image):
+        source = _passthrough_source(image, encoding)
+        if source is not None:
+            mime_type, data = source
+            key = ("file", hashlib.sha256(data).digest(), encoding)
+            return _image_cache.get_or_encode(
+                key, lambda: protos.Blob(mime_type=mime_type, data=data)
+            )
+        digest = hashlib.sha256(image.tobytes())
+        if image.mode in ("P", "PA"):
+            digest.update(bytes(image.getpalette() or ()))
+        key = ("pil", digest.digest(), image.mode, image.size, encoding)
+    elif np is not None and isinstance(image, np.ndarray):
+        digest = hashlib.sha256(np.ascontiguousarray(image)).digest()
+        key = ("array", digest, image.shape, image.dtype.str, encoding)
+    else:
+        key = ("ipython", hashlib.sha256(image.data).digest(), image.filename)
+    return _image_cache.get_or_encode(key, lambda: _encode_image(image, encoding))
+
+
+def _find_images(value, images: dict[int, Any]):
+    if isinstance(value, IMAGE_TYPES):
+        images[id(value)] = value
+    elif isinstance(value, Mapping):
+        for item in value.values():
+            _find_images(item, images)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _find_images(item, images)
+
+
+def _replace_images(value, blobs: dict[int, protos.Blob]):
+    """Returns `value` with its images replaced, rebuilding the containers they're in as the
+    same types. Containers without images are returned as is."""
+    if isinstance(value, IMAGE_TYPES):
+        return blobs[id(value)]
+    elif isinstance(value, Mapping):
+        items = {key: _replace_images(item, blobs) for key, item in value.items()}
+        if all(items[key] is item for key, item in value.items()):
+            return value
+        if isinstance(value, MutableMapping):
+            # A copy keeps any other state, like a `defaultdict`'s factory.
+            value = copy.copy(value)
+            value.update(items)
+            return value
+        return type(value)(items)
+    elif isinstance(value, (list, tuple)):
+        items = [_replace_images(item, blobs) for item in value]
+        if all(new is old for new, old in zip(items, value)):
+            return value
+        if hasattr(value, "_fields"):
+            # A named tuple.
+            return type(value)(*items)
+        return type(value)(items)
+    return value
+
+
+def encode_images(contents, encoding: ImageEncoding | None = None):
+    """Encodes every image in `contents` ahead of building a request.
+
+    `contents` is anything `to_contents` accepts, or a list of those (a batch of prompts). The
+    `PIL.Image.Image`s, NumPy arrays and `IPython.display.Image`s in it (in lists, tuples and
+    mappings) are encoded on a thread pool, since PIL's encoders release the GIL, and replaced by
+    `protos.Blob`s. The containers they're in are copied, keeping their types. An image that appears more than once, or was encoded by an earlier call, is
+    only encoded once.
+
+    >>> prompts = content_types.encode_images([[image, 'Describe this'], [image, 'Caption this']])
+
+    Args:
+        contents: The contents, or batch of contents, to encode the images in.
+        encoding: How to encode them, defaults to the settings from `set_image_encoding`.
+
+    Returns:
+        `contents`, with the images replaced. It's returned unchanged if it has no images.
+    """
+    if encoding is None:
+        encoding = _image_encoding
+
+    images: dict[int, Any] = {}
+    _find_images(contents, images)
+    if not images:
+        return contents
+
+    if len(images) == 1:
+        blobs = {image_id: _encode_cached(image, encoding) for image_id, image in images.items()}
+    else:
+        pool = _get_image_pool()
+        jobs = {
+            image_id: pool.submit(_encode_cached, image, encoding)
+            for image_id, image in images.items()
+        }
+        blobs = {image_id: job.result() for image_id, job in jobs.items()}
+
+    return _replace_images(contents, blobs)
+
+
 class BlobDict(TypedDict):
     mime_type: str
     data: bytes
@@ -119,18 +513,9 @@ class BlobDict(TypedDict):
 
 def _convert_dict(d: Mapping) -> protos.Content | protos.Part | protos.Blob:
     if is_content_dict(d):
-        content = dict(d)
-        if isinstance(parts := content["parts"], str):
-            content["parts"] = [parts]
-        content["parts"] = [to_part(part) for part in content["parts"]]
-        return protos.Content(content)
+        return protos.Content.wrap(_dict_to_content_pb(d))
     elif is_part_dict(d):
-        part = dict(d)
-        if "inline_data" in part:
-            part["inline_data"] = to_blob(part["inline_data"])
-        if "file_data" in part:
-            part["file_data"] = file_types.to_file_data(part["file_data"])
-        return protos.Part(part)
+        return protos.Part.wrap(_dict_to_part_pb(d))
     elif is_blob_dict(d):
         blob = d
         return protos.Blob(blob)
@@ -150,31 +535,59 @@ def is_blob_dict(d):
 
 if typing.TYPE_CHECKING:
     BlobType = Union[
-        protos.Blob, BlobDict, PIL.Image.Image, IPython.display.Image
+        protos.Blob,
+        BlobDict,
+        PIL.Image.Image,
+        IPython.display.Image,
+        pathlib.Path,
+        bytes,
+        bytearray,
+        memoryview,
+        mmap.mmap,
     ]  # Any for the images
 else:
     BlobType = Union[protos.Blob, BlobDict, Any]
 
 
-def to_blob(blob: BlobType) -> protos.Blob:
-    if isinstance(blob, Mapping):
-        blob = _convert_dict(blob)
+def _unknown_to_blob(blob):
+    raise TypeError(
+        "Could not create `Blob`, expected `Blob`, `dict`, an `Image` type"
+        "(`PIL.Image.Image` or `IPython.display.Image`), a `pathlib.Path` or a bytes-like "
+        "object.\n"
+        f"Got a: {type(blob)}\n"
+        f"Value: {blob}"
+    )
 
-    if isinstance(blob, protos.Blob):
-        return blob
-    elif isinstance(blob, IMAGE_TYPES):
-        return image_to_blob(blob)
+
+# Raw file contents, sent as they are with a MIME type sniffed from the data.
+_BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+_FILE_TYPES = (pathlib.PurePath, *_BUFFER_TYPES)
+
+
+def _file_to_blob_pb(file):
+    if isinstance(file, pathlib.PurePath):
+        data = pathlib.Path(file).read_bytes()
+        mime_type = file_types.sniff_mime_type(data, file)
     else:
-        if isinstance(blob, Mapping):
-            raise KeyError(
-                "Could not recognize the intended type of the `dict`\n" "A content should have "
-            )
-        raise TypeError(
-            "Could not create `Blob`, expected `Blob`, `dict` or an `Image` type"
-            "(`PIL.Image.Image` or `IPython.display.Image`).\n"
-            f"Got a: {type(blob)}\n"
-            f"Value: {blob}"
-        )
+        # Protobuf only takes `bytes`, this is the one copy the buffer needs.
+        data = file if isinstance(file, bytes) else bytes(file)
+        mime_type = file_types.sniff_mime_type(data)
+    return _BlobPb(mime_type=mime_type, data=data)
+
+
+_to_blob = _TypeDispatch(
+    [
+        (protos.Blob, lambda blob: blob),
+        (Mapping, lambda blob: _to_blob(_convert_dict(blob))),
+        (IMAGE_TYPES, image_to_blob),
+        (_FILE_TYPES, lambda file: protos.Blob.wrap(_file_to_blob_pb(file))),
+    ],
+    default=_unknown_to_blob,
+)
+
+
+def to_blob(blob: BlobType) -> protos.Blob:
+    return _to_blob(blob)
 
 
 class PartDict(TypedDict):
@@ -204,26 +617,58 @@ def is_part_dict(d):
     return key in ["text", "inline_data", "function_call", "function_response", "file_data"]
 
 
-def to_part(part: PartType):
-    if isinstance(part, Mapping):
-        part = _convert_dict(part)
+def _dict_to_part_pb(d: Mapping):
+    ((key, value),) = d.items()
+    Part = _PartPb
+    if key == "text":
+        return Part(text=value)
+    elif key == "inline_data":
+        return Part(inline_data=protos.Blob.pb(to_blob(value)))
+    elif key == "file_data":
+        return Part(file_data=protos.FileData.pb(file_types.to_file_data(value)))
+    else:
+        # Function calls and responses hold `Struct`s, leave those to proto-plus.
+        return protos.Part.pb(protos.Part({key: value}))
+
+
+def _mapping_to_part_pb(d: Mapping):
+    if is_part_dict(d):
+        return _dict_to_part_pb(d)
+    return _to_part_pb(_convert_dict(d))
 
+
+def _file_to_part_pb(file):
+    return _PartPb(file_data=protos.FileData.pb(file_types.to_file_data(file)))
+
+
+def _blob_to_part_pb(blob):
+    # Maybe it can be turned into a blob?
+    return _PartPb(inline_data=protos.Blob.pb(to_blob(blob)))
+
+
+# Like `to_part`, but returns the protobuf message instead of a `protos.Part`.
+_to_part_pb = _TypeDispatch(
+    [
+        (str, lambda text: _PartPb(text=text)),
+        (Mapping, _mapping_to_part_pb),
+        (protos.Part, protos.Part.pb),
+        (protos.FileData, lambda f: _PartPb(file_data=protos.FileData.pb(f))),
+        ((protos.File, file_types.File), _file_to_part_pb),
+        (protos.FunctionCall, lambda f: _PartPb(function_call=protos.FunctionCall.pb(f))),
+        (
+            protos.FunctionResponse,
+            lambda f: _PartPb(function_response=protos.FunctionResponse.pb(f)),
+        ),
+        (_FILE_TYPES, lambda file: _PartPb(inline_data=_file_to_blob_pb(file))),
+    ],
+    default=_blob_to_part_pb,
+)
+
+
+def to_part(part: PartType):
     if isinstance(part, protos.Part):
         return part
-    elif isinstance(part, str):
-        return protos.Part(text=part)
-    elif isinstance(part, protos.FileData):
-        return protos.Part(file_data=part)
-    elif isinstance(part, (protos.File, file_types.File)):
-        return protos.Part(file_data=file_types.to_file_data(part))
-    elif isinstance(part, protos.FunctionCall):
-        return protos.Part(function_call=part)
-    elif isinstance(part, protos.FunctionResponse):
-        return protos.Part(function_response=part)
-
-    else:
-        # Maybe it can be turned into a blob?
-        return protos.Part(inline_data=to_blob(part))
+    return protos.Part.wrap(_to_part_pb(part))
 
 
 class ContentDict(TypedDict):
@@ -235,6 +680,14 @@ def is_content_dict(d):
     return "parts" in d
 
 
+def _dict_to_content_pb(d: Mapping):
+    parts = d["parts"]
+    if isinstance(parts, str):
+        parts = [parts]
+    others = {key: value for key, value in d.items() if key != "parts"}
+    return _ContentPb(parts=[_to_part_pb(part) for part in parts], **others)
+
+
 # When you need a message accept a `Content` object or dict, a list of parts,
 # or a single part
 ContentType = Union[protos.Content, ContentDict, Iterable[PartType], PartType]
@@ -244,21 +697,32 @@ StrictContentType = Union[protos.Content, ContentDict]
 
 
 def to_content(content: ContentType):
-    if not content:
+    if not isinstance(content, IMAGE_TYPES) and not content:
         raise ValueError(
             "Invalid input: 'content' argument must not be empty. Please provide a non-empty value."
         )
 
-    if isinstance(content, Mapping):
-        content = _convert_dict(content)
+    return _to_content(content)
 
-    if isinstance(content, protos.Content):
-        return content
-    elif isinstance(content, Iterable) and not isinstance(content, str):
-        return protos.Content(parts=[to_part(part) for part in content])
-    else:
-        # Maybe this is a Part?
-        return protos.Content(parts=[to_part(content)])
+
+def _parts_to_content(parts: Iterable[PartType]):
+    return protos.Content.wrap(_ContentPb(parts=[_to_part_pb(part) for part in parts]))
+
+
+def _part_to_content(part: PartType):
+    # Maybe this is a Part?
+    return protos.Content.wrap(_ContentPb(parts=[_to_part_pb(part)]))
+
+
+_to_content = _TypeDispatch(
+    [
+        (protos.Content, lambda content: content),
+        (Mapping, lambda content: _to_content(_convert_dict(content))),
+        ((str, *IMAGE_TYPES, *_FILE_TYPES), _part_to_content),
+        (Iterable, _parts_to_content),
+    ],
+    default=_part_to_content,
+)
 
 
 def strict_to_content(content: StrictContentType):
@@ -282,20 +746,41 @@ def to_contents(contents: ContentsType) -> list[protos.Content]:
     if contents is None:
         return []
 
-    if isinstance(contents, Iterable) and not isinstance(contents, (str, Mapping)):
-        try:
-            # strict_to_content so [[parts], [parts]] doesn't assume roles.
-            contents = [strict_to_content(c) for c in contents]
-            return contents
-        except TypeError:
-            # If you get a TypeError here it's probably because that was a list
-            # of parts, not a list of contents, so fall back to `to_content`.
-            pass
+    if isinstance(contents, Iterable) and not isinstance(
+        contents, (str, Mapping, *IMAGE_TYPES, *_FILE_TYPES)
+    ):
+        contents = list(contents)
+        result = []
+        for content in contents:
+            # Only a list of contents is split up, so [[parts], [parts]] doesn't assume roles.
+            if isinstance(content, protos.Content):
+                result.append(content)
+            elif isinstance(content, Mapping) and is_content_dict(content):
+                result.append(protos.Content.wrap(_dict_to_content_pb(content)))
+            else:
+                # It's a list of parts, for a single `Content`.
+                break
+        else:
+            return result
 
     contents = [to_content(contents)]
     return contents
 
 
+# The API rejects requests larger than this.
+MAX_REQUEST_BYTES = 20 * 2**20
+
+
+def _field_size(size: int) -> int:
+    # The tag, the varint length prefix, then the message.
+    return 1 + max(1, (size.bit_length() + 6) // 7) + size
+
+
+def contents_size(contents: Iterable[protos.Content]) -> int:
+    """The serialized size in bytes of `contents`, as the `contents` field of a request."""
+    return sum(_field_size(type(content).pb(content).ByteSize()) for content in contents)
+
+
 def _schema_for_class(cls: TypedDict) -> dict[str, Any]:
     schema = _build_schema("dummy", {"dummy": (cls, pydantic.Field())})
     return schema["properties"]["dummy"]
@@ -15,6 +15,8 @@
 from __future__ import annotations
 
 import datetime
+import mimetypes
+import os
 from typing import Any, Union
 from typing_extensions import TypedDict
 
@@ -141,3 +143,58 @@ def to_file_data(file_data: FileDataType):
             f"Received an object of type: {type(file_data)}.\n"
             f"Object Value: {file_data}"
         )
+
+
+# (offset, magic bytes, MIME type), for the formats the API accepts.
+_MAGIC_NUMBERS = [
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (8, b"WEBP", "image/webp"),
+    (8, b"WAVE", "audio/wav"),
+    (8, b"AVI ", "video/avi"),
+    (4, b"ftypheic", "image/heic"),
+    (4, b"ftypheix", "image/heic"),
+    (4, b"ftypmif1", "image/heif"),
+    (4, b"ftypM4A ", "audio/aac"),
+    (4, b"ftypqt  ", "video/quicktime"),
+    (4, b"ftyp", "video/mp4"),
+    (0, b"ID3", "audio/mp3"),
+    (0, b"\xff\xfb", "audio/mp3"),
+    (0, b"\xff\xf3", "audio/mp3"),
+    (0, b"\xff\xf2", "audio/mp3"),
+    (0, b"\xff\xf1", "audio/aac"),
+    (0, b"\xff\xf9", "audio/aac"),
+    (0, b"fLaC", "audio/flac"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"FORM", "audio/aiff"),
+    (0, b"\x1aE\xdf\xa3", "video/webm"),
+    (0, b"FLV", "video/x-flv"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+]
+
+
+def sniff_mime_type(data: bytes | memoryview, path: str | os.PathLike | None = None) -> str:
+    """Guesses the MIME type of a file's contents, from its magic bytes.
+
+    Falls back to the extension of `path`, then to `text/plain` for UTF-8 text, and finally
+    to `application/octet-stream`.
+    """
+    head = bytes(data[:16])
+    for offset, magic, mime_type in _MAGIC_NUMBERS:
+        if head[offset : offset + len(magic)] == magic:
+            return mime_type
+
+    if path is not None:
+        mime_type, _ = mimetypes.guess_type(os.fspath(path))
+        if mime_type is not None:
+            return mime_type
+
+    try:
+        # A multi-byte character may be cut off at the end of the sample.
+        bytes(data[:1024]).decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < 1020:
+            return "application/octet-stream"
+    return "text/plain"
@@ -32,6 +32,7 @@ import google.api_core.exceptions
 
 from google.generativeai import protos
 from google.generativeai import string_utils
+from google.generativeai import utils
 from google.generativeai.types import content_types
 from google.generativeai.responder import _rename_schema_fields
 
@@ -227,112 +228,124 @@ def _join_citation_metadatas(
     return citation_metadatas[-1]
 
 
-def _join_safety_ratings_lists(
-    safety_ratings_lists: Iterable[list[protos.SafetyRating]],
-):
-    ratings = {}
-    blocked = collections.defaultdict(list)
+# The joins below work on the protobuf messages underneath the `protos` wrappers, merging
+# each chunk into the accumulated message in place. The wrappers are only created for the
+# result.
+
+
+def _merge_safety_ratings_pb(safety_ratings, other):
+    """Merges the `other` ratings into the `safety_ratings` repeated field."""
+    by_category = {rating.category: rating for rating in safety_ratings}
+    for rating in other:
+        joined = by_category.get(rating.category, None)
+        if joined is None:
+            joined = safety_ratings.add(category=rating.category)
+            by_category[rating.category] = joined
+        joined.probability = rating.probability
+        joined.blocked = joined.blocked or rating.blocked
+
+
+def _merge_contents_pb(content, other):
+    if not content.role:
+        content.role = other.role
+
+    parts = content.parts
+    for part in other.parts:
+        kind = part.WhichOneof("data")
+        last_kind = parts[-1].WhichOneof("data") if parts else None
+        if kind != last_kind:
+            parts.add().CopyFrom(part)
+        elif kind == "text":
+            parts[-1].text += part.text
+        elif kind == "executable_code":
+            parts[-1].executable_code.code += part.executable_code.code
+        elif kind == "code_execution_result":
+            result = parts[-1].code_execution_result
+            result.outcome = part.code_execution_result.outcome
+            result.output += part.code_execution_result.output
+        else:
+            parts.add().CopyFrom(part)
 
-    for safety_ratings_list in safety_ratings_lists:
-        for rating in safety_ratings_list:
-            ratings[rating.category] = rating.probability
-            blocked[rating.category].append(rating.blocked)
 
-    blocked = {category: any(blocked) for category, blocked in blocked.items()}
+def _new_candidate_pb(candidates, index):
+    candidate = candidates.add(index=index)
+    candidate.content.SetInParent()
+    return candidate
 
-    safety_list = []
-    for (category, probability), blocked in zip(ratings.items(), blocked.values()):
-        safety_list.append(
-            protos.SafetyRating(category=category, probability=probability, blocked=blocked)
-        )
 
-    return safety_list
+def _merge_candidate_pb(candidate, other):
+    _merge_contents_pb(candidate.content, other.content)
+    candidate.finish_reason = other.finish_reason
+    _merge_safety_ratings_pb(candidate.safety_ratings, other.safety_ratings)
+    candidate.citation_metadata.CopyFrom(other.citation_metadata)
+    candidate.token_count = other.token_count
 
 
-def _join_contents(contents: Iterable[protos.Content]):
-    contents = tuple(contents)
-    roles = [c.role for c in contents if c.role]
-    if roles:
-        role = roles[0]
-    else:
-        role = ""
+def _merge_candidate_lists_pb(candidates, other):
+    # Assuming that is a candidate ends, it is no longer returned in the list of
+    # candidates and that's why candidates have an index
+    by_index = {candidate.index: candidate for candidate in candidates}
+    for candidate in other:
+        joined = by_index.get(candidate.index, None)
+        if joined is None:
+            joined = _new_candidate_pb(candidates, candidate.index)
+            by_index[candidate.index] = joined
+        _merge_candidate_pb(joined, candidate)
 
-    parts = []
-    for content in contents:
-        parts.extend(content.parts)
-
-    merged_parts = []
-    last = parts[0]
-    for part in parts[1:]:
-        if "text" in last and "text" in part:
-            last = protos.Part(text=last.text + part.text)
-            continue
-
-        # Can we merge the new thing into last?
-        # If not, put last in list of parts, and new thing becomes last
-        if "executable_code" in last and "executable_code" in part:
-            last = protos.Part(
-                executable_code=_join_executable_code(last.executable_code, part.executable_code)
-            )
-            continue
+    if any(a.index > b.index for a, b in zip(candidates, candidates[1:])):
+        candidates.sort(key=lambda candidate: candidate.index)
 
-        if "code_execution_result" in last and "code_execution_result" in part:
-            last = protos.Part(
-                code_execution_result=_join_code_execution_result(
-                    last.code_execution_result, part.code_execution_result
-                )
-            )
-            continue
 
-        merged_parts.append(last)
-        last = part
+def _merge_chunk_pb(response, chunk):
+    _merge_candidate_lists_pb(response.candidates, chunk.candidates)
+    response.usage_metadata.CopyFrom(chunk.usage_metadata)
 
-    merged_parts.append(last)
 
-    return protos.Content(
-        role=role,
-        parts=merged_parts,
-    )
+def _join_chunks_pb(chunks):
+    chunks = iter(chunks)
+    first = next(chunks)
+    response = protos.GenerateContentResponse.pb()()
+    # Always keep the first prompt feedback.
+    response.prompt_feedback.CopyFrom(first.prompt_feedback)
+    _merge_chunk_pb(response, first)
+    for chunk in chunks:
+        _merge_chunk_pb(response, chunk)
+    return response
 
 
-def _join_executable_code(code_1, code_2):
-    return protos.ExecutableCode(language=code_1.language, code=code_1.code + code_2.code)
+def _join_safety_ratings_lists(
+    safety_ratings_lists: Iterable[list[protos.SafetyRating]],
+):
+    joined = protos.Candidate.pb()().safety_ratings
+    for safety_ratings_list in safety_ratings_lists:
+        _merge_safety_ratings_pb(joined, [utils.to_pb(r) for r in safety_ratings_list])
+    return [protos.SafetyRating.wrap(rating) for rating in joined]
 
 
-def _join_code_execution_result(result_1, result_2):
-    return protos.CodeExecutionResult(
-        outcome=result_2.outcome, output=result_1.output + result_2.output
-    )
+def _join_contents(contents: Iterable[protos.Content]):
+    joined = protos.Content.pb()()
+    for content in contents:
+        _merge_contents_pb(joined, utils.to_pb(content))
+    return protos.Content.wrap(joined)
 
 
 def _join_candidates(candidates: Iterable[protos.Candidate]):
-    candidates = tuple(candidates)
-
-    index = candidates[0].index  # These should all be the same.
+    candidates = [utils.to_pb(c) for c in candidates]
 
-    return protos.Candidate(
-        index=index,
-        content=_join_contents([c.content for c in candidates]),
-        finish_reason=candidates[-1].finish_reason,
-        safety_ratings=_join_safety_ratings_lists([c.safety_ratings for c in candidates]),
-        citation_metadata=_join_citation_metadatas([c.citation_metadata for c in candidates]),
-        token_count=candidates[-1].token_count,
+    # The index should be the same for all of them.
+    joined = _new_candidate_pb(
+        protos.GenerateContentResponse.pb()().candidates, candidates[0].index
     )
+    for candidate in candidates:
+        _merge_candidate_pb(joined, candidate)
+    return protos.Candidate.wrap(joined)
 
 
 def _join_candidate_lists(candidate_lists: Iterable[list[protos.Candidate]]):
-    # Assuming that is a candidate ends, it is no longer returned in the list of
-    # candidates and that's why candidates have an index
-    candidates = collections.defaultdict(list)
+    joined = protos.GenerateContentResponse.pb()().candidates
     for candidate_list in candidate_lists:
-        for candidate in candidate_list:
-            candidates[candidate.index].append(candidate)
-
-    new_candidates = []
-    for index, candidate_parts in sorted(candidates.items()):
-        new_candidates.append(_join_candidates(candidate_parts))
-
-    return new_candidates
+        _merge_candidate_lists_pb(joined, [utils.to_pb(c) for c in candidate_list])
+    return [protos.Candidate.wrap(candidate) for candidate in joined]
 
 
 def _join_prompt_feedbacks(
@@ -343,12 +356,8 @@ def _join_prompt_feedbacks(
 
 
 def _join_chunks(chunks: Iterable[protos.GenerateContentResponse]):
-    chunks = tuple(chunks)
-    return protos.GenerateContentResponse(
-        candidates=_join_candidate_lists(c.candidates for c in chunks),
-        prompt_feedback=_join_prompt_feedbacks(c.prompt_feedback for c in chunks),
-        usage_metadata=chunks[-1].usage_metadata,
-    )
+    joined = _join_chunks_pb(utils.to_pb(c) for c in chunks)
+    return protos.GenerateContentResponse.wrap(joined)
 
 
 _INCOMPLETE_ITERATION_MESSAGE = """\
@@ -379,6 +388,17 @@ class BaseGenerateContentResponse:
             self._error = BlockedPromptException(result)
         else:
             self._error = None
+        # Seconds the call waited in the `scheduling.PriorityScheduler`'s queue, if it has one.
+        self.queue_wait: float | None = None
+        # The protobuf message streamed chunks are merged into, once there's a second chunk.
+        self._joined = None
+
+    def _accumulate(self, chunk: protos.GenerateContentResponse):
+        if self._joined is None:
+            # Copy the first chunk, it's still yielded as is.
+            self._joined = _join_chunks_pb([utils.to_pb(self._result)])
+            self._result = protos.GenerateContentResponse.wrap(self._joined)
+        _merge_chunk_pb(self._joined, utils.to_pb(chunk))
 
     def to_dict(self):
         """Returns the result as a JSON-compatible dict.
@@ -431,30 +451,32 @@ class BaseGenerateContentResponse:
         Raises:
             ValueError: If the candidate list or parts list does not contain exactly one entry.
         """
-        parts = self.parts
-        if not parts:
+        if not self.parts:
             raise ValueError(
                 "Invalid operation: The `response.text` quick accessor requires the response to contain a valid `Part`, "
                 "but none were returned. Please check the `candidate.safety_ratings` to determine if the response was blocked."
             )
 
         texts = []
-        for part in parts:
-            if "text" in part:
+        for part in utils.to_pb(self._result).candidates[0].content.parts:
+            part_type = part.WhichOneof("data")
+            if part_type == "text":
                 texts.append(part.text)
                 continue
-            if "executable_code" in part:
-                language = part.executable_code.language.name.lower()
+            if part_type == "executable_code":
+                language = protos.ExecutableCode.Language(part.executable_code.language)
+                language = language.name.lower()
                 if language == "language_unspecified":
                     language = ""
                 else:
                     language = f" {language}"
                 texts.extend([f"```{language}", part.executable_code.code.lstrip("\n"), "```"])
                 continue
-            if "code_execution_result" in part:
-                outcome_result = part.code_execution_result.outcome.name.lower().replace(
-                    "outcome_", ""
+            if part_type == "code_execution_result":
+                outcome_result = protos.CodeExecutionResult.Outcome(
+                    part.code_execution_result.outcome
                 )
+                outcome_result = outcome_result.name.lower().replace("outcome_", "")
                 if outcome_result == "ok" or outcome_result == "unspecified":
                     outcome_result = ""
                 else:
@@ -462,7 +484,6 @@ class BaseGenerateContentResponse:
                 texts.extend([f"```{outcome_result}", part.code_execution_result.output, "```"])
                 continue
 
-            part_type = protos.Part.pb(part).WhichOneof("data")
             raise ValueError(f"Could not convert `part.{part_type}` to text.")
 
         return "\n".join(texts)
@@ -602,7 +623,7 @@ class GenerateContentResponse(BaseGenerateContentResponse):
                     self._done = True
                 else:
                     self._chunks.append(item)
-                    self._result = _join_chunks([self._result, item])
+                    self._accumulate(item)
 
             item = self._chunks[n]
 
@@ -669,7 +690,7 @@ class AsyncGenerateContentResponse(BaseGenerateContentResponse):
                     self._done = True
                 else:
                     self._chunks.append(item)
-                    self._result = _join_chunks([self._result, item])
+                    self._accumulate(item)
 
             item = self._chunks[n]
 
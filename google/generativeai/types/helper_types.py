@@ -24,12 +24,16 @@ import dataclasses
 from typing import Union
 from typing_extensions import TypedDict
 
-__all__ = ["RequestOptions", "RequestOptionsType"]
+from google.generativeai.hedging import HedgingPolicy
+
+__all__ = ["HedgingPolicy", "RequestOptions", "RequestOptionsType"]
 
 
 class RequestOptionsDict(TypedDict, total=False):
     retry: google.api_core.retry.Retry
     timeout: Union[int, float, google.api_core.timeout.TimeToDeadlineTimeout]
+    hedging: HedgingPolicy
+    priority: str
 
 
 @dataclasses.dataclass(init=False)
@@ -37,7 +41,7 @@ class RequestOptions(collections.abc.Mapping):
     """Request options
 
     >>> import google.generativeai as genai
-    >>> from google.generativeai.types import RequestOptions
+    >>> from google.generativeai.types import HedgingPolicy, RequestOptions
     >>> from google.api_core import retry
     >>>
     >>> model = genai.GenerativeModel()
@@ -46,23 +50,49 @@ class RequestOptions(collections.abc.Mapping):
     ...         retry=retry.Retry(initial=10, multiplier=2, maximum=60, timeout=300)))
     >>> response = model.generate_content('Hello',
     ...     request_options=RequestOptions(timeout=600)))
+    >>> response = model.generate_content('Hello',
+    ...     request_options=RequestOptions(hedging=HedgingPolicy(delay=2.0)))
 
     Args:
         retry: Refer to [retry docs](https://googleapis.dev/python/google-api-core/latest/retry.html) for details.
         timeout: In seconds (or provide a [TimeToDeadlineTimeout](https://googleapis.dev/python/google-api-core/latest/timeout.html) object).
+        hedging: A `HedgingPolicy`, to send a duplicate of slow calls. Only for idempotent
+            calls: `generate_content` (without automatic function calling), `count_tokens`
+            and `embed_content`.
+        priority: The call's priority class, for the `scheduling.PriorityScheduler` set with
+            `genai.configure(scheduler=...)`. Only for the generative, embedding and retriever
+            calls.
     """
 
     retry: google.api_core.retry.Retry | None
     timeout: int | float | google.api_core.timeout.TimeToDeadlineTimeout | None
+    hedging: HedgingPolicy | None
+    priority: str | None
 
     def __init__(
         self,
         *,
         retry: google.api_core.retry.Retry | None = None,
         timeout: int | float | google.api_core.timeout.TimeToDeadlineTimeout | None = None,
+        hedging: HedgingPolicy | None = None,
+        priority: str | None = None,
     ):
+        if hedging is not None and not isinstance(hedging, HedgingPolicy):
+            raise TypeError(
+                "Invalid input type. Expected a `HedgingPolicy` for `hedging`.\n"
+                f"However, received an object of type: {type(hedging)}.\n"
+                f"Object Value: {hedging}"
+            )
+        if priority is not None and not isinstance(priority, str):
+            raise TypeError(
+                "Invalid input type. Expected a `str` for `priority`.\n"
+                f"However, received an object of type: {type(priority)}.\n"
+                f"Object Value: {priority}"
+            )
         self.retry = retry
         self.timeout = timeout
+        self.hedging = hedging
+        self.priority = priority
 
     # Inherit from Mapping for **unpacking
     def __getitem__(self, item):
@@ -70,6 +100,10 @@ class RequestOptions(collections.abc.Mapping):
             return self.retry
         elif item == "timeout":
             return self.timeout
+        elif item == "hedging" and self.hedging is not None:
+            return self.hedging
+        elif item == "priority" and self.priority is not None:
+            return self.priority
         else:
             raise KeyError(
                 f"Invalid key: 'RequestOptions' does not contain a key named '{item}'. "
@@ -79,9 +113,14 @@ class RequestOptions(collections.abc.Mapping):
     def __iter__(self):
         yield "retry"
         yield "timeout"
+        # Only some clients accept `hedging` and `priority`, so they're left out unless set.
+        if self.hedging is not None:
+            yield "hedging"
+        if self.priority is not None:
+            yield "priority"
 
     def __len__(self):
-        return 2
+        return sum(1 for _ in self)
 
 
 RequestOptionsType = Union[RequestOptions, RequestOptionsDict]
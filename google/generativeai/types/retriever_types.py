@@ -482,7 +482,8 @@ class Corpus:
         results_count: int | None = None,
         client: glm.RetrieverServiceClient | None = None,
         request_options: helper_types.RequestOptionsType | None = None,
-    ) -> Iterable[RelevantChunk]:
+        raw: bool = False,
+    ) -> Iterable[RelevantChunk] | protos.QueryCorpusResponse:
         """
         Query a corpus for information.
 
@@ -491,6 +492,8 @@ class Corpus:
             metadata_filters: Filter for `Chunk` metadata.
             results_count: The maximum number of `Chunk`s to return; must be less than 100.
             request_options: Options for the request.
+            raw: If `True`, return the API's `protos.QueryCorpusResponse` without converting
+                its chunks.
 
         Returns:
             List of relevant chunks.
@@ -519,6 +522,8 @@ class Corpus:
             results_count=results_count,
         )
         response = client.query_corpus(request, **request_options)
+        if raw:
+            return response
         response = type(response).to_dict(response)
 
         # Create a RelevantChunk object for each chunk listed in response['relevant_chunks']
@@ -538,7 +543,8 @@ class Corpus:
         results_count: int | None = None,
         client: glm.RetrieverServiceAsyncClient | None = None,
         request_options: helper_types.RequestOptionsType | None = None,
-    ) -> Iterable[RelevantChunk]:
+        raw: bool = False,
+    ) -> Iterable[RelevantChunk] | protos.QueryCorpusResponse:
         """This is the async version of `Corpus.query`."""
         if request_options is None:
             request_options = {}
@@ -564,6 +570,8 @@ class Corpus:
             results_count=results_count,
         )
         response = await client.query_corpus(request, **request_options)
+        if raw:
+            return response
         response = type(response).to_dict(response)
 
         # Create a RelevantChunk object for each chunk listed in response['relevant_chunks']
@@ -1057,7 +1065,8 @@ class Document(abc.ABC):
         results_count: int | None = None,
         client: glm.RetrieverServiceClient | None = None,
         request_options: helper_types.RequestOptionsType | None = None,
-    ) -> list[RelevantChunk]:
+        raw: bool = False,
+    ) -> list[RelevantChunk] | protos.QueryDocumentResponse:
         """
         Query a `Document` in the `Corpus` for information.
 
@@ -1065,6 +1074,8 @@ class Document(abc.ABC):
             query: Query string to perform semantic search.
             metadata_filters: Filter for `Chunk` metadata.
             results_count: The maximum number of `Chunk`s to return.
+            raw: If `True`, return the API's `protos.QueryDocumentResponse` without converting
+                its chunks.
 
         Returns:
             List of relevant chunks.
@@ -1093,6 +1104,8 @@ class Document(abc.ABC):
             results_count=results_count,
         )
         response = client.query_document(request, **request_options)
+        if raw:
+            return response
         response = type(response).to_dict(response)
 
         # Create a RelevantChunk object for each chunk listed in response['relevant_chunks']
@@ -1112,7 +1125,8 @@ class Document(abc.ABC):
         results_count: int | None = None,
         client: glm.RetrieverServiceAsyncClient | None = None,
         request_options: helper_types.RequestOptionsType | None = None,
-    ) -> list[RelevantChunk]:
+        raw: bool = False,
+    ) -> list[RelevantChunk] | protos.QueryDocumentResponse:
         """This is the async version of `Document.query`."""
         if request_options is None:
             request_options = {}
@@ -1138,6 +1152,8 @@ class Document(abc.ABC):
             results_count=results_count,
         )
         response = await client.query_document(request, **request_options)
+        if raw:
+            return response
         response = type(response).to_dict(response)
 
         # Create a RelevantChunk object for each chunk listed in response['relevant_chunks']
@@ -54,6 +54,8 @@ dependencies = [
 
 extras_require = {
     "dev": ["absl-py", "black", "nose2", "pandas", "pytype", "pyyaml", "Pillow", "ipython"],
+    # Native async file uploads, for `genai.upload_file_async`.
+    "aiohttp": ["aiohttp"],
 }
 
 url = "https://github.com/google/generative-ai-python"
@@ -91,6 +93,7 @@ setuptools.setup(
     ],
     platforms="Posix; MacOS X; Windows",
     packages=packages,
+    package_data={"google.generativeai": ["discovery_*.json"]},
     python_requires=">=3.9",
     namespace_packages=namespaces,
     install_requires=dependencies,
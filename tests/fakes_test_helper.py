@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Fakes shared by the client-side traffic control tests."""
+from __future__ import annotations
+
+
+class FakeClock:
+    """A `time.monotonic` replacement, whose `sleep`s advance it instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def sleep_async(self, seconds):
+        self.sleep(seconds)
+
+
+class AsyncIterableStream:
+    """Like a `grpc.aio` streaming call: an async iterable, but not an async iterator."""
+
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def __aiter__(self):
+        async def iterate():
+            for chunk in self._chunks:
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                yield chunk
+
+        return iterate()
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import google.api_core.exceptions
+import google.generativeai as genai
+from google.generativeai import circuit_breaker
+from google.generativeai import client as client_lib
+from google.generativeai import generative_models
+from google.generativeai import protos
+from google.generativeai import rate_limiting
+
+from tests import fakes_test_helper
+
+State = circuit_breaker.State
+UNAVAILABLE = google.api_core.exceptions.ServiceUnavailable("down")
+
+
+def simple_response(text):
+    return protos.GenerateContentResponse(
+        {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+    )
+
+
+class MockGenerativeServiceClient:
+    def __init__(self, failing_models=()):
+        self.failing_models = set(failing_models)
+        self.observed_models = []
+
+    def generate_content(self, request, **kwargs):
+        self.observed_models.append(request.model)
+        if request.model in self.failing_models:
+            raise UNAVAILABLE
+        return simple_response(request.model)
+
+    def stream_generate_content(self, request, **kwargs):
+        self.observed_models.append(request.model)
+        if request.model in self.failing_models:
+
+            def fail():
+                raise UNAVAILABLE
+                yield
+
+            return fail()
+        return iter([simple_response(request.model)])
+
+
+class BreakerTests(parameterized.TestCase):
+    def setUp(self):
+        self.clock = fakes_test_helper.FakeClock()
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = circuit_breaker.CircuitBreaker(failure_threshold=3, clock=self.clock)
+        for _ in range(2):
+            breaker.record(UNAVAILABLE)
+        self.assertEqual(State.CLOSED, breaker.state)
+
+        breaker.record(UNAVAILABLE)
+        self.assertEqual(State.OPEN, breaker.state)
+        self.assertFalse(breaker.allow())
+
+    def test_success_resets_consecutive_failures(self):
+        breaker = circuit_breaker.CircuitBreaker(failure_threshold=2, window=100, clock=self.clock)
+        for _ in range(5):
+            breaker.record(UNAVAILABLE)
+            breaker.record(None)
+        self.assertEqual(State.CLOSED, breaker.state)
+
+    def test_opens_on_error_rate(self):
+        breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=100, error_rate=0.5, window=4, clock=self.clock
+        )
+        for error in [UNAVAILABLE, None, UNAVAILABLE]:
+            breaker.record(error)
+        self.assertEqual(State.CLOSED, breaker.state)
+
+        breaker.record(None)
+        breaker.record(UNAVAILABLE)
+        self.assertEqual(State.OPEN, breaker.state)
+
+    def test_client_errors_are_not_failures(self):
+        breaker = circuit_breaker.CircuitBreaker(failure_threshold=1, clock=self.clock)
+        breaker.record(google.api_core.exceptions.InvalidArgument("bad request"))
+        self.assertEqual(State.CLOSED, breaker.state)
+
+    @parameterized.named_parameters(
+        ["probe_succeeds", None, State.CLOSED],
+        ["probe_fails", UNAVAILABLE, State.OPEN],
+    )
+    def test_half_open_probe(self, error, expected_state):
+        breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=self.clock
+        )
+        breaker.record(UNAVAILABLE)
+
+        self.clock.now = 10
+        self.assertEqual(State.HALF_OPEN, breaker.state)
+        self.assertTrue(breaker.allow())
+        # Only one probe at a time.
+        self.assertFalse(breaker.allow())
+
+        breaker.record(error)
+        self.assertEqual(expected_state, breaker.state)
+
+    def test_abandoned_probe_expires(self):
+        breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=self.clock
+        )
+        breaker.record(UNAVAILABLE)
+        self.clock.now = 10
+        self.assertTrue(breaker.allow())
+
+        self.clock.now = 20
+        self.assertTrue(breaker.allow())
+
+    @parameterized.named_parameters(
+        ["closed_stream", GeneratorExit()],
+        ["cancelled", asyncio.CancelledError()],
+    )
+    def test_abandoned_calls_are_not_recorded(self, error):
+        breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=self.clock
+        )
+        breaker.record(error)
+        self.assertEqual(State.CLOSED, breaker.state)
+
+        breaker.record(UNAVAILABLE)
+        self.clock.now = 10
+        self.assertTrue(breaker.allow())
+        breaker.record(error)
+        # The probe was abandoned: the breaker stays half-open, and lets another one through.
+        self.assertEqual(State.HALF_OPEN, breaker.state)
+        self.assertTrue(breaker.allow())
+
+    def test_abandoned_stream_probe(self):
+        breaker = circuit_breaker.CircuitBreaker(
+            failure_threshold=1, reset_timeout=10, clock=self.clock
+        )
+        breaker.record(UNAVAILABLE)
+        self.clock.now = 10
+        self.assertTrue(breaker.allow())
+
+        stream = circuit_breaker.track_stream(breaker, iter(["a", "b"]))
+        self.assertEqual("a", next(stream))
+        stream.close()
+
+        self.assertEqual(State.HALF_OPEN, breaker.state)
+        self.assertTrue(breaker.allow())
+
+    @parameterized.named_parameters(
+        ["threshold", dict(failure_threshold=0)],
+        ["error_rate", dict(error_rate=0)],
+    )
+    def test_invalid_configuration(self, kwargs):
+        with self.assertRaisesRegex(ValueError, "Invalid configuration"):
+            circuit_breaker.CircuitBreaker(**kwargs)
+
+
+class FallbackTests(parameterized.TestCase):
+    def setUp(self):
+        genai.configure(circuit_breakers=dict(failure_threshold=1))
+        self.addCleanup(genai.configure)
+        self.client = MockGenerativeServiceClient(failing_models=["models/flash"])
+        client_lib._client_manager.clients["generative"] = self.client
+
+    def test_breakers_are_per_model(self):
+        flash = client_lib.get_default_circuit_breaker("flash")
+        self.assertIs(flash, client_lib.get_default_circuit_breaker("models/flash"))
+        self.assertIsNot(flash, client_lib.get_default_circuit_breaker("pro"))
+
+    def test_no_breakers_by_default(self):
+        genai.configure()
+        self.assertIsNone(client_lib.get_default_circuit_breaker("flash"))
+
+    def test_fallback_while_open(self):
+        model = generative_models.GenerativeModel("flash", fallback_models=["pro"])
+
+        with self.assertRaises(google.api_core.exceptions.ServiceUnavailable):
+            model.generate_content("hello")
+        self.assertEqual(State.OPEN, client_lib.get_default_circuit_breaker("flash").state)
+
+        response = model.generate_content("hello")
+        self.assertEqual("models/pro", response.text)
+        self.assertEqual(["models/flash", "models/pro"], self.client.observed_models)
+
+    def test_fails_fast_when_all_open(self):
+        model = generative_models.GenerativeModel("flash")
+
+        with self.assertRaises(google.api_core.exceptions.ServiceUnavailable):
+            model.generate_content("hello")
+        with self.assertRaises(circuit_breaker.CircuitOpenError):
+            model.generate_content("hello")
+        self.assertEqual(["models/flash"], self.client.observed_models)
+
+    def test_stream_failures_are_recorded(self):
+        model = generative_models.GenerativeModel("flash", fallback_models=["pro"])
+
+        with self.assertRaises(google.api_core.exceptions.ServiceUnavailable):
+            model.generate_content("hello", stream=True)
+        self.assertEqual(State.OPEN, client_lib.get_default_circuit_breaker("flash").state)
+
+        response = model.generate_content("hello", stream=True)
+        response.resolve()
+        self.assertEqual("models/pro", response.text)
+
+    def half_open_flash(self):
+        clock = fakes_test_helper.FakeClock()
+        genai.configure(circuit_breakers=dict(failure_threshold=1, reset_timeout=10, clock=clock))
+        client_lib._client_manager.clients["generative"] = self.client
+        breaker = client_lib.get_default_circuit_breaker("flash")
+        breaker.record(UNAVAILABLE)
+        clock.now = 10
+        self.assertEqual(State.HALF_OPEN, breaker.state)
+        return breaker
+
+    def test_stream_creation_errors_are_recorded(self):
+        breaker = self.half_open_flash()
+
+        def stream_generate_content(request, **kwargs):
+            raise UNAVAILABLE
+
+        self.client.stream_generate_content = stream_generate_content
+        model = generative_models.GenerativeModel("flash")
+        with self.assertRaises(google.api_core.exceptions.ServiceUnavailable):
+            model.generate_content("hello", stream=True)
+
+        # The failed probe opens the breaker again.
+        self.assertEqual(State.OPEN, breaker.state)
+
+    def test_rate_limit_errors_release_the_probe(self):
+        breaker = self.half_open_flash()
+
+        model = generative_models.GenerativeModel("flash")
+        with mock.patch.object(rate_limiting, "acquire", side_effect=TimeoutError):
+            with self.assertRaises(TimeoutError):
+                model.generate_content("hello")
+
+        # The probe was never sent, another call can probe the model.
+        self.assertEqual(State.HALF_OPEN, breaker.state)
+        self.assertTrue(breaker.allow())
+
+
+if __name__ == "__main__":
+    absltest.main()
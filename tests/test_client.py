@@ -1,4 +1,9 @@
+import asyncio
 import os
+import pathlib
+import tempfile
+import threading
+import unittest
 from unittest import mock
 
 from absl.testing import absltest
@@ -7,9 +12,12 @@ from absl.testing import parameterized
 import google.ai.generativelanguage as glm
 
 from google.api_core import client_options
+from google.api_core import exceptions
 from google.generativeai import protos
 from google.generativeai import client
 
+from tests import fakes_test_helper
+
 
 class ClientTests(parameterized.TestCase):
     def setUp(self):
@@ -130,6 +138,308 @@ class ClientTests(parameterized.TestCase):
         )
         self.assertEqual(cm1.default_metadata, cm2.default_metadata)
 
+    class PoolDummyClient:
+        def __init__(self, *args, **kwargs):
+            self.kwargs = kwargs
+            self.calls = []
+
+        def generate_content(self, request, **kwargs):
+            self.calls.append(request)
+            return request
+
+        def stream_generate_content(self, request, **kwargs):
+            self.calls.append(request)
+            return iter([request, request])
+
+        def _hidden(self):
+            return "hidden"
+
+        @classmethod
+        def get_transport_class(cls, transport):
+            return object
+
+    def test_write_atomic_from_threads(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        path = pathlib.Path(tempdir.name) / "state.json"
+        barrier = threading.Barrier(8)
+        errors = []
+
+        def write(i):
+            barrier.wait()
+            try:
+                for _ in range(20):
+                    client._write_atomic(path, str(i) * 100)
+            except OSError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEmpty(errors)
+        text = path.read_text()
+        self.assertIn(text, [str(i) * 100 for i in range(8)])
+        self.assertEqual([path], list(path.parent.iterdir()))
+
+    def test_client_pool_round_robin(self):
+        clients = [self.PoolDummyClient() for _ in range(3)]
+        pool = client._ClientPool(clients)
+
+        for n in range(6):
+            self.assertEqual(n, pool.generate_content(n))
+
+        self.assertEqual([[0, 3], [1, 4], [2, 5]], [c.calls for c in clients])
+        self.assertEqual([0, 0, 0], pool.outstanding)
+        self.assertEqual("hidden", pool._hidden())
+
+    def test_client_pool_least_outstanding(self):
+        clients = [self.PoolDummyClient() for _ in range(2)]
+        pool = client._ClientPool(clients)
+
+        stream = pool.stream_generate_content("a")
+        self.assertEqual([1, 0], pool.outstanding)
+
+        # The busy channel is skipped until its stream completes.
+        pool.generate_content("b")
+        pool.generate_content("c")
+        self.assertEqual([["a"], ["b", "c"]], [c.calls for c in clients])
+
+        self.assertEqual(["a", "a"], list(stream))
+        self.assertEqual([0, 0], pool.outstanding)
+
+    def test_client_pool_error_releases_channel(self):
+        class FailingClient:
+            def generate_content(self, request):
+                raise RuntimeError("boom")
+
+        pool = client._ClientPool([FailingClient()])
+        with self.assertRaises(RuntimeError):
+            pool.generate_content("a")
+        self.assertEqual([0], pool.outstanding)
+
+    @mock.patch.object(glm, "GenerativeServiceClient", PoolDummyClient)
+    def test_configure_pool_size(self):
+        client.configure(api_key="AIzA_client", pool_size=3)
+
+        generative_client = client.get_default_generative_client()
+        self.assertIsInstance(generative_client, client._ClientPool)
+        self.assertLen(generative_client.clients, 3)
+
+        # Other services are not pooled.
+        self.assertNotIsInstance(client.get_default_model_client(), client._ClientPool)
+
+    @parameterized.parameters(0, -1, 1.5)
+    def test_configure_invalid_pool_size(self, pool_size):
+        with self.assertRaisesRegex(ValueError, "pool_size"):
+            client.configure(pool_size=pool_size)
+
+    def test_client_pool_penalizes_exhausted_keys(self):
+        class QuotaClient:
+            def __init__(self):
+                self.calls = 0
+
+            def generate_content(self, request):
+                self.calls += 1
+                raise exceptions.ResourceExhausted("quota")
+
+        now = [0.0]
+        exhausted, healthy = QuotaClient(), self.PoolDummyClient()
+        pool = client._ClientPool([exhausted, healthy], clock=lambda: now[0])
+
+        with self.assertRaises(exceptions.ResourceExhausted):
+            pool.generate_content("a")
+        self.assertEqual({0: 60.0}, pool.penalties)
+
+        for request in ["b", "c"]:
+            pool.generate_content(request)
+        self.assertEqual(1, exhausted.calls)
+        self.assertEqual(["b", "c"], healthy.calls)
+
+        # Once the penalty expires the key is used again.
+        now[0] = 60.0
+        self.assertEqual({}, pool.penalties)
+        with self.assertRaises(exceptions.ResourceExhausted):
+            pool.generate_content("d")
+
+    def test_client_pool_most_quota(self):
+        clients = [self.PoolDummyClient() for _ in range(3)]
+        # Two channels share the first key.
+        pool = client._ClientPool(clients, keys=[0, 0, 1], strategy="most_quota")
+
+        for request in ["a", "b", "c", "d"]:
+            pool.generate_content(request)
+
+        # The calls are balanced across keys, not channels.
+        self.assertEqual([["a", "c"], [], ["b", "d"]], [c.calls for c in clients])
+
+        with self.assertRaisesRegex(ValueError, "strategy"):
+            client._ClientPool(clients, strategy="random")
+
+    @parameterized.named_parameters(
+        [
+            "file_data",
+            protos.GenerateContentRequest(
+                model="models/gemini-pro",
+                contents=[{"parts": [{"file_data": {"file_uri": "https://example.com/f"}}]}],
+            ),
+        ],
+        [
+            "cached_content",
+            protos.CountTokensRequest(
+                generate_content_request={"model": "models/a", "cached_content": "cachedContents/c"}
+            ),
+        ],
+        ["tuned_model", {"model": "tunedModels/my-model"}],
+    )
+    def test_client_pool_pins_project_resources(self, request):
+        clients = [self.PoolDummyClient() for _ in range(4)]
+        pool = client._ClientPool(clients, keys=[0, 0, 1, 1], strategy="round_robin")
+
+        for _ in range(4):
+            pool.generate_content(request)
+        # Only the first key's project can use the resource.
+        self.assertEqual([2, 2, 0, 0], [len(c.calls) for c in clients])
+
+        other = protos.GenerateContentRequest(model="models/gemini-pro")
+        for _ in range(4):
+            pool.generate_content(other)
+        self.assertEqual([2, 2, 0, 0], [c.calls.count(request) for c in clients])
+        self.assertEqual([1, 1, 1, 1], [c.calls.count(other) for c in clients])
+
+    @mock.patch.object(glm, "GenerativeServiceClient", PoolDummyClient)
+    @mock.patch.object(glm, "ModelServiceClient", PoolDummyClient)
+    def test_configure_credential_pool(self):
+        client.configure(credential_pool=["key-1", "key-2"], pool_size=2)
+
+        generative_client = client.get_default_generative_client()
+        self.assertIsInstance(generative_client, client._ClientPool)
+        api_keys = [c.kwargs["client_options"].api_key for c in generative_client.clients]
+        self.assertEqual(["key-1", "key-1", "key-2", "key-2"], api_keys)
+
+        # Other services use the first key.
+        model_client = client.get_default_model_client()
+        self.assertEqual("key-1", model_client.kwargs["client_options"].api_key)
+
+    @parameterized.named_parameters(
+        ["with_api_key", dict(credential_pool=["key-1"], api_key="key-2"), ValueError],
+        ["bad_credential", dict(credential_pool=[1]), TypeError],
+        ["bad_selection", dict(credential_selection="random"), ValueError],
+    )
+    def test_configure_invalid_credential_pool(self, kwargs, error):
+        with self.assertRaises(error):
+            client.configure(**kwargs)
+
+    class LoopDummyClient:
+        closed = []
+
+        def __init__(self, *args, **kwargs):
+            self.transport = self
+
+        async def generate_content(self, request, **kwargs):
+            return request
+
+        def close(self):
+            async def close():
+                ClientTests.LoopDummyClient.closed.append(self)
+
+            return close()
+
+    @mock.patch.object(glm, "GenerativeServiceAsyncClient", LoopDummyClient)
+    def test_async_clients_per_event_loop(self):
+        client.configure(api_key="AIzA_client")
+
+        async def get_clients():
+            return (
+                client.get_default_generative_async_client(),
+                client.get_default_generative_async_client(),
+            )
+
+        loop_1 = asyncio.new_event_loop()
+        a, b = loop_1.run_until_complete(get_clients())
+        self.assertIs(a, b)
+
+        loop_2 = asyncio.new_event_loop()
+        c, _ = loop_2.run_until_complete(get_clients())
+        self.assertIsNot(a, c)
+
+        # Once its loop is closed, the client is dropped and its channel closed.
+        loop_1.close()
+        loop_2.run_until_complete(get_clients())
+        self.assertLen(client._client_manager.loop_clients["generative_async"], 2)
+
+        loop_3 = asyncio.new_event_loop()
+        d, _ = loop_3.run_until_complete(get_clients())
+        loop_3.run_until_complete(asyncio.sleep(0))
+        self.assertIsNot(c, d)
+        self.assertEqual([a], ClientTests.LoopDummyClient.closed)
+        self.assertLen(client._client_manager.loop_clients["generative_async"], 2)
+
+        loop_2.close()
+        loop_3.close()
+
+    def test_explicit_async_client_is_shared(self):
+        explicit = object()
+        client._client_manager.clients["generative_async"] = explicit
+
+        async def get_client():
+            return client.get_default_generative_async_client()
+
+        loop = asyncio.new_event_loop()
+        self.assertIs(explicit, loop.run_until_complete(get_client()))
+        loop.close()
+
+
+class AsyncClientPoolTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
+    class AsyncDummyClient:
+        def __init__(self):
+            self.calls = []
+
+        async def generate_content(self, request, **kwargs):
+            self.calls.append(request)
+            return request
+
+        async def stream_generate_content(self, request, **kwargs):
+            self.calls.append(request)
+
+            async def stream():
+                yield request
+
+            return stream()
+
+    async def test_client_pool_async(self):
+        clients = [self.AsyncDummyClient(), self.AsyncDummyClient()]
+        pool = client._ClientPool(clients, is_async=True)
+
+        for n in range(4):
+            self.assertEqual(n, await pool.generate_content(n))
+
+        self.assertEqual([[0, 2], [1, 3]], [c.calls for c in clients])
+        self.assertEqual([0, 0], pool.outstanding)
+
+    async def test_client_pool_async_stream(self):
+        clients = [self.AsyncDummyClient(), self.AsyncDummyClient()]
+        pool = client._ClientPool(clients, is_async=True)
+
+        stream = await pool.stream_generate_content("a")
+        self.assertEqual([1, 0], pool.outstanding)
+
+        self.assertEqual(["a"], [chunk async for chunk in stream])
+        self.assertEqual([0, 0], pool.outstanding)
+
+    async def test_client_pool_async_iterable_stream(self):
+        class GrpcAioClient(self.AsyncDummyClient):
+            async def stream_generate_content(self, request, **kwargs):
+                return fakes_test_helper.AsyncIterableStream([request, request])
+
+        pool = client._ClientPool([GrpcAioClient(), GrpcAioClient()], is_async=True)
+
+        stream = await pool.stream_generate_content("a")
+        self.assertEqual(["a", "a"], [chunk async for chunk in stream])
+        self.assertEqual([0, 0], pool.outstanding)
+
 
 if __name__ == "__main__":
     absltest.main()
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import google.api_core.exceptions
+import google.generativeai as genai
+from google.generativeai import client as client_lib
+from google.generativeai import concurrency
+from google.generativeai import protos
+
+from tests import fakes_test_helper
+
+
+class UnitTests(parameterized.TestCase):
+    def test_success_increases_limit(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=2)
+
+        # Each success adds `1 / limit`, so a round of calls adds about one.
+        for _ in range(3):
+            limiter.release(limiter.acquire())
+        self.assertEqual(3, limiter.limit)
+
+    def test_limit_is_capped(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+        for _ in range(10):
+            limiter.release(limiter.acquire())
+        self.assertEqual(2, limiter.limit)
+
+    @parameterized.named_parameters(
+        ["resource_exhausted", google.api_core.exceptions.ResourceExhausted("")],
+        ["service_unavailable", google.api_core.exceptions.ServiceUnavailable("")],
+    )
+    def test_overload_decreases_limit(self, error):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=8)
+        limiter.release(limiter.acquire(), error=error)
+        self.assertEqual(4, limiter.limit)
+
+    def test_other_errors_leave_limit(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=8)
+        limiter.release(limiter.acquire(), error=google.api_core.exceptions.InvalidArgument(""))
+        self.assertEqual(8, limiter.limit)
+        self.assertEqual(0, limiter.in_flight)
+
+    def test_one_decrease_per_generation(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=8)
+        permits = [limiter.acquire() for _ in range(4)]
+
+        error = google.api_core.exceptions.ResourceExhausted("")
+        for permit in permits:
+            limiter.release(permit, error=error)
+        self.assertEqual(4, limiter.limit)
+
+        # A call started after the decrease can decrease it again.
+        limiter.release(limiter.acquire(), error=error)
+        self.assertEqual(2, limiter.limit)
+
+    def test_limit_is_floored(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=2)
+        limiter.release(limiter.acquire(), error=google.api_core.exceptions.ResourceExhausted(""))
+        self.assertEqual(2, limiter.limit)
+
+    def test_latency_spike_decreases_limit(self):
+        clock = fakes_test_helper.FakeClock()
+        limiter = concurrency.AdaptiveConcurrencyLimiter(
+            initial_limit=4, max_limit=4, latency_tolerance=3.0, clock=clock
+        )
+        for _ in range(10):
+            permit = limiter.acquire()
+            clock.now += 1.0
+            limiter.release(permit)
+        self.assertEqual(4, limiter.limit)
+
+        permit = limiter.acquire()
+        clock.now += 10.0
+        limiter.release(permit)
+        self.assertEqual(2, limiter.limit)
+
+        # Untracked calls (like streams) don't count.
+        permit = limiter.acquire()
+        clock.now += 100.0
+        limiter.release(permit, track_latency=False)
+        self.assertEqual(2, limiter.limit)
+
+    def test_queued_calls_wait_for_a_permit(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        permit = limiter.acquire()
+
+        acquired = threading.Event()
+
+        def worker():
+            limiter.release(limiter.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        while limiter.queue_depth == 0:
+            pass
+        self.assertFalse(acquired.is_set())
+
+        limiter.release(permit)
+        thread.join()
+        self.assertTrue(acquired.is_set())
+        self.assertEqual(0, limiter.in_flight)
+        self.assertEqual(0, limiter.queue_depth)
+
+    @parameterized.named_parameters(
+        ["min_over_initial", dict(min_limit=4, initial_limit=2)],
+        ["initial_over_max", dict(initial_limit=4, max_limit=2)],
+        ["zero", dict(min_limit=0)],
+        ["backoff", dict(backoff=1.5)],
+    )
+    def test_invalid_configuration(self, kwargs):
+        with self.assertRaisesRegex(ValueError, "Invalid configuration"):
+            concurrency.AdaptiveConcurrencyLimiter(**kwargs)
+
+
+class MockGenerativeServiceClient:
+    def __init__(self, **kwargs):
+        self.limiter = client_lib.get_default_concurrency_limiter()
+        self.in_flight = []
+        self.error = None
+
+    def count_tokens(self, request, **kwargs):
+        self.in_flight.append(self.limiter.in_flight)
+        if self.error is not None:
+            raise self.error
+        return protos.CountTokensResponse(total_tokens=7)
+
+    def stream_generate_content(self, request, **kwargs):
+        self.in_flight.append(self.limiter.in_flight)
+        return iter([protos.GenerateContentResponse()])
+
+
+class ConfigureTests(parameterized.TestCase):
+    def setUp(self):
+        self.addCleanup(genai.configure)
+        self.addCleanup(setattr, client_lib._client_manager, "default_metadata", ())
+
+    def make_client(self, concurrency_limiter):
+        genai.configure(api_key="key", concurrency_limiter=concurrency_limiter)
+        manager = client_lib._client_manager
+        with mock.patch.object(
+            client_lib.glm, "GenerativeServiceClient", MockGenerativeServiceClient
+        ):
+            return manager.make_client("generative")
+
+    def test_default_is_unlimited(self):
+        genai.configure(api_key="key")
+        self.assertIsNone(client_lib.get_default_concurrency_limiter())
+
+    def test_configure_true(self):
+        genai.configure(api_key="key", concurrency_limiter=True)
+        limiter = client_lib.get_default_concurrency_limiter()
+        self.assertIsInstance(limiter, concurrency.AdaptiveConcurrencyLimiter)
+        self.assertEqual(8, limiter.limit)
+
+    def test_calls_hold_a_permit(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=2)
+        client = self.make_client(limiter)
+
+        client.count_tokens(protos.CountTokensRequest())
+        self.assertEqual([1], client.in_flight)
+        self.assertEqual(0, limiter.in_flight)
+
+    def test_errors_are_reported(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=8)
+        client = self.make_client(limiter)
+        client.error = google.api_core.exceptions.ResourceExhausted("quota")
+
+        with self.assertRaises(google.api_core.exceptions.ResourceExhausted):
+            client.count_tokens(protos.CountTokensRequest())
+        self.assertEqual(4, limiter.limit)
+        self.assertEqual(0, limiter.in_flight)
+
+    def test_streams_hold_a_permit_until_exhausted(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=2)
+        client = self.make_client(limiter)
+
+        stream = client.stream_generate_content(protos.GenerateContentRequest())
+        self.assertEqual(1, limiter.in_flight)
+        list(stream)
+        self.assertEqual(0, limiter.in_flight)
+
+
+class AsyncTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
+    async def test_queued_tasks_run_in_order(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        order = []
+
+        async def task(i):
+            permit = await limiter.acquire_async()
+            order.append(i)
+            await asyncio.sleep(0)
+            limiter.release(permit)
+
+        await asyncio.gather(*[task(i) for i in range(4)])
+        self.assertEqual([0, 1, 2, 3], order)
+        self.assertEqual(0, limiter.in_flight)
+
+    async def test_cancelled_waiter_is_removed(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+        permit = await limiter.acquire_async()
+
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0)
+        self.assertEqual(1, limiter.queue_depth)
+
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(0, limiter.queue_depth)
+
+        limiter.release(permit)
+        self.assertEqual(0, limiter.in_flight)
+
+    async def test_async_streams_hold_a_permit_until_exhausted(self):
+        limiter = concurrency.AdaptiveConcurrencyLimiter(initial_limit=2)
+
+        async def stream_generate_content(request):
+            return fakes_test_helper.AsyncIterableStream([request, request])
+
+        call = client_lib._limit_concurrency(
+            limiter, True, "stream_generate_content", stream_generate_content
+        )
+        stream = await call("chunk")
+        self.assertEqual(1, limiter.in_flight)
+        self.assertEqual(["chunk", "chunk"], [chunk async for chunk in stream])
+        self.assertEqual(0, limiter.in_flight)
+
+
+if __name__ == "__main__":
+    absltest.main()
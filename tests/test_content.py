@@ -12,8 +12,13 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import collections
 import dataclasses
+import io
+import mmap
 import pathlib
+import tempfile
+from unittest import mock
 import typing_extensions
 from typing import Any, Union, Iterable
 
@@ -23,6 +28,7 @@ from google.generativeai import protos
 from google.generativeai.types import content_types
 import IPython.display
 import PIL.Image
+import PIL.ImageDraw
 
 import numpy as np
 
@@ -88,10 +94,189 @@ class UnitTests(parameterized.TestCase):
         self.assertEqual(blob.mime_type, "image/jpeg")
         self.assertStartsWith(blob.data, b"\xff\xd8\xff\xe0\x00\x10JFIF")
 
+    @parameterized.named_parameters(
+        ["png", TEST_PNG_PATH, TEST_PNG_DATA],
+        ["jpg", TEST_JPG_PATH, TEST_JPG_DATA],
+    )
+    def test_image_file_passthrough(self, path, data):
+        blob = content_types.image_to_blob(PIL.Image.open(path))
+        self.assertEqual(data, blob.data)
+
+        # Derived images are encoded.
+        blob = content_types.image_to_blob(PIL.Image.open(path).convert("RGB"))
+        self.assertNotEqual(data, blob.data)
+
+        blob = content_types.pil_to_blob(
+            PIL.Image.open(path), content_types.ImageEncoding(passthrough=False)
+        )
+        self.assertNotEqual(data, blob.data)
+
+    @parameterized.named_parameters(
+        ["thumbnail", lambda image: image.thumbnail((10, 10))],
+        ["draw", lambda image: PIL.ImageDraw.Draw(image).line((0, 0, 79, 59), fill="white")],
+        ["load", lambda image: image.load()],
+    )
+    def test_edited_images_are_encoded(self, edit):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "image.png"
+            PIL.Image.new("RGB", (80, 60)).save(path)
+            with PIL.Image.open(path) as image:
+                edit(image)
+                blob = content_types.image_to_blob(image)
+                expected = content_types.pil_to_blob(
+                    image, content_types.ImageEncoding(passthrough=False)
+                )
+
+        # Encoded from the image's pixels, not read from the file.
+        self.assertEqual(expected.data, blob.data)
+        self.assertEqual(image.size, PIL.Image.open(io.BytesIO(blob.data)).size)
+
+    def test_passthrough_reads_the_opened_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "image.png"
+            PIL.Image.new("RGB", (8, 8), "red").save(path)
+            original = path.read_bytes()
+            with PIL.Image.open(path) as image:
+                # The path now names another file.
+                PIL.Image.new("RGB", (8, 8), "blue").save(path.with_suffix(".new.png"))
+                path.with_suffix(".new.png").replace(path)
+                blob = content_types.image_to_blob(image)
+
+        self.assertEqual(original, blob.data)
+
+    def test_image_encoding(self):
+        image = PIL.Image.fromarray(np.zeros([60, 30, 3], dtype=np.uint8))
+        previous = content_types.set_image_encoding(max_size=20, format="webp", quality=50)
+        self.addCleanup(content_types.set_image_encoding, previous)
+
+        blob = content_types.image_to_blob(image)
+        self.assertEqual("image/webp", blob.mime_type)
+        with PIL.Image.open(io.BytesIO(blob.data)) as decoded:
+            self.assertEqual((10, 20), decoded.size)
+
+    @parameterized.named_parameters(
+        ["RGBA", PIL.Image.new("RGBA", (10, 10), (255, 0, 0, 0)), (255, 255, 255)],
+        ["LA", PIL.Image.new("LA", (10, 10), (0, 255)), (0, 0, 0)],
+        ["P", PIL.Image.new("RGB", (10, 10), "red").convert("P"), (254, 0, 0)],
+    )
+    def test_jpeg_flattens_transparency(self, image, pixel):
+        blob = content_types.pil_to_blob(image, content_types.ImageEncoding(format="jpeg"))
+
+        self.assertEqual("image/jpeg", blob.mime_type)
+        with PIL.Image.open(io.BytesIO(blob.data)) as decoded:
+            self.assertEqual("RGB", decoded.mode)
+            # Transparent pixels are painted over white.
+            for expected, actual in zip(pixel, decoded.getpixel((5, 5))):
+                self.assertAlmostEqual(expected, actual, delta=2)
+
+    def test_encode_images(self):
+        patcher = mock.patch.object(content_types, "_image_cache", content_types._ImageBlobCache())
+        cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        image = PIL.Image.fromarray(np.zeros([6, 6, 4], dtype=np.uint8))
+        array = np.zeros([6, 6, 3], dtype=np.uint8)
+        prompts = [
+            [image, "Describe this"],
+            {"parts": [{"inline_data": image}, "Caption this"]},
+            [array, np.zeros([6, 6, 3], dtype=np.uint8)],
+        ]
+
+        with mock.patch.object(
+            content_types, "pil_to_blob", wraps=content_types.pil_to_blob
+        ) as pil_to_blob:
+            encoded = content_types.encode_images(prompts)
+            # Equal arrays share an encoding.
+            self.assertEqual(2, pil_to_blob.call_count)
+
+            # Encoded images are cached.
+            content_types.encode_images([image])
+            self.assertEqual(2, pil_to_blob.call_count)
+        self.assertLen(cache, 2)
+
+        png, text = encoded[0]
+        self.assertIsInstance(png, protos.Blob)
+        self.assertEqual("Describe this", text)
+        self.assertIs(png, encoded[1]["parts"][0]["inline_data"])
+        self.assertEqual("image/jpeg", encoded[2][0].mime_type)
+
+        contents = content_types.to_contents(encoded[1])
+        self.assertEqual("image/png", contents[0].parts[0].inline_data.mime_type)
+
+    def test_image_cache_is_keyed_by_contents(self):
+        patcher = mock.patch.object(content_types, "_image_cache", content_types._ImageBlobCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        image = PIL.Image.new("RGB", (6, 6), "black")
+        (black,) = content_types.encode_images([image])
+        image.paste("white", (0, 0, 6, 6))
+        (white,) = content_types.encode_images([image])
+        self.assertNotEqual(black.data, white.data)
+
+        # An equal image, even a different object, reuses the encoding.
+        (again,) = content_types.encode_images([PIL.Image.new("RGB", (6, 6), "white")])
+        self.assertIs(white, again)
+
+    def test_encode_images_keeps_containers(self):
+        image = PIL.Image.new("RGB", (6, 6))
+        Prompt = collections.namedtuple("Prompt", ["image", "text"])
+        contents = (
+            collections.OrderedDict(parts=(image, "Describe this")),
+            Prompt(image, "Caption this"),
+            ["no images"],
+        )
+
+        encoded = content_types.encode_images(contents)
+
+        self.assertIsInstance(encoded, tuple)
+        self.assertIsInstance(encoded[0], collections.OrderedDict)
+        self.assertIsInstance(encoded[0]["parts"], tuple)
+        self.assertIsInstance(encoded[1], Prompt)
+        self.assertIsInstance(encoded[1].image, protos.Blob)
+        self.assertIs(contents[2], encoded[2])
+        # The caller's contents are unchanged.
+        self.assertIs(image, contents[0]["parts"][0])
+
+    def test_encode_images_reads_files_once(self):
+        patcher = mock.patch.object(content_types, "_image_cache", content_types._ImageBlobCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with mock.patch.object(
+            content_types, "_source_bytes", wraps=content_types._source_bytes
+        ) as source_bytes:
+            (blob,) = content_types.encode_images([PIL.Image.open(TEST_PNG_PATH)])
+
+        self.assertEqual(TEST_PNG_DATA, blob.data)
+        self.assertEqual(1, source_bytes.call_count)
+
+    def test_encode_images_without_images(self):
+        prompts = [["Hello"], "world"]
+        self.assertIs(prompts, content_types.encode_images(prompts))
+
+    def test_array_to_content(self):
+        content = content_types.to_content(np.zeros([6, 6, 3], dtype=np.uint8))
+        self.assertLen(content.parts, 1)
+        self.assertEqual("image/jpeg", content.parts[0].inline_data.mime_type)
+
+    @parameterized.named_parameters(
+        ["max_size", dict(max_size=0)],
+        ["format", dict(format="gif")],
+        ["quality", dict(quality=101)],
+    )
+    def test_invalid_image_encoding(self, kwargs):
+        with self.assertRaisesRegex(ValueError, "Invalid configuration"):
+            content_types.ImageEncoding(**kwargs)
+
     @parameterized.named_parameters(
         ["BlobDict", {"mime_type": "image/png", "data": TEST_PNG_DATA}],
         ["protos.Blob", protos.Blob(mime_type="image/png", data=TEST_PNG_DATA)],
         ["Image", IPython.display.Image(filename=TEST_PNG_PATH)],
+        ["Path", TEST_PNG_PATH],
+        ["bytes", TEST_PNG_DATA],
+        ["bytearray", bytearray(TEST_PNG_DATA)],
+        ["memoryview", memoryview(TEST_PNG_DATA)],
     )
     def test_to_blob(self, example):
         blob = content_types.to_blob(example)
@@ -99,6 +284,23 @@ class UnitTests(parameterized.TestCase):
         self.assertEqual(blob.mime_type, "image/png")
         self.assertStartsWith(blob.data, b"\x89PNG")
 
+    def test_mmap_to_part(self):
+        with open(TEST_JPG_PATH, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            content = content_types.to_content(m)
+        blob = content.parts[0].inline_data
+        self.assertEqual("image/jpeg", blob.mime_type)
+        self.assertEqual(TEST_JPG_DATA, blob.data)
+
+    def test_file_to_contents(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "notes.txt"
+            path.write_text("Hello world!")
+            contents = content_types.to_contents(["Summarize this", path])
+        self.assertLen(contents, 1)
+        part = contents[0].parts[1]
+        self.assertEqual("text/plain", part.inline_data.mime_type)
+        self.assertEqual(b"Hello world!", part.inline_data.data)
+
     @parameterized.named_parameters(
         ["dict", {"text": "Hello world!"}],
         ["protos.Part", protos.Part(text="Hello world!")],
@@ -116,6 +318,8 @@ class UnitTests(parameterized.TestCase):
             "PartDict",
             {"inline_data": {"mime_type": "image/png", "data": TEST_PNG_DATA}},
         ],
+        ["Path", TEST_PNG_PATH],
+        ["memoryview", memoryview(TEST_PNG_DATA)],
     )
     def test_img_to_part(self, example):
         blob = content_types.to_part(example).inline_data
@@ -194,6 +398,20 @@ class UnitTests(parameterized.TestCase):
         self.assertIsInstance(part, protos.Part)
         self.assertEqual(part.text, "Hello world!")
 
+    @parameterized.named_parameters(
+        ["list[str]", ["Hello", "world!"]],
+        ["list[parts]", [protos.Part(text="Hello"), {"text": "world!"}]],
+        ["iterator[str]", iter(["Hello", "world!"])],
+    )
+    def test_parts_to_contents(self, example):
+        # A list of parts is a single `Content`.
+        (content,) = content_types.to_contents(example)
+        self.assertEqual(["Hello", "world!"], [part.text for part in content.parts])
+
+    def test_mixed_contents_fail(self):
+        with self.assertRaises(TypeError):
+            content_types.to_contents([{"parts": ["Hello"]}, object()])
+
     def test_dict_to_content_fails(self):
         with self.assertRaises(KeyError):
             content_types.to_content({"bad": "dict"})
@@ -105,6 +105,20 @@ class UnitTests(parameterized.TestCase):
             math.ceil(len(texts) / embedding.EMBEDDING_MAX_BATCH_SIZE),
         )
 
+    def test_embed_content_raw(self):
+        emb = embedding.embed_content(model=DEFAULT_EMB_MODEL, content="What are you?", raw=True)
+        self.assertIsInstance(emb, protos.EmbedContentResponse)
+        self.assertEqual([1, 2, 3], list(emb.embedding.values))
+
+    def test_batch_embed_contents_raw(self):
+        texts = ["What are you?"] * 101
+        emb = embedding.embed_content(model=DEFAULT_EMB_MODEL, content=texts, raw=True)
+
+        # The batches are merged into one response.
+        self.assertIsInstance(emb, protos.BatchEmbedContentsResponse)
+        self.assertLen(emb.embeddings, len(texts))
+        self.assertLen(self.observed_requests, 2)
+
     def test_embed_content_title_and_task_1(self):
         text = "What are you?"
         emb = embedding.embed_content(
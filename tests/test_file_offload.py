@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import datetime
+import hashlib
+import unittest
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import google.generativeai as genai
+from google.generativeai import client as client_lib
+from google.generativeai import file_offload
+from google.generativeai import files
+from google.generativeai import generative_models
+from google.generativeai import protos
+from google.generativeai.types import file_types
+
+DATA = b"\x89PNG\r\n\x1a\n" + bytes(100)
+
+
+class MockGenerativeServiceClient:
+    def __init__(self):
+        self.observed_requests = []
+
+    def generate_content(self, request, **kwargs):
+        self.observed_requests.append(request)
+        return protos.GenerateContentResponse(
+            {"candidates": [{"content": {"role": "model", "parts": [{"text": "ok"}]}}]}
+        )
+
+
+class FakeUploads:
+    """Stands in for `files.upload_file`, checking the uploaded file's contents."""
+
+    def __init__(self, expiration_time=None, sha256_hash=None):
+        self.uploads = []
+        self.expiration_time = expiration_time
+        self.sha256_hash = sha256_hash
+        self.state = protos.File.State.ACTIVE
+
+    def upload_file(self, data, *, mime_type=None, name=None, display_name=None):
+        self.uploads.append(data)
+        digest = hashlib.sha256(data).hexdigest()
+        assert display_name == digest
+        return file_types.File(
+            protos.File(
+                name=f"files/{len(self.uploads)}",
+                uri=f"https://example.com/files/{len(self.uploads)}",
+                mime_type=mime_type,
+                expiration_time=self.expiration_time,
+                sha256_hash=self.sha256_hash or digest.encode(),
+                state=self.state,
+            )
+        )
+
+    async def upload_file_async(self, data, **kwargs):
+        return self.upload_file(data, **kwargs)
+
+
+def request_for(*parts):
+    return protos.GenerateContentRequest(model="models/gemini-pro", contents=[{"parts": parts}])
+
+
+class UnitTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.fake = FakeUploads()
+        for name in ["upload_file", "upload_file_async"]:
+            patcher = mock.patch.object(files, name, getattr(self.fake, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.index = file_offload.FileIndex()
+
+    def test_offload(self):
+        offloader = file_offload.FileOffloader(min_size=50, index=self.index)
+        request = request_for(
+            {"text": "hello"},
+            {"inline_data": {"mime_type": "image/png", "data": DATA}},
+            {"inline_data": {"mime_type": "image/png", "data": b"small"}},
+            {"inline_data": {"mime_type": "image/png", "data": DATA}},
+        )
+        offloader.offload(request)
+
+        text, large, small, again = request.contents[0].parts
+        self.assertEqual("hello", text.text)
+        self.assertEqual(b"small", small.inline_data.data)
+        for part in [large, again]:
+            self.assertNotIn("inline_data", part)
+            self.assertEqual(
+                protos.FileData(mime_type="image/png", file_uri="https://example.com/files/1"),
+                part.file_data,
+            )
+        # The same bytes are only uploaded once.
+        self.assertEqual([DATA], self.fake.uploads)
+
+        offloader.offload(request_for({"inline_data": {"mime_type": "image/png", "data": DATA}}))
+        self.assertLen(self.fake.uploads, 1)
+
+    def test_offload_until_the_request_fits(self):
+        offloader = file_offload.FileOffloader(
+            min_size=1000, index=self.index, max_request_size=200
+        )
+        request = request_for(
+            {"inline_data": {"mime_type": "image/png", "data": DATA}},
+            {"inline_data": {"mime_type": "image/png", "data": DATA * 2}},
+            {"inline_data": {"mime_type": "image/png", "data": b"small"}},
+        )
+        offloader.offload(request)
+
+        # Uploading the largest blob is enough.
+        self.assertEqual([DATA * 2], self.fake.uploads)
+        self.assertEqual(
+            ["inline_data", "file_data", "inline_data"],
+            [type(part).pb(part).WhichOneof("data") for part in request.contents[0].parts],
+        )
+
+    async def test_offload_async(self):
+        offloader = file_offload.FileOffloader(min_size=50, index=self.index)
+        request = request_for({"inline_data": {"mime_type": "image/png", "data": DATA}})
+        await offloader.offload_async(request)
+
+        self.assertEqual(
+            "https://example.com/files/1", request.contents[0].parts[0].file_data.file_uri
+        )
+        self.assertEqual([DATA], self.fake.uploads)
+
+    def test_expired_files_are_uploaded_again(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.fake.expiration_time = now + datetime.timedelta(hours=1)
+        offloader = file_offload.FileOffloader(min_size=50, index=self.index)
+        offloader.offload(request_for({"inline_data": {"mime_type": "image/png", "data": DATA}}))
+        self.assertLen(self.index, 1)
+
+        later = now + datetime.timedelta(minutes=55)
+        with mock.patch.object(file_offload, "datetime", wraps=datetime) as mock_datetime:
+            mock_datetime.datetime = mock.Mock(wraps=datetime.datetime)
+            mock_datetime.datetime.now.return_value = later
+            offloader.offload(
+                request_for({"inline_data": {"mime_type": "image/png", "data": DATA}})
+            )
+
+        self.assertLen(self.fake.uploads, 2)
+
+    def test_mismatched_hash_is_not_indexed(self):
+        self.fake.sha256_hash = b"0" * 64
+        offloader = file_offload.FileOffloader(min_size=50, index=self.index)
+        offloader.offload(request_for({"inline_data": {"mime_type": "image/png", "data": DATA}}))
+
+        self.assertEmpty(self.index)
+
+    @parameterized.named_parameters(
+        ["active", protos.File.State.ACTIVE, None],
+        ["failed", protos.File.State.FAILED, ValueError],
+    )
+    def test_waits_for_processing(self, state, error):
+        self.fake.state = protos.File.State.PROCESSING
+
+        def wait_for_active(uploaded):
+            self.assertEqual(["files/1"], [f.name for f in uploaded])
+            yield file_types.File(
+                {"name": "files/1", "uri": "https://example.com/files/1", "state": state}
+            )
+
+        offloader = file_offload.FileOffloader(min_size=50, index=self.index)
+        request = request_for({"inline_data": {"mime_type": "image/png", "data": DATA}})
+        with mock.patch.object(files, "wait_for_active", wait_for_active):
+            if error is None:
+                offloader.offload(request)
+                self.assertEqual(
+                    "https://example.com/files/1", request.contents[0].parts[0].file_data.file_uri
+                )
+            else:
+                with self.assertRaisesRegex(error, "failed to process"):
+                    offloader.offload(request)
+                self.assertEmpty(self.index)
+
+    def test_chat_history_reuses_the_upload(self):
+        client = MockGenerativeServiceClient()
+        client_lib._client_manager.clients["generative"] = client
+        self.addCleanup(genai.configure)
+
+        model = generative_models.GenerativeModel(
+            "gemini-pro", file_offload=dict(min_size=50, index=self.index)
+        )
+        chat = model.start_chat()
+        chat.send_message(["Describe this", {"mime_type": "image/png", "data": DATA}])
+        chat.send_message("And again")
+
+        self.assertLen(client.observed_requests, 2)
+        for request in client.observed_requests:
+            self.assertIn("file_data", request.contents[0].parts[1])
+        self.assertLen(self.fake.uploads, 1)
+
+    @parameterized.named_parameters(
+        ["min_size", dict(min_size=0), ValueError],
+        ["type", 1024, TypeError],
+    )
+    def test_invalid_configuration(self, options, error):
+        with self.assertRaises(error):
+            file_offload.to_file_offloader(options)
+
+
+if __name__ == "__main__":
+    absltest.main()
@@ -17,15 +17,31 @@ from google.generativeai.types import file_types
 
 import collections
 import datetime
+import hashlib
+import io
+import json
 import os
 from typing import Iterable, Union
 import pathlib
+import stat
+import tempfile
+import threading
+import time
+import types
+from unittest import mock
 
 import google
+import google.api_core.exceptions
+import googleapiclient.discovery
+import googleapiclient.errors
+import googleapiclient.http
+import googleapiclient.model
 
 import google.generativeai as genai
 from google.generativeai import client as client_lib
+from google.generativeai import files
 from google.generativeai import protos
+from absl.testing import absltest
 from absl.testing import parameterized
 
 
@@ -43,6 +59,7 @@ class FileServiceClient(client_lib.FileServiceClient):
         name: Union[str, None] = None,
         display_name: Union[str, None] = None,
         resumable: bool = True,
+        **kwargs,
     ) -> protos.File:
         self.observed_requests.append(
             dict(
@@ -51,6 +68,7 @@ class FileServiceClient(client_lib.FileServiceClient):
                 name=name,
                 display_name=display_name,
                 resumable=resumable,
+                **kwargs,
             )
         )
         return self.responses["create_file"].pop(0)
@@ -146,3 +164,402 @@ class UnitTests(parameterized.TestCase):
         response = genai.upload_file("test.webp")
 
         self.assertEqual("image/webp", self.observed_requests[0]["mime_type"])
+
+    @parameterized.named_parameters(
+        ["pdf", b"%PDF-1.7\n", None, "application/pdf"],
+        ["png", b"\x89PNG\r\n\x1a\n\x00\x00", None, "image/png"],
+        ["webp", b"RIFF\x00\x00\x00\x00WEBPVP8 ", None, "image/webp"],
+        ["wav", b"RIFF\x00\x00\x00\x00WAVEfmt ", None, "audio/wav"],
+        ["mp4", b"\x00\x00\x00\x18ftypmp42", None, "video/mp4"],
+        ["mp3", b"ID3\x04\x00", None, "audio/mp3"],
+        ["extension", b"a,b\n1,2\n", "data.csv", "text/csv"],
+        ["text", "héllo".encode(), None, "text/plain"],
+        ["binary", b"\x00\xff\xfe\x80", None, "application/octet-stream"],
+    )
+    def test_sniff_mime_type(self, data, path, expected):
+        self.assertEqual(expected, file_types.sniff_mime_type(data, path))
+
+    def fake_upload_file(self, path, *, resumable=True):
+        if "bad" in str(path):
+            raise google.api_core.exceptions.InvalidArgument(f"Can't upload {path}")
+        return file_types.File(protos.File(name=f"files/{path}"))
+
+    def test_upload_files(self):
+        progress = []
+        paths = [f"doc-{i}.pdf" for i in range(10)] + ["bad.pdf"]
+        with mock.patch.object(files, "upload_file", self.fake_upload_file):
+            results = genai.upload_files(
+                paths, max_workers=4, on_progress=lambda *args: progress.append(args)
+            )
+
+        self.assertEqual([f"files/doc-{i}.pdf" for i in range(10)], [f.name for f in results[:10]])
+        self.assertIsInstance(results[10], google.api_core.exceptions.InvalidArgument)
+        self.assertEqual([(i, 11) for i in range(1, 12)], progress)
+
+    def test_upload_files_raises(self):
+        with mock.patch.object(files, "upload_file", self.fake_upload_file):
+            with self.assertRaises(google.api_core.exceptions.InvalidArgument):
+                genai.upload_files(["a.pdf", "bad.pdf"], return_exceptions=False)
+
+    def test_http_per_thread(self):
+        client = client_lib.FileServiceClient(client_options={"api_key": "key"})
+        http = client._get_http()
+        self.assertIs(http, client._get_http())
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(client._get_http()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(http, other[0])
+        # Other clients reuse the thread's connections.
+        other_client = client_lib.FileServiceClient(client_options={"api_key": "key"})
+        self.assertIs(http, other_client._get_http())
+
+    def test_upload_resume_state(self):
+        self.responses["create_file"].append(protos.File())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / "video.mp4"
+            path.write_bytes(b"frames")
+            with mock.patch.dict(os.environ, {"GOOGLE_GENERATIVEAI_CACHE_DIR": tmp}):
+                genai.upload_file(path, resume=True, chunk_size=2**20)
+
+        (request,) = self.observed_requests
+        self.assertEqual(2**20, request["chunk_size"])
+        self.assertEqual(
+            pathlib.Path(tmp) / "uploads" / f"{hashlib.sha256(b'frames').hexdigest()}.json",
+            request["resume_state"],
+        )
+
+    @parameterized.named_parameters(
+        ["chunk_size", "video.mp4", dict(chunk_size=1000)],
+        ["not_resumable", "video.mp4", dict(resume=True, resumable=False)],
+        ["resume_stream", io.BytesIO(b"frames"), dict(resume=True, mime_type="video/mp4")],
+    )
+    def test_invalid_upload_configuration(self, source, kwargs):
+        with self.assertRaisesRegex(ValueError, "Invalid configuration"):
+            genai.upload_file(source, **kwargs)
+
+    def test_upload_contents(self):
+        self.responses["create_file"].extend([protos.File(), protos.File()])
+        genai.upload_file(b"%PDF-1.7 ...")
+        stream = io.BytesIO(b"RIFF....WAVE")
+        stream.name = "/tmp/speech.wav"
+        genai.upload_file(stream, mime_type="audio/wav")
+
+        pdf, wav = self.observed_requests
+        self.assertEqual(("application/pdf", None), (pdf["mime_type"], pdf["display_name"]))
+        self.assertEqual(("audio/wav", "speech.wav"), (wav["mime_type"], wav["display_name"]))
+        self.assertIs(stream, wav["path"])
+
+    def test_upload_stream_requires_mime_type(self):
+        with self.assertRaisesRegex(ValueError, "mime_type"):
+            genai.upload_file(iter([b"frames"]))
+
+
+class UnseekableStream(io.RawIOBase):
+    """A stream like a pipe, which can only be read forwards."""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Short reads, like a pipe's.
+        data = self._data.read(min(len(buffer), 4))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class ResumableUploadTests(parameterized.TestCase):
+    """Runs `FileServiceClient.create_file` against canned HTTP responses."""
+
+    def setUp(self):
+        fd, path = tempfile.mkstemp(suffix=".mp4")
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"0123456789" * 3)
+        self.path = pathlib.Path(path)
+        self.addCleanup(self.path.unlink)
+        self.state_path = self.path.with_suffix(".json")
+        self.addCleanup(self.state_path.unlink, missing_ok=True)
+
+    def upload(self, responses, source=None, **kwargs):
+        client = client_lib.FileServiceClient(client_options={"api_key": "key"})
+        client._discovery_api = mock.Mock()
+        client._discovery_api.media().upload.side_effect = lambda body, media_body: (
+            googleapiclient.http.HttpRequest(
+                http=None,
+                postproc=googleapiclient.model.JsonModel(data_wrapper=False).response,
+                uri="https://example.com/upload/v1beta/files?uploadType=resumable",
+                method="POST",
+                body=json.dumps(body),
+                headers={"content-type": "application/json"},
+                resumable=media_body,
+            )
+        )
+        http = googleapiclient.http.HttpMockSequence(responses)
+        client._get_http = lambda: http
+        client.get_file = lambda request: protos.File(name=request["name"])
+
+        if source is None:
+            source = self.path
+            kwargs["resume_state"] = self.state_path
+        file = client.create_file(source, chunk_size=10, **kwargs)
+        return file, http.request_sequence
+
+    def test_resume_after_a_crash(self):
+        with self.assertRaises(googleapiclient.errors.HttpError):
+            self.upload(
+                [
+                    (
+                        {"status": "200", "location": "https://example.com/upload?id=1&key=key"},
+                        "",
+                    ),
+                    ({"status": "308", "range": "bytes=0-9"}, ""),
+                    ({"status": "503"}, "unavailable"),
+                ]
+            )
+        # The API key isn't saved.
+        self.assertEqual(
+            {"upload_uri": "https://example.com/upload?id=1", "progress": 10, "size": 30},
+            json.loads(self.state_path.read_text()),
+        )
+        if os.name == "posix":
+            self.assertEqual(0o600, stat.S_IMODE(self.state_path.stat().st_mode))
+
+        file, requests = self.upload(
+            [
+                # The server got the second chunk, before the failure.
+                ({"status": "308", "range": "bytes=0-19"}, ""),
+                ({"status": "200"}, '{"file": {"name": "files/abc"}}'),
+            ]
+        )
+
+        self.assertEqual("files/abc", file.name)
+        (query_uri, _, _, query_headers), (uri, _, _, headers) = requests
+        self.assertEqual("https://example.com/upload?id=1&key=key", query_uri)
+        self.assertEqual("bytes */30", query_headers["Content-Range"])
+        self.assertEqual("https://example.com/upload?id=1&key=key", uri)
+        self.assertEqual("bytes 20-29/30", headers["Content-Range"])
+        self.assertFalse(self.state_path.exists())
+
+    def test_resume_a_finished_upload(self):
+        self.state_path.write_text(
+            json.dumps({"upload_uri": "https://example.com/upload/1", "progress": 20, "size": 30})
+        )
+
+        # The last chunk was received, but the process stopped before the state was removed.
+        file, requests = self.upload([({"status": "200"}, '{"file": {"name": "files/abc"}}')])
+
+        self.assertEqual("files/abc", file.name)
+        self.assertLen(requests, 1)
+        self.assertFalse(self.state_path.exists())
+
+    def test_expired_session_starts_over(self):
+        self.state_path.write_text(
+            json.dumps({"upload_uri": "https://example.com/upload/1", "progress": 10, "size": 30})
+        )
+
+        file, requests = self.upload(
+            [
+                ({"status": "404"}, "not found"),
+                ({"status": "200", "location": "https://example.com/upload/2"}, ""),
+                ({"status": "308", "range": "bytes=0-9"}, ""),
+                ({"status": "308", "range": "bytes=0-19"}, ""),
+                ({"status": "200"}, '{"file": {"name": "files/abc"}}'),
+            ]
+        )
+
+        self.assertEqual("files/abc", file.name)
+        self.assertEqual("bytes 0-9/30", requests[2][3]["Content-Range"])
+
+    @parameterized.named_parameters(
+        ["bytes", lambda: b"0123456789" * 3, "30"],
+        ["seekable", lambda: io.BytesIO(b"0123456789" * 3), "30"],
+        # The chunks don't line up with the upload's, and the size is a multiple of both.
+        ["iterator", lambda: iter([b"0123", b"456789012345678", b"90123456789"]), "*"],
+        ["stream", lambda: UnseekableStream(b"0123456789" * 3), "*"],
+    )
+    def test_upload_contents(self, source, size):
+        file, requests = self.upload(
+            [
+                ({"status": "200", "location": "https://example.com/upload/1"}, ""),
+                ({"status": "308", "range": "bytes=0-9"}, ""),
+                ({"status": "308", "range": "bytes=0-19"}, ""),
+                ({"status": "200"}, '{"file": {"name": "files/abc"}}'),
+            ],
+            source=source(),
+            mime_type="text/plain",
+        )
+
+        self.assertEqual("files/abc", file.name)
+        # Iterators are streamed: their size is only known with their last chunk.
+        self.assertEqual(
+            [f"bytes 0-9/{size}", f"bytes 10-19/{size}", "bytes 20-29/30"],
+            [headers["Content-Range"] for _, _, _, headers in requests[1:]],
+        )
+        bodies = [body for _, _, body, _ in requests[1:]]
+        if size == "*":
+            # Seekable sources are sent as slices of the stream, iterators as `bytes`.
+            self.assertEqual(b"0123456789" * 3, b"".join(bodies))
+
+    def test_iterator_can_resend_the_current_chunk(self):
+        file, requests = self.upload(
+            [
+                ({"status": "200", "location": "https://example.com/upload/1"}, ""),
+                # Only part of the first chunk was received.
+                ({"status": "308", "range": "bytes=0-4"}, ""),
+                ({"status": "308", "range": "bytes=0-14"}, ""),
+                ({"status": "200"}, '{"file": {"name": "files/abc"}}'),
+            ],
+            source=iter([b"0123456789", b"0123456789"]),
+            mime_type="text/plain",
+        )
+
+        self.assertEqual("files/abc", file.name)
+        self.assertEqual(
+            ["bytes 0-9/20", "bytes 5-14/20", "bytes 15-19/20"],
+            [headers["Content-Range"] for _, _, _, headers in requests[1:]],
+        )
+
+
+class DiscoveryTests(absltest.TestCase):
+    """Loads the discovery document from memory, the disk cache, the API or the bundled copy."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for patcher in [
+            mock.patch.dict(os.environ, {"GOOGLE_GENERATIVEAI_CACHE_DIR": tmp.name}),
+            mock.patch.dict(client_lib._discovery_docs, clear=True),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.cache_path = client_lib._discovery_cache_path("v1beta")
+
+    def load(self, responses):
+        http = googleapiclient.http.HttpMockSequence(responses)
+        return client_lib._load_discovery_doc("v1beta", "key", http), http.request_sequence
+
+    def test_fetched_once(self):
+        doc, requests = self.load([({"status": "200"}, '{"fetched": true}')])
+        self.assertEqual('{"fetched": true}', doc)
+        self.assertLen(requests, 1)
+        self.assertEqual(doc, self.cache_path.read_text())
+
+        # Later clients, and processes, don't fetch it again.
+        self.assertEqual((doc, []), self.load([]))
+        client_lib._discovery_docs.clear()
+        self.assertEqual((doc, []), self.load([]))
+
+    def test_stale_cache_is_refreshed(self):
+        self.cache_path.parent.mkdir(parents=True)
+        self.cache_path.write_text('{"stale": true}')
+        old = time.time() - client_lib.DISCOVERY_CACHE_TTL - 1
+        os.utime(self.cache_path, (old, old))
+
+        doc, _ = self.load([({"status": "200"}, '{"fetched": true}')])
+        self.assertEqual('{"fetched": true}', doc)
+
+        # If the API can't be reached, the stale copy is better than nothing.
+        client_lib._discovery_docs.clear()
+        os.utime(self.cache_path, (old, old))
+        doc, _ = self.load([({"status": "503"}, "unavailable")])
+        self.assertEqual('{"fetched": true}', doc)
+
+    def test_bundled_fallback(self):
+        doc, _ = self.load([({"status": "503"}, "unavailable")])
+
+        api = googleapiclient.discovery.build_from_document(doc, developerKey="key")
+        request = api.media().upload(
+            body={"file": {}},
+            media_body=googleapiclient.http.MediaIoBaseUpload(
+                io.BytesIO(b"data"), mimetype="text/plain", resumable=True
+            ),
+        )
+        self.assertStartsWith(request.uri, client_lib.GENAI_API_UPLOAD_URL)
+
+
+class ProcessingFileClient:
+    """Reports each file as `PROCESSING` the first `polls[name]` times it's looked up."""
+
+    def __init__(self, polls, failed=(), listed=True):
+        self.polls = dict(polls)
+        self.failed = set(failed)
+        self.listed = listed
+        self.calls = []
+
+    def look_up(self, name):
+        self.polls[name] -= 1
+        if self.polls[name] >= 0:
+            return protos.File(name=name, state=protos.File.State.PROCESSING)
+        elif name in self.failed:
+            return protos.File(
+                name=name, state=protos.File.State.FAILED, error={"message": "corrupt video"}
+            )
+        return protos.File(name=name, state=protos.File.State.ACTIVE)
+
+    def get_file(self, name, **kwargs):
+        self.calls.append(name)
+        return self.look_up(name)
+
+    def list_files(self, request, **kwargs):
+        self.calls.append("list")
+        if not self.listed:
+            return types.SimpleNamespace(files=[protos.File(name="files/other")])
+        return types.SimpleNamespace(files=[self.look_up(name) for name in self.polls])
+
+
+class WaitForActiveTests(parameterized.TestCase):
+    def setUp(self):
+        self.sleep = mock.Mock()
+        for patcher in [
+            mock.patch.object(files, "_sleep", self.sleep),
+            mock.patch.object(files, "_jitter", lambda low, high: high),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(genai.configure)
+
+    def wait(self, client, names, **kwargs):
+        client_lib._client_manager.clients["file"] = client
+        return [(f.name, f.state.name) for f in genai.wait_for_active(names, **kwargs)]
+
+    def test_list_replaces_get_file(self):
+        client = ProcessingFileClient(
+            {"files/a": 2, "files/b": 0, "files/c": 1}, failed=["files/c"]
+        )
+
+        results = self.wait(client, ["a", "files/b", "c"])
+
+        # In the order they became ready.
+        self.assertEqual(
+            [("files/b", "ACTIVE"), ("files/c", "FAILED"), ("files/a", "ACTIVE")], results
+        )
+        # Once only one file is left, it's looked up directly.
+        self.assertEqual(["list", "list", "files/a"], client.calls)
+        # Exponential backoff.
+        self.assertEqual([mock.call(1.0), mock.call(2.0)], self.sleep.call_args_list)
+
+    def test_unlisted_files_are_looked_up(self):
+        client = ProcessingFileClient({"files/a": 1, "files/b": 0}, listed=False)
+
+        results = self.wait(client, ["a", "b"])
+
+        self.assertEqual([("files/b", "ACTIVE"), ("files/a", "ACTIVE")], results)
+        # Listing is given up once the files aren't on the first page.
+        self.assertEqual("list", client.calls[0])
+        self.assertNotIn("list", client.calls[1:])
+
+    def test_processed_files_are_not_polled(self):
+        client = ProcessingFileClient({})
+        file = protos.File(name="files/a", state=protos.File.State.ACTIVE)
+
+        self.assertEqual([("files/a", "ACTIVE")], self.wait(client, [file]))
+        self.assertEmpty(client.calls)
+
+    def test_timeout(self):
+        client = ProcessingFileClient({"files/a": 100})
+        with self.assertRaisesRegex(TimeoutError, "files/a"):
+            self.wait(client, ["a"], timeout=0)
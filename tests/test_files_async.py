@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import google.api_core.exceptions
+import google.generativeai as genai
+from google.generativeai import client as client_lib
+from google.generativeai import files
+from google.generativeai import protos
+
+
+class FakeResponse:
+    def __init__(self, status=200, headers=None, body=None):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def text(self):
+        return json.dumps(self.body)
+
+    async def json(self):
+        return self.body
+
+
+class FakeUploadServer:
+    """Answers the resumable upload protocol, failing the upload requests in `failures`."""
+
+    def __init__(self, failures=()):
+        self.failures = set(failures)
+        self.received = bytearray()
+        self.requests = []
+        self.metadata = None
+        self.upload_url = None
+
+    def ClientSession(self, headers=None):
+        assert headers == {"x-goog-api-key": "key"}
+        return FakeSession(self)
+
+    def post(self, url, *, headers, json=None, data=None):
+        command = headers["X-Goog-Upload-Command"]
+        self.requests.append(command)
+        if command == "start":
+            self.upload_url = url
+            self.metadata = (json, headers)
+            return FakeResponse(
+                headers={
+                    "X-Goog-Upload-URL": "https://example.com/upload/1",
+                    "X-Goog-Upload-Chunk-Granularity": "4",
+                }
+            )
+        elif command == "query":
+            return FakeResponse(headers={"X-Goog-Upload-Size-Received": str(len(self.received))})
+
+        if len(self.requests) in self.failures:
+            return FakeResponse(status=503, body={"error": "unavailable"})
+        assert int(headers["X-Goog-Upload-Offset"]) == len(self.received)
+        self.received += data
+        if command == "upload, finalize":
+            return FakeResponse(body={"file": {"name": "files/abc"}})
+        return FakeResponse()
+
+
+class FakeSession:
+    def __init__(self, server):
+        self.server = server
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def post(self, url, **kwargs):
+        return self.server.post(url, **kwargs)
+
+
+class FileServiceAsyncClient(client_lib.FileServiceAsyncClient):
+    async def get_file(self, request, **kwargs):
+        return protos.File(name=request["name"], uri="https://example.com/files/abc")
+
+
+class AsyncTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"0123456789" * 3)
+        self.addCleanup(os.remove, self.path)
+
+        for patcher in [
+            mock.patch.object(client_lib, "_sleep_async", mock.AsyncMock()),
+            # Small enough for the chunk sizes of these tests.
+            mock.patch.object(files, "_CHUNK_GRANULARITY", 2),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def patch_server(self, server):
+        fake_aiohttp = types.SimpleNamespace(
+            ClientSession=server.ClientSession, ClientError=OSError
+        )
+        patcher = mock.patch.object(client_lib, "aiohttp", fake_aiohttp)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def upload(self, source=None, *, client_options=None, **kwargs):
+        client = FileServiceAsyncClient(client_options={"api_key": "key", **(client_options or {})})
+        client_lib._client_manager.clients["file_async"] = client
+        self.addCleanup(genai.configure)
+        return await genai.upload_file_async(source or self.path, **kwargs)
+
+    async def test_chunked_upload(self):
+        server = FakeUploadServer()
+        self.patch_server(server)
+
+        file = await self.upload(display_name="numbers", chunk_size=10)
+
+        self.assertEqual("files/abc", file.name)
+        self.assertEqual(b"0123456789" * 3, server.received)
+        # The chunk size is rounded down to the granularity.
+        self.assertEqual(["start"] + ["upload"] * 3 + ["upload, finalize"], server.requests)
+        metadata, headers = server.metadata
+        self.assertEqual({"file": {"displayName": "numbers"}}, metadata)
+        self.assertEqual("application/pdf", headers["X-Goog-Upload-Header-Content-Type"])
+        self.assertEqual("30", headers["X-Goog-Upload-Header-Content-Length"])
+        self.assertEqual(client_lib.GENAI_API_UPLOAD_URL, server.upload_url)
+
+    @parameterized.named_parameters(
+        ["host", "custom.example.com"],
+        ["url", "https://custom.example.com/"],
+    )
+    async def test_custom_endpoint(self, api_endpoint):
+        server = FakeUploadServer()
+        self.patch_server(server)
+
+        await self.upload(client_options={"api_endpoint": api_endpoint})
+
+        self.assertEqual("https://custom.example.com/upload/v1beta/files", server.upload_url)
+
+    async def test_resumes_after_a_transient_error(self):
+        server = FakeUploadServer(failures=[3])
+        self.patch_server(server)
+
+        await self.upload(chunk_size=16)
+
+        self.assertEqual(b"0123456789" * 3, server.received)
+        self.assertEqual(
+            ["start", "upload", "upload, finalize", "query", "upload, finalize"], server.requests
+        )
+
+    async def test_gives_up(self):
+        server = FakeUploadServer(failures=range(2, 100))
+        self.patch_server(server)
+
+        with self.assertRaises(google.api_core.exceptions.ServiceUnavailable):
+            await self.upload()
+
+    async def test_not_resumable(self):
+        server = FakeUploadServer()
+        self.patch_server(server)
+
+        await self.upload(resumable=False, chunk_size=4)
+
+        self.assertEqual(["start", "upload, finalize"], server.requests)
+
+    async def test_iterator_upload(self):
+        server = FakeUploadServer()
+        self.patch_server(server)
+
+        chunks = iter([b"0123", b"456789012345678", b"901234567890123456789"])
+        await self.upload(chunks, mime_type="text/plain", chunk_size=8)
+
+        self.assertEqual(b"0123456789" * 4, server.received)
+        # The size is a multiple of the chunk size, the last chunk still finalizes the upload.
+        self.assertEqual(["start"] + ["upload"] * 4 + ["upload, finalize"], server.requests)
+        _, headers = server.metadata
+        self.assertNotIn("X-Goog-Upload-Header-Content-Length", headers)
+
+    async def test_invalid_chunk_size(self):
+        with self.assertRaisesRegex(ValueError, "chunk_size"):
+            await self.upload(chunk_size=3)
+
+    async def test_without_aiohttp(self):
+        client = FileServiceAsyncClient(client_options={"api_key": "async-key"})
+        client_lib._client_manager.clients["file_async"] = client
+        self.addCleanup(genai.configure)
+
+        with mock.patch.object(client_lib, "aiohttp", None), mock.patch.object(
+            client_lib.FileServiceClient, "create_file", autospec=True
+        ) as create_file:
+            create_file.return_value = protos.File(name="files/abc")
+            file = await genai.upload_file_async(self.path, chunk_size=8)
+
+        self.assertEqual("files/abc", file.name)
+        # The upload runs on a synchronous client with the same config, not the default one.
+        sync_client = create_file.call_args.args[0]
+        self.assertEqual("async-key", sync_client._client_options.api_key)
+        self.assertEqual(8, create_file.call_args.kwargs["chunk_size"])
+
+    async def test_wait_for_active(self):
+        client = FileServiceAsyncClient(client_options={"api_key": "key"})
+        states = {"files/a": ["PROCESSING", "ACTIVE"], "files/b": ["PROCESSING", "FAILED"]}
+
+        async def get_file(name, **kwargs):
+            return protos.File(name=name, state=states[name].pop(0))
+
+        async def list_files(request, **kwargs):
+            return types.SimpleNamespace(files=[await get_file(name) for name in states])
+
+        client.get_file = get_file
+        client.list_files = list_files
+        client_lib._client_manager.clients["file_async"] = client
+        self.addCleanup(genai.configure)
+        sleep = mock.AsyncMock()
+        with mock.patch.object(files, "_sleep_async", sleep):
+            results = [
+                (file.name, file.state.name)
+                async for file in genai.wait_for_active_async(["a", "files/b"])
+            ]
+
+        self.assertEqual([("files/a", "ACTIVE"), ("files/b", "FAILED")], results)
+        sleep.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    absltest.main()
@@ -521,6 +521,17 @@ class UnitTests(parameterized.TestCase):
             type(response._result).to_dict(response._result),
         )
 
+    def test_stream_accumulation_leaves_chunks_unchanged(self):
+        chunks = [
+            protos.GenerateContentResponse({"candidates": [{"content": {"parts": [{"text": a}]}}]})
+            for a in "abc"
+        ]
+        response = generation_types.GenerateContentResponse.from_iterator(iter(chunks))
+        self.assertEqual(list("abc"), [chunk.text for chunk in response])
+
+        self.assertEqual("abc", response.text)
+        self.assertEqual("a", chunks[0].candidates[0].content.parts[0].text)
+
     def test_generate_content_response_multiple_iterators(self):
         chunks = [
             protos.GenerateContentResponse({"candidates": [{"content": {"parts": [{"text": a}]}}]})
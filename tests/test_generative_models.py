@@ -1,9 +1,12 @@
+import asyncio
 import collections
 from collections.abc import Iterable
 import copy
 import datetime
 import pathlib
+import pickle
 import textwrap
+from unittest import mock
 from absl.testing import absltest
 from absl.testing import parameterized
 from google.generativeai import protos
@@ -526,6 +529,17 @@ class CUJTests(parameterized.TestCase):
 
         self.assertEqual(self.observed_requests[-1].contents[0].parts[0].text, "Goodbye")
 
+    def test_model_can_be_copied_and_pickled(self):
+        model = generative_models.GenerativeModel("gemini-1.5-flash", system_instruction="Be brief")
+        for copied in [copy.deepcopy(model), pickle.loads(pickle.dumps(model))]:
+            self.assertEqual(model.model_name, copied.model_name)
+            self.assertEqual(model._system_instruction, copied._system_instruction)
+
+        # Async clients belong to their event loop, copies don't share them.
+        model._async_client = "client"
+        self.assertIsNone(copy.deepcopy(model)._async_client)
+        self.assertEqual("client", model._async_client)
+
     def test_copy_history(self):
         self.responses["generate_content"] = [
             simple_response("first"),
@@ -851,6 +865,44 @@ class CUJTests(parameterized.TestCase):
             {"total_tokens": 7},
         )
 
+    def test_estimate_request_size(self):
+        model = generative_models.GenerativeModel(
+            "gemini-1.5-flash", system_instruction="You are a cat", tools=[noop]
+        )
+        contents = ["Describe this", {"mime_type": "image/png", "data": b"png" * 1000}]
+        size = model.estimate_request_size(contents, generation_config={"temperature": 0.5})
+
+        request = model._prepare_request(
+            contents=contents, generation_config={"temperature": 0.5}, tools=None, tool_config=None
+        )
+        self.assertEqual(type(request).pb(request).ByteSize(), size)
+
+    def test_request_size_limit(self):
+        self.responses["generate_content"].append(simple_response("world!"))
+        model = generative_models.GenerativeModel("gemini-1.5-flash")
+        contents = ["Describe this", {"mime_type": "image/png", "data": b"png" * 1000}]
+
+        with mock.patch.object(content_types, "MAX_REQUEST_BYTES", 1000):
+            with self.assertRaisesRegex(ValueError, "3000 bytes of image/png, in part 1"):
+                model.generate_content(contents)
+            self.assertEmpty(self.observed_requests)
+
+            # Offline estimates aren't sent, so they aren't limited.
+            model.estimate_tokens(contents)
+
+        model.generate_content(contents)
+        self.assertLen(self.observed_requests, 1)
+
+    def test_request_size_limit_with_file_offload(self):
+        model = generative_models.GenerativeModel("gemini-1.5-flash", file_offload=True)
+        contents = ["Describe this", {"mime_type": "image/png", "data": b"png" * 1000}]
+
+        # `count_tokens` sends the blobs inline, only `generate_content` offloads them.
+        with mock.patch.object(content_types, "MAX_REQUEST_BYTES", 1000):
+            with self.assertRaisesRegex(ValueError, "3000 bytes of image/png"):
+                model.count_tokens(contents)
+        self.assertEmpty(self.observed_requests)
+
     def test_repr_for_unary_non_streamed_response(self):
         model = generative_models.GenerativeModel(model_name="gemini-pro")
         self.responses["generate_content"].append(simple_response("world!"))
@@ -1283,6 +1335,27 @@ class CUJTests(parameterized.TestCase):
         request_options["retry"] = None
         self.assertEqual(request_options, self.observed_kwargs[0])
 
+    def test_async_client_per_event_loop(self):
+        model = generative_models.GenerativeModel("gemini-pro")
+
+        async def set_client(value):
+            model._async_client = value
+            return model._async_client
+
+        loop_1 = asyncio.new_event_loop()
+        loop_2 = asyncio.new_event_loop()
+        self.assertEqual("client-1", loop_1.run_until_complete(set_client("client-1")))
+        self.assertEqual("client-2", loop_2.run_until_complete(set_client("client-2")))
+
+        async def get_client():
+            return model._async_client
+
+        self.assertEqual("client-1", loop_1.run_until_complete(get_client()))
+        self.assertIsNone(model._async_client)
+
+        loop_1.close()
+        loop_2.close()
+
 
 if __name__ == "__main__":
     absltest.main()
@@ -21,10 +21,13 @@ from typing import Any
 import unittest
 
 
+import google.api_core.exceptions
+from google.generativeai import circuit_breaker
 from google.generativeai import client as client_lib
 from google.generativeai import generative_models
 from google.generativeai.types import content_types
 from google.generativeai import protos
+from google.generativeai import token_estimation
 
 from absl.testing import absltest
 from absl.testing import parameterized
@@ -221,6 +224,30 @@ class AsyncTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
             {"total_tokens": 7},
         )
 
+    async def test_fallback_while_circuit_breaker_is_open(self):
+        client_lib.configure(circuit_breakers=dict(failure_threshold=1))
+        self.addCleanup(client_lib.configure)
+        client_lib._client_manager.clients["generative_async"] = self.client
+
+        async def generate_content(request, **kwargs):
+            self.observed_requests.append(request)
+            if request.model == "models/gemini-flash":
+                raise google.api_core.exceptions.ServiceUnavailable("down")
+            return simple_response(request.model)
+
+        self.client.generate_content = generate_content
+
+        model = generative_models.GenerativeModel("gemini-flash", fallback_models=["gemini-pro"])
+        with self.assertRaises(google.api_core.exceptions.ServiceUnavailable):
+            await model.generate_content_async("Hello")
+        self.assertEqual(
+            circuit_breaker.State.OPEN,
+            client_lib.get_default_circuit_breaker("gemini-flash").state,
+        )
+
+        response = await model.generate_content_async("Hello")
+        self.assertEqual("models/gemini-pro", response.text)
+
     async def test_stream_generate_content_called_with_request_options(self):
         self.client.stream_generate_content = unittest.mock.AsyncMock()
         request = unittest.mock.ANY
@@ -251,6 +278,22 @@ class AsyncTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
 
         self.client.generate_content.assert_called_once_with(request, **request_options)
 
+    async def test_count_tokens_many(self):
+        self.responses["count_tokens"] = [
+            protos.CountTokensResponse(total_tokens=n) for n in [3, 5]
+        ]
+        model = generative_models.GenerativeModel("gemini-1.5-flash")
+
+        with unittest.mock.patch.object(
+            token_estimation, "count_cache", token_estimation.TokenCountCache()
+        ):
+            responses = await model.count_tokens_many_async(
+                ["Hello", "Goodbye", "Hello"], max_concurrency=1
+            )
+
+        self.assertEqual([3, 5, 3], [r.total_tokens for r in responses])
+        self.assertLen(self.observed_requests, 2)
+
     async def test_count_tokens_called_with_request_options(self):
         self.client.count_tokens = unittest.mock.AsyncMock()
         request = unittest.mock.ANY
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import concurrent.futures
+import threading
+import time
+import unittest
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import google.api_core.exceptions
+import google.generativeai as genai
+from google.generativeai import client as client_lib
+from google.generativeai import generative_models
+from google.generativeai import hedging
+from google.generativeai import protos
+from google.generativeai.types import helper_types
+
+from tests import fakes_test_helper
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class MockGenerativeServiceClient:
+    """Each call runs the next function in `self.calls`."""
+
+    calls = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def generate_content(self, request, **kwargs):
+        return self.calls.pop(0)()
+
+    def stream_generate_content(self, request, **kwargs):
+        return self.calls.pop(0)()
+
+    def generate_answer(self, request, **kwargs):
+        return self.calls.pop(0)()
+
+
+class UnitTests(parameterized.TestCase):
+    def setUp(self):
+        self.slow = threading.Event()
+        self.addCleanup(self.slow.set)
+
+        genai.configure(api_key="key")
+        self.addCleanup(genai.configure)
+        with mock.patch.object(
+            client_lib.glm, "GenerativeServiceClient", MockGenerativeServiceClient
+        ):
+            self.client = client_lib._client_manager.make_client("generative")
+        MockGenerativeServiceClient.calls = []
+
+    def slow_call(self, result):
+        def call():
+            self.slow.wait()
+            return result
+
+        return call
+
+    def generate(self, policy):
+        return self.client.generate_content(
+            protos.GenerateContentRequest(),
+            **helper_types.RequestOptions(hedging=policy),
+        )
+
+    def test_fast_call_is_not_hedged(self):
+        policy = hedging.HedgingPolicy(delay=10.0, max_extra_fraction=1.0)
+        MockGenerativeServiceClient.calls = [lambda: "fast"]
+
+        self.assertEqual("fast", self.generate(policy))
+        self.assertEqual(0, policy.hedges)
+
+    def test_slow_call_is_hedged(self):
+        policy = hedging.HedgingPolicy(delay=0.01, max_extra_fraction=1.0)
+        MockGenerativeServiceClient.calls = [self.slow_call("slow"), lambda: "hedge"]
+
+        self.assertEqual("hedge", self.generate(policy))
+        self.assertEqual(1, policy.hedges)
+        self.assertEqual(1, policy.hedge_wins)
+
+    def test_extra_traffic_is_capped(self):
+        policy = hedging.HedgingPolicy(delay=0.01, max_extra_fraction=0.5)
+
+        # The first call only earns half a duplicate.
+        self.slow.set()
+        MockGenerativeServiceClient.calls = [self.slow_call("first")]
+        self.assertEqual("first", self.generate(policy))
+        self.assertEqual(0, policy.hedges)
+
+        self.slow.clear()
+        MockGenerativeServiceClient.calls = [self.slow_call("slow"), lambda: "hedge"]
+        self.assertEqual("hedge", self.generate(policy))
+        self.assertEqual(1, policy.hedges)
+        self.assertEqual(2, policy.calls)
+
+    def test_errors_are_not_hedged(self):
+        policy = hedging.HedgingPolicy(delay=10.0, max_extra_fraction=1.0)
+
+        def fail():
+            raise google.api_core.exceptions.InvalidArgument("bad")
+
+        MockGenerativeServiceClient.calls = [fail, lambda: "unused"]
+        with self.assertRaises(google.api_core.exceptions.InvalidArgument):
+            self.generate(policy)
+        self.assertEqual(0, policy.hedges)
+
+    def test_failed_primary_waits_for_hedge(self):
+        policy = hedging.HedgingPolicy(delay=0.01, max_extra_fraction=1.0)
+
+        def fail_slowly():
+            self.slow.wait()
+            raise google.api_core.exceptions.InternalServerError("oops")
+
+        def hedge():
+            self.slow.set()
+            return "hedge"
+
+        MockGenerativeServiceClient.calls = [fail_slowly, hedge]
+        self.assertEqual("hedge", self.generate(policy))
+
+    def test_stream_waits_for_first_chunk(self):
+        policy = hedging.HedgingPolicy(delay=0.01, max_extra_fraction=1.0)
+
+        def slow_chunks():
+            self.slow.wait()
+            yield "never"
+
+        slow_stream = FakeStream(slow_chunks())
+        MockGenerativeServiceClient.calls = [lambda: slow_stream, lambda: FakeStream(["a", "b"])]
+
+        stream = self.client.stream_generate_content(
+            protos.GenerateContentRequest(), hedging=policy
+        )
+        self.assertEqual(["a", "b"], list(stream))
+        self.assertEqual(1, policy.hedge_wins)
+
+        # Once the losing stream produces its first chunk it's cancelled.
+        self.slow.set()
+        for _ in range(100):
+            if slow_stream.cancelled:
+                break
+            time.sleep(0.01)
+        self.assertTrue(slow_stream.cancelled)
+
+    def test_queued_call_is_not_hedged(self):
+        policy = hedging.HedgingPolicy(delay=0.01, max_extra_fraction=1.0)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+
+        with mock.patch.object(hedging, "_executor", executor):
+            # Every thread is busy for longer than the delay.
+            executor.submit(self.slow.wait)
+            threading.Timer(0.1, self.slow.set).start()
+            result = hedging.hedge(policy, lambda: "primary", False, (), {})
+
+        self.assertEqual("primary", result)
+        self.assertEqual(0, policy.hedges)
+
+    def test_percentile_delay(self):
+        policy = hedging.HedgingPolicy(percentile=90, delay=5.0)
+        self.assertEqual(5.0, policy.delay())
+
+        for i in range(1, 21):
+            policy._latencies.append(float(i))
+        self.assertEqual(18.0, policy.delay())
+
+    def test_only_idempotent_calls_are_hedged(self):
+        policy = hedging.HedgingPolicy(delay=1.0)
+        with self.assertRaisesRegex(ValueError, "isn't supported for `generate_answer`"):
+            self.client.generate_answer(protos.GenerateAnswerRequest(), hedging=policy)
+
+    def test_request_options(self):
+        self.assertEqual(["retry", "timeout"], list(helper_types.RequestOptions(timeout=1)))
+
+        policy = hedging.HedgingPolicy(delay=1.0)
+        options = helper_types.RequestOptions(hedging=policy)
+        self.assertEqual(["retry", "timeout", "hedging"], list(options))
+        self.assertIs(policy, dict(options)["hedging"])
+
+        with self.assertRaises(TypeError):
+            helper_types.RequestOptions(hedging={"delay": 1.0})
+
+    @parameterized.named_parameters(
+        ["nothing", dict()],
+        ["negative_delay", dict(delay=-1)],
+        ["percentile", dict(percentile=100)],
+        ["fraction", dict(delay=1, max_extra_fraction=0)],
+    )
+    def test_invalid_policy(self, kwargs):
+        with self.assertRaisesRegex(ValueError, "Invalid configuration"):
+            hedging.HedgingPolicy(**kwargs)
+
+    def test_not_allowed_with_automatic_function_calling(self):
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        model = generative_models.GenerativeModel("gemini-pro", tools=[add])
+        chat = model.start_chat(enable_automatic_function_calling=True)
+        with self.assertRaisesRegex(ValueError, "hedging"):
+            chat.send_message("hi", request_options={"hedging": hedging.HedgingPolicy(delay=1.0)})
+
+
+class AsyncTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
+    async def test_slow_call_is_cancelled(self):
+        policy = hedging.HedgingPolicy(delay=0.01, max_extra_fraction=1.0)
+        slow_cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                slow_cancelled.set()
+                raise
+
+        async def fast():
+            return "hedge"
+
+        calls = [slow, fast]
+
+        def call(request):
+            return calls.pop(0)()
+
+        result = await hedging.hedge_async(policy, call, False, (None,), {})
+        self.assertEqual("hedge", result)
+        await asyncio.wait_for(slow_cancelled.wait(), 1)
+        self.assertEqual(1, policy.hedge_wins)
+
+    async def test_async_iterable_stream(self):
+        policy = hedging.HedgingPolicy(delay=10, max_extra_fraction=1.0)
+
+        async def call(request):
+            return fakes_test_helper.AsyncIterableStream(["a", "b"])
+
+        stream = await hedging.hedge_async(policy, call, True, (None,), {})
+        self.assertEqual(["a", "b"], [chunk async for chunk in stream])
+
+
+if __name__ == "__main__":
+    absltest.main()
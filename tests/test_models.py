@@ -160,6 +160,25 @@ class UnitTests(parameterized.TestCase):
         else:
             self.assertIsInstance(model, model_types.TunedModel)
 
+    @parameterized.named_parameters(
+        ["base", "models/fake-bison-001", protos.Model],
+        ["tuned", "tunedModels/my-pig-001", protos.TunedModel],
+    )
+    def test_get_model_raw(self, name, expected_type):
+        self.responses = {
+            "get_model": protos.Model(name="models/fake-bison-001"),
+            "get_tuned_model": protos.TunedModel(name="tunedModels/my-pig-001"),
+        }
+
+        model = models.get_model(name, raw=True)
+        self.assertIsInstance(model, expected_type)
+        self.assertEqual(name, model.name)
+
+    def test_list_models_raw(self):
+        self.responses = {"list_models": [protos.Model(name="models/fake-bison-001")]}
+        (model,) = models.list_models(raw=True)
+        self.assertIsInstance(model, protos.Model)
+
     def test_max_temperature(self):
         name = "models/fake-bison-001"
         max_temperature = 3.0
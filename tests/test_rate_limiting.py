@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+import unittest
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import google.generativeai as genai
+from google.generativeai import client as client_lib
+from google.generativeai import embedding
+from google.generativeai import generative_models
+from google.generativeai import protos
+from google.generativeai import rate_limiting
+
+from tests import fakes_test_helper
+
+
+class MockGenerativeServiceClient:
+    def __init__(self):
+        self.observed_requests = []
+        self.responses = collections.defaultdict(list)
+
+    def generate_content(self, request, **kwargs):
+        self.observed_requests.append(request)
+        return self.responses["generate_content"].pop(0)
+
+    def stream_generate_content(self, request, **kwargs):
+        self.observed_requests.append(request)
+        return iter(self.responses["stream_generate_content"].pop(0))
+
+    def count_tokens(self, request, **kwargs):
+        self.observed_requests.append(request)
+        return protos.CountTokensResponse(total_tokens=7)
+
+    def embed_content(self, request, **kwargs):
+        self.observed_requests.append(request)
+        return protos.EmbedContentResponse(embedding=protos.ContentEmbedding(values=[1.0]))
+
+
+def response_with_usage(prompt_token_count):
+    return protos.GenerateContentResponse(
+        candidates=[{"content": {"parts": [{"text": "hi"}]}}],
+        usage_metadata={"prompt_token_count": prompt_token_count},
+    )
+
+
+class UnitTests(parameterized.TestCase):
+    def setUp(self):
+        self.clock = fakes_test_helper.FakeClock()
+        patcher = mock.patch.object(rate_limiting, "_sleep", self.clock.sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = MockGenerativeServiceClient()
+        client_lib._client_manager.clients["generative"] = self.client
+        client_lib._client_manager.rate_limiters = {}
+        self.addCleanup(setattr, client_lib._client_manager, "rate_limiters", {})
+
+    def test_requests_per_minute(self):
+        limiter = rate_limiting.RateLimiter(requests_per_minute=2, clock=self.clock)
+
+        limiter.acquire()
+        limiter.acquire()
+        self.assertEqual([], self.clock.sleeps)
+
+        # The bucket refills at 2 per minute, so the next call waits 30s.
+        limiter.acquire()
+        self.assertEqual([30.0], self.clock.sleeps)
+
+    def test_tokens_per_minute(self):
+        limiter = rate_limiting.RateLimiter(tokens_per_minute=600, clock=self.clock)
+
+        limiter.acquire(500)
+        limiter.acquire(200)
+        self.assertEqual([10.0], self.clock.sleeps)
+
+    def test_oversize_request_waits_for_a_full_bucket(self):
+        limiter = rate_limiting.RateLimiter(tokens_per_minute=60, clock=self.clock)
+
+        limiter.acquire(30)
+        limiter.acquire(1000)
+        self.assertEqual([30.0], self.clock.sleeps)
+
+    def test_correct(self):
+        limiter = rate_limiting.RateLimiter(tokens_per_minute=600, clock=self.clock)
+
+        limiter.acquire(100)
+        # The call actually used 400 tokens, the difference is taken from the bucket.
+        limiter.correct(100, 400)
+        limiter.acquire(200)
+        self.assertEqual([], self.clock.sleeps)
+        limiter.acquire(60)
+        self.assertEqual([6.0], self.clock.sleeps)
+
+    @parameterized.named_parameters(
+        ["rpm", dict(requests_per_minute=0)],
+        ["tpm", dict(tokens_per_minute=-1)],
+    )
+    def test_invalid_limits(self, kwargs):
+        with self.assertRaisesRegex(ValueError, "must be a positive number"):
+            rate_limiting.RateLimiter(**kwargs)
+
+    def test_estimate_tokens(self):
+        request = protos.GenerateContentRequest(
+            contents=[
+                {"parts": [{"text": "a" * 10}, {"inline_data": {"mime_type": "image/png"}}]},
+            ],
+            system_instruction={"parts": [{"text": "abcd"}]},
+        )
+        self.assertEqual(3 + 258 + 1, rate_limiting.estimate_tokens(request))
+        self.assertEqual(0, rate_limiting.estimate_tokens(protos.CountTokensRequest()))
+
+    def test_configure_rate_limits(self):
+        genai.configure(rate_limits={"gemini-pro": dict(requests_per_minute=1)})
+        self.addCleanup(genai.configure)
+        client_lib._client_manager.clients["generative"] = self.client
+
+        limiter = client_lib.get_default_rate_limiter("models/gemini-pro")
+        self.assertIsInstance(limiter, rate_limiting.RateLimiter)
+        self.assertIsNone(client_lib.get_default_rate_limiter("gemini-1.5-flash"))
+
+        model = generative_models.GenerativeModel("gemini-pro")
+        self.assertIs(limiter, model._get_rate_limiter())
+
+    def test_generate_content_is_limited_and_corrected(self):
+        limiter = rate_limiting.RateLimiter(
+            requests_per_minute=60, tokens_per_minute=60, clock=self.clock
+        )
+        model = generative_models.GenerativeModel("gemini-pro", rate_limiter=limiter)
+
+        self.client.responses["generate_content"] = [response_with_usage(40)] * 2
+        model.generate_content("a" * 8)
+        self.assertEqual([], self.clock.sleeps)
+
+        # The 2 token estimate was corrected to 40, leaving 20 tokens in the bucket.
+        model.generate_content("a" * 100)
+        self.assertEqual([5.0], self.clock.sleeps)
+
+    def test_stream_is_corrected_when_complete(self):
+        limiter = rate_limiting.RateLimiter(tokens_per_minute=60, clock=self.clock)
+        model = generative_models.GenerativeModel("gemini-pro", rate_limiter=limiter)
+
+        self.client.responses["stream_generate_content"] = [
+            [response_with_usage(0), response_with_usage(50)]
+        ]
+        response = model.generate_content("a" * 8, stream=True)
+        response.resolve()
+
+        limiter.acquire(20)
+        self.assertEqual([10.0], self.clock.sleeps)
+
+    def test_count_tokens_and_embed_content_are_limited(self):
+        limiter = rate_limiting.RateLimiter(requests_per_minute=1, clock=self.clock)
+        genai.configure(rate_limits={"gemini-pro": limiter})
+        self.addCleanup(genai.configure)
+        client_lib._client_manager.clients["generative"] = self.client
+
+        model = generative_models.GenerativeModel("gemini-pro")
+        model.count_tokens("hello")
+        embedding.embed_content(model="models/gemini-pro", content="hello")
+        self.assertEqual([60.0], self.clock.sleeps)
+
+
+class AsyncTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
+    async def test_acquire_async(self):
+        clock = fakes_test_helper.FakeClock()
+        limiter = rate_limiting.RateLimiter(requests_per_minute=1, clock=clock)
+
+        with mock.patch.object(rate_limiting, "_sleep_async", clock.sleep_async):
+            await limiter.acquire_async()
+            await limiter.acquire_async()
+
+        self.assertEqual([60.0], clock.sleeps)
+
+
+if __name__ == "__main__":
+    absltest.main()
@@ -398,6 +398,12 @@ class UnitTests(parameterized.TestCase):
             ],
         )
 
+    def test_query_corpus_raw(self):
+        demo_corpus = retriever.create_corpus(name="demo-corpus")
+        q = demo_corpus.query(query="What kind of chunk is this?", raw=True)
+        self.assertIsInstance(q, protos.QueryCorpusResponse)
+        self.assertEqual(0.08, round(q.relevant_chunks[0].chunk_relevance_score, 2))
+
     def test_delete_corpus(self):
         demo_corpus = retriever.create_corpus(name="demo-corpus")
         demo_document = demo_corpus.create_document(name="demo-doc")
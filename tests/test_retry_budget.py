@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+from google.api_core import exceptions
+from google.api_core import retry
+from google.protobuf import duration_pb2
+from google.rpc import error_details_pb2
+
+import google.generativeai as genai
+from google.generativeai import client as client_lib
+from google.generativeai import retry_budget
+
+from tests import fakes_test_helper
+
+
+class FlakyFunction:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class UnitTests(parameterized.TestCase):
+    def setUp(self):
+        self.sleeps = []
+        for name, value in [("_sleep", self.sleeps.append), ("_jitter", lambda low, high: high)]:
+            patcher = mock.patch.object(retry_budget, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_budget_caps_retries(self):
+        clock = fakes_test_helper.FakeClock()
+        budget = retry_budget.RetryBudget(ratio=0.5, min_retries=1, window=10, clock=clock)
+
+        self.assertTrue(budget.try_retry())
+        self.assertFalse(budget.try_retry())
+
+        # Each success earns half a retry.
+        for _ in range(2):
+            budget.record_success()
+        self.assertTrue(budget.try_retry())
+        self.assertFalse(budget.try_retry())
+        self.assertEqual(2, budget.retries_attempted)
+        self.assertEqual(2, budget.retries_denied)
+
+        # Old retries leave the window.
+        clock.now = 10
+        self.assertTrue(budget.try_retry())
+
+    def test_budgeted_retry(self):
+        budget = retry_budget.RetryBudget(min_retries=10)
+        policy = retry_budget.with_budget(
+            retry.Retry(retry.if_transient_error, initial=1, multiplier=2, maximum=3), budget
+        )
+
+        f = FlakyFunction([exceptions.ServiceUnavailable("")] * 3)
+        self.assertEqual("ok", policy(f)())
+        self.assertEqual(4, f.calls)
+        # Full jitter draws from [0, backoff], the fake jitter always takes the maximum.
+        self.assertEqual([1, 2, 3], self.sleeps)
+        self.assertEqual(3, budget.retries_attempted)
+
+    def test_spent_budget_raises(self):
+        budget = retry_budget.RetryBudget(ratio=0, min_retries=1)
+        policy = retry_budget.with_budget(retry.Retry(retry.if_transient_error), budget)
+
+        f = FlakyFunction([exceptions.ServiceUnavailable("")] * 2)
+        with self.assertRaises(exceptions.ServiceUnavailable):
+            policy(f)()
+        self.assertEqual(2, f.calls)
+        self.assertEqual(1, budget.retries_denied)
+
+    def test_deadline_raises_retry_error(self):
+        budget = retry_budget.RetryBudget(min_retries=10)
+        policy = retry_budget.with_budget(
+            retry.Retry(retry.if_transient_error, initial=5, timeout=1), budget
+        )
+
+        error = exceptions.ServiceUnavailable("")
+        f = FlakyFunction([error])
+        with self.assertRaises(exceptions.RetryError) as cm:
+            policy(f)()
+        self.assertIs(error, cm.exception.cause)
+        self.assertEqual(1, f.calls)
+        self.assertEqual(0, budget.retries_attempted)
+
+    def test_other_errors_are_not_retried(self):
+        budget = retry_budget.RetryBudget()
+        policy = retry_budget.with_budget(retry.Retry(retry.if_transient_error), budget)
+
+        f = FlakyFunction([exceptions.InvalidArgument("")])
+        with self.assertRaises(exceptions.InvalidArgument):
+            policy(f)()
+        self.assertEqual(0, budget.retries_attempted)
+
+    def test_retry_after(self):
+        retry_info = error_details_pb2.RetryInfo(retry_delay=duration_pb2.Duration(seconds=7))
+        error = exceptions.ResourceExhausted("", details=[retry_info])
+        self.assertEqual(7, retry_budget.retry_after(error))
+
+        response = mock.Mock(headers={"Retry-After": "3"})
+        self.assertEqual(
+            3, retry_budget.retry_after(exceptions.TooManyRequests("", response=response))
+        )
+        self.assertIsNone(retry_budget.retry_after(exceptions.ServiceUnavailable("")))
+
+        budget = retry_budget.RetryBudget()
+        policy = retry_budget.with_budget(retry.Retry(retry.if_transient_error, initial=1), budget)
+        policy(FlakyFunction([error]))()
+        self.assertEqual([7], self.sleeps)
+
+    def test_only_retries_are_wrapped(self):
+        budget = retry_budget.RetryBudget()
+        self.assertIsNone(retry_budget.with_budget(None, budget))
+        self.assertIsInstance(
+            retry_budget.with_budget(retry.AsyncRetry(), budget), retry_budget.BudgetedRetry
+        )
+        plain = retry.Retry()
+        self.assertIs(plain, retry_budget.with_budget(plain, None))
+
+    def test_configure(self):
+        self.addCleanup(genai.configure)
+
+        genai.configure(api_key="key")
+        self.assertIsInstance(client_lib.get_default_retry_budget(), retry_budget.RetryBudget)
+
+        budget = retry_budget.RetryBudget()
+        genai.configure(api_key="key", retry_budget=budget)
+        self.assertIs(budget, client_lib.get_default_retry_budget())
+
+        genai.configure(api_key="key", retry_budget=False)
+        self.assertIsNone(client_lib.get_default_retry_budget())
+
+    def test_default_clients_use_the_budget(self):
+        self.addCleanup(genai.configure)
+        budget = retry_budget.RetryBudget()
+        genai.configure(api_key="key", retry_budget=budget)
+
+        generative_client = client_lib._client_manager.make_client("generative")
+        transport = generative_client.transport
+        default = transport._wrapped_methods[transport.generate_content]._retry
+        self.assertIsInstance(default, retry_budget.BudgetedRetry)
+
+        with mock.patch.object(transport, "_wrapped_methods") as methods:
+            generative_client.generate_content(
+                {"model": "models/gemini-pro"}, retry=retry.Retry(), timeout=1
+            )
+        rpc = methods.__getitem__.return_value
+        self.assertIsInstance(rpc.call_args.kwargs["retry"], retry_budget.BudgetedRetry)
+
+
+class AsyncTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
+    async def test_async_clients_use_the_budget(self):
+        self.addCleanup(genai.configure)
+        genai.configure(api_key="key", transport="grpc_asyncio")
+
+        async_client = client_lib._client_manager.make_client("generative_async")
+        transport = async_client.transport
+        default = transport._wrapped_methods[transport.generate_content]._retry
+        self.assertIsInstance(default, retry_budget.BudgetedRetry)
+        self.assertIsInstance(default.retry, retry.AsyncRetry)
+
+
+if __name__ == "__main__":
+    absltest.main()
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import unittest
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import google.api_core.exceptions
+import google.generativeai as genai
+from google.generativeai import client as client_lib
+from google.generativeai import generative_models
+from google.generativeai import protos
+from google.generativeai import scheduling
+from google.generativeai.types import helper_types
+
+from tests import fakes_test_helper
+
+
+class MockGenerativeServiceClient:
+    def __init__(self, **kwargs):
+        self.observed_kwargs = []
+
+    def generate_content(self, request, **kwargs):
+        self.observed_kwargs.append(kwargs)
+        return protos.GenerateContentResponse(
+            {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}
+        )
+
+
+class UnitTests(parameterized.TestCase):
+    def test_weighted_fair_queuing(self):
+        scheduler = scheduling.PriorityScheduler(
+            max_concurrency=1, weights={"interactive": 3, "batch": 1}, default_priority="batch"
+        )
+        scheduler.acquire()
+
+        started = []
+        for priority in ["batch"] * 4 + ["interactive"] * 6:
+            scheduler._enqueue(lambda p=priority: started.append(p), priority, None)
+        self.assertEqual({"interactive": 6, "batch": 4}, scheduler.queue_depths)
+
+        for _ in range(10):
+            scheduler.release()
+
+        # Three interactive calls start for each batch call, until the queues drain.
+        self.assertEqual(
+            ["interactive"] * 3 + ["batch"] + ["interactive"] * 3 + ["batch"] * 3, started
+        )
+        self.assertEqual(1, scheduler.in_flight)
+
+    def test_concurrency_ceiling(self):
+        scheduler = scheduling.PriorityScheduler(max_concurrency=2)
+        scheduler.acquire()
+        scheduler.acquire(priority="batch")
+        self.assertEqual(2, scheduler.in_flight)
+
+        started = []
+        scheduler._enqueue(lambda: started.append(True), "interactive", None)
+        self.assertEqual([], started)
+        scheduler.release()
+        self.assertEqual([True], started)
+        self.assertEqual(2, scheduler.in_flight)
+
+    def test_queued_call_expires(self):
+        scheduler = scheduling.PriorityScheduler(max_concurrency=1)
+        scheduler.acquire()
+
+        with self.assertRaises(google.api_core.exceptions.DeadlineExceeded):
+            scheduler.acquire(priority="interactive", timeout=0.01)
+        self.assertEqual(1, scheduler.expired)
+        self.assertEqual(0, sum(scheduler.queue_depths.values()))
+
+        # The expired call doesn't hold the slot when it's released.
+        scheduler.release()
+        self.assertEqual(0, scheduler.in_flight)
+
+    def test_unknown_priority(self):
+        scheduler = scheduling.PriorityScheduler()
+        with self.assertRaisesRegex(ValueError, "priority"):
+            scheduler.acquire(priority="urgent")
+
+    @parameterized.named_parameters(
+        ["concurrency", dict(max_concurrency=0)],
+        ["weights", dict(weights={"batch": 0})],
+        ["default_priority", dict(default_priority="urgent")],
+    )
+    def test_invalid_configuration(self, kwargs):
+        with self.assertRaisesRegex(ValueError, "Invalid configuration"):
+            scheduling.PriorityScheduler(**kwargs)
+
+    def test_request_options(self):
+        options = helper_types.RequestOptions(priority="batch")
+        self.assertEqual(["retry", "timeout", "priority"], list(options))
+        self.assertLen(options, 3)
+
+        with self.assertRaises(TypeError):
+            helper_types.RequestOptions(priority=1)
+
+
+class ClientTests(parameterized.TestCase):
+    def make_client(self, **kwargs):
+        genai.configure(api_key="key", **kwargs)
+        self.addCleanup(genai.configure)
+        with mock.patch.object(
+            client_lib.glm, "GenerativeServiceClient", MockGenerativeServiceClient
+        ):
+            return client_lib._client_manager.make_client("generative")
+
+    def test_priority_is_consumed(self):
+        scheduler = scheduling.PriorityScheduler()
+        generative_client = self.make_client(scheduler=scheduler)
+        client_lib._client_manager.clients["generative"] = generative_client
+
+        model = generative_models.GenerativeModel("gemini-pro")
+        response = model.generate_content(
+            "hello", request_options=helper_types.RequestOptions(priority="batch", timeout=10)
+        )
+
+        self.assertEqual("ok", response.text)
+        self.assertGreaterEqual(response.queue_wait, 0)
+        self.assertEqual(response.queue_wait, scheduling.last_queue_wait())
+
+        (kwargs,) = generative_client.observed_kwargs
+        self.assertNotIn("priority", kwargs)
+        self.assertLessEqual(kwargs["timeout"], 10)
+        self.assertEqual(0, scheduler.in_flight)
+
+    def test_priority_is_ignored_without_a_scheduler(self):
+        generative_client = self.make_client()
+        self.assertIsNone(client_lib.get_default_scheduler())
+
+        generative_client.generate_content(protos.GenerateContentRequest(), priority="batch")
+
+    def test_configure(self):
+        self.make_client(scheduler=True)
+        self.assertIsInstance(client_lib.get_default_scheduler(), scheduling.PriorityScheduler)
+
+
+class AsyncTests(parameterized.TestCase, unittest.IsolatedAsyncioTestCase):
+    async def test_interactive_calls_go_first(self):
+        scheduler = scheduling.PriorityScheduler(max_concurrency=1)
+        await scheduler.acquire_async()
+
+        started = []
+
+        async def call(priority):
+            await scheduler.acquire_async(priority)
+            started.append(priority)
+            scheduler.release()
+
+        tasks = [asyncio.create_task(call("batch")) for _ in range(2)]
+        tasks += [asyncio.create_task(call("interactive")) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.assertEqual({"interactive": 2, "default": 0, "batch": 2}, scheduler.queue_depths)
+
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        self.assertEqual(["interactive", "interactive", "batch", "batch"], started)
+
+    async def test_queued_call_expires(self):
+        scheduler = scheduling.PriorityScheduler(max_concurrency=1)
+        await scheduler.acquire_async()
+
+        with self.assertRaises(google.api_core.exceptions.DeadlineExceeded):
+            await scheduler.acquire_async(timeout=0.01)
+        self.assertEqual(1, scheduler.expired)
+
+    async def test_async_stream_holds_its_slot(self):
+        scheduler = scheduling.PriorityScheduler(max_concurrency=1)
+
+        async def stream_generate_content(request):
+            return fakes_test_helper.AsyncIterableStream([request, request])
+
+        call = client_lib._schedule(
+            scheduler, True, "stream_generate_content", stream_generate_content
+        )
+        stream = await call("chunk", priority="batch")
+        self.assertEqual(1, scheduler.in_flight)
+        self.assertEqual(["chunk", "chunk"], [chunk async for chunk in stream])
+        self.assertEqual(0, scheduler.in_flight)
+
+
+if __name__ == "__main__":
+    absltest.main()
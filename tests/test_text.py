@@ -221,6 +221,13 @@ class UnitTests(parameterized.TestCase):
             ],
         )
 
+    def test_generate_response_raw(self):
+        response = protos.GenerateTextResponse(candidates=[protos.TextCompletion(output=" road?")])
+        self.responses["generate_text"] = response
+
+        complete = text_service.generate_text(prompt="Why did the chicken cross the", raw=True)
+        self.assertEqual(response, complete)
+
     def test_stop_string(self):
         self.responses["generate_text"] = protos.GenerateTextResponse(
             candidates=[
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+from absl.testing import absltest
+from absl.testing import parameterized
+
+import google.api_core.exceptions
+import google.generativeai as genai
+from google.generativeai import client as client_lib
+from google.generativeai import generative_models
+from google.generativeai import protos
+from google.generativeai import token_estimation
+
+
+class MockGenerativeServiceClient:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+        self.count_requests = []
+
+    def count_tokens(self, request, **kwargs):
+        self.count_requests.append(request)
+        text = request.generate_content_request.contents[0].parts[0].text
+        if text == "fail":
+            raise google.api_core.exceptions.InvalidArgument("bad prompt")
+        return protos.CountTokensResponse(total_tokens=self.total_tokens)
+
+
+def request_for(*parts, model="models/gemini-pro"):
+    return protos.GenerateContentRequest(model=model, contents=[{"parts": list(parts)}])
+
+
+class UnitTests(parameterized.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(token_estimation._calibrations, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_documented_costs(self):
+        pdf = b"%PDF /Type /Pages /Type /Page /Type /Page"
+        request = request_for(
+            {"text": "a" * 10},
+            {"inline_data": {"mime_type": "image/jpeg", "data": b"jpeg"}},
+            {"inline_data": {"mime_type": "application/pdf", "data": pdf}},
+        )
+
+        estimate = token_estimation.estimate(request)
+        self.assertEqual(3 + 258 + 2 * 258, estimate.total_tokens)
+        self.assertEqual(token_estimation.UNCALIBRATED_ERROR, estimate.error)
+
+    @parameterized.named_parameters(
+        ["audio", {"inline_data": {"mime_type": "audio/mp3", "data": b"mp3"}}],
+        ["file", {"file_data": {"file_uri": "https://example.com/files/abc"}}],
+    )
+    def test_parts_without_a_bound(self, part):
+        estimate = token_estimation.estimate(request_for({"text": "hello"}, part))
+        self.assertIsNone(estimate.error)
+
+    def test_calibration(self):
+        text = "x" * 800
+        request = request_for({"text": text})
+        self.assertEqual(200, token_estimation.estimate(request).total_tokens)
+
+        # This model averages 8 characters per token.
+        for _ in range(5):
+            token_estimation.observe("models/gemini-pro", request, 100)
+
+        estimate = token_estimation.estimate(request)
+        self.assertEqual(100, estimate.total_tokens)
+        self.assertLess(estimate.error, token_estimation.UNCALIBRATED_ERROR)
+
+        # Other models aren't affected.
+        other = token_estimation.estimate(request_for({"text": text}, model="models/other"))
+        self.assertEqual(200, other.total_tokens)
+
+    def test_count_cache_is_lru(self):
+        cache = token_estimation.TokenCountCache(maxsize=2)
+        for key, tokens in [(b"a", 1), (b"b", 2)]:
+            cache.put(key, protos.CountTokensResponse(total_tokens=tokens))
+
+        self.assertEqual(1, cache.get(b"a").total_tokens)
+        cache.put(b"c", protos.CountTokensResponse(total_tokens=3))
+        # "b" was the least recently used.
+        self.assertIsNone(cache.get(b"b"))
+        self.assertLen(cache, 2)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_count_cache_stores_copies(self):
+        cache = token_estimation.TokenCountCache()
+        response = protos.CountTokensResponse(total_tokens=1)
+        cache.put(b"a", response)
+        response.total_tokens = 2
+        cache.get(b"a").total_tokens = 3
+
+        self.assertEqual(1, cache.get(b"a").total_tokens)
+
+    def test_count_cache_key(self):
+        def key(text, model="models/gemini-pro"):
+            return token_estimation.TokenCountCache.key(
+                protos.CountTokensRequest(
+                    model=model, generate_content_request=request_for({"text": text})
+                )
+            )
+
+        self.assertEqual(key("hello"), key("hello"))
+        self.assertNotEqual(key("hello"), key("goodbye"))
+        self.assertNotEqual(key("hello"), key("hello", model="models/other"))
+
+    def test_short_prompts_are_not_used_for_calibration(self):
+        request = request_for({"text": "hi"})
+        token_estimation.observe("models/gemini-pro", request, 50)
+        self.assertEqual(0, token_estimation._calibrations["models/gemini-pro"].samples)
+
+
+class ModelTests(parameterized.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(token_estimation._calibrations, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            token_estimation, "count_cache", token_estimation.TokenCountCache()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(genai.configure)
+
+        self.client = MockGenerativeServiceClient(total_tokens=7)
+        client_lib._client_manager.clients["generative"] = self.client
+
+    def test_estimate_is_offline(self):
+        model = generative_models.GenerativeModel("gemini-pro")
+        estimate = model.estimate_tokens("Hello world")
+
+        self.assertEqual(token_estimation.TokenEstimate(total_tokens=3, error=0.3), estimate)
+        self.assertEqual([], self.client.count_requests)
+
+    def test_falls_back_to_count_tokens(self):
+        model = generative_models.GenerativeModel("gemini-pro")
+        estimate = model.estimate_tokens("Hello world", max_error=0.1)
+
+        self.assertEqual(7, estimate.total_tokens)
+        self.assertTrue(estimate.exact)
+        self.assertLen(self.client.count_requests, 1)
+
+    def test_count_tokens_calibrates(self):
+        model = generative_models.GenerativeModel("gemini-pro")
+        self.client.total_tokens = 50
+        for _ in range(5):
+            model.count_tokens("y" * 400)
+
+        self.assertEqual(50, model.estimate_tokens("y" * 400).total_tokens)
+
+    def test_count_tokens_many(self):
+        model = generative_models.GenerativeModel("gemini-pro")
+        responses = model.count_tokens_many(["a", "b", "a"], max_concurrency=2)
+
+        self.assertEqual([7, 7, 7], [r.total_tokens for r in responses])
+        # Duplicates are only counted once.
+        self.assertLen(self.client.count_requests, 2)
+
+        # Counted prompts come from the cache.
+        responses = model.count_tokens_many(["b", "c"])
+        self.assertLen(responses, 2)
+        self.assertLen(self.client.count_requests, 3)
+
+    def test_count_tokens_many_errors(self):
+        model = generative_models.GenerativeModel("gemini-pro")
+        with self.assertRaises(google.api_core.exceptions.InvalidArgument):
+            model.count_tokens_many(["ok", "fail"])
+
+        # The successful count was cached before the failure was raised.
+        self.assertLen(self.client.count_requests, 2)
+        ok, failed = model.count_tokens_many(["ok", "fail"], return_exceptions=True)
+        self.assertEqual(7, ok.total_tokens)
+        self.assertIsInstance(failed, google.api_core.exceptions.InvalidArgument)
+        self.assertLen(self.client.count_requests, 3)
+
+
+if __name__ == "__main__":
+    absltest.main()